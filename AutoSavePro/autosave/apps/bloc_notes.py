@@ -4,9 +4,10 @@ import time
 import logging
 import win32gui
 import win32process
-import psutil
 import threading
 from queue import Queue
+from autosave.core.process_snapshot import ProcessSnapshot
+from autosave.core.copy_engine import CopyEngine
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -63,16 +64,17 @@ class BlocNotesHandler:
             logging.error(f"Error saving Bloc-notes document {file_path}: {str(e)}")
             return False
 
-    def is_notepad_running(self):
-        for proc in psutil.process_iter(['name']):
-            if 'notepad.exe' in proc.info['name'].lower():
-                logging.info("Notepad.exe is running")
-                return True
+    def is_notepad_running(self, snapshot=None):
+        snapshot = snapshot or ProcessSnapshot()
+        if snapshot.is_running('notepad.exe'):
+            logging.info("Notepad.exe is running")
+            return True
         logging.info("Notepad.exe is not running")
         return False
 
 def autosave_worker(save_directory, result_queue):
     handler = BlocNotesHandler()
+    copy_engine = CopyEngine()
     if handler.is_notepad_running():
         handler.find_notepad_windows()
         open_files = handler.get_open_files()
@@ -82,9 +84,8 @@ def autosave_worker(save_directory, result_queue):
                 save_path = os.path.join(save_directory, f"AutoSave_{base_name}")
                 try:
                     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                    with open(file, 'rb') as src, open(save_path, 'wb') as dst:
-                        dst.write(src.read())
-                    logging.info(f"Autosaved Bloc-notes document: {save_path}")
+                    result = copy_engine.copy(file, save_path)
+                    logging.info(f"Autosaved Bloc-notes document: {save_path} ({result})")
                     result_queue.put(("success", f"Autosaved: {save_path}"))
                 except Exception as e:
                     logging.error(f"Failed to save autosaved file: {str(e)}")
@@ -1,94 +1,290 @@
 import os
+import re
 import subprocess
 import time
 import logging
+import threading
+import itertools
 
 # Définissez le chemin correct vers l'exécutable GIMP
 GIMP_PATH = r"C:\Program Files\GIMP 2\bin\gimp-2.10.exe"
+# -i: no UI, -b -: read Script-Fu expressions from stdin until (gimp-quit 0)
+GIMP_BATCH_ARGS = ['-i', '-b', '-']
+
+# Each command is wrapped so that its output is framed by markers carrying its id; the
+# result is the `write` representation of the expression's value
+MARKER_PREFIX = "@@autosave-"
+MARKER_LINE = re.compile(r"^@@autosave-(begin|end|error) (\d+)$")
+SCHEME_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class GIMPHandler:
-    def __init__(self):
+
+def scheme_string(value):
+    # Windows paths are full of backslashes, which Script-Fu reads as escapes
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def parse_scheme_strings(output):
+    return [re.sub(r'\\(.)', r'\1', match) for match in SCHEME_STRING.findall(output)]
+
+
+class _PendingCommand:
+    def __init__(self, command_id, expression):
+        self.command_id = command_id
+        self.expression = expression
+        self.lines = []
+        self.error = None
+        self.done = threading.Event()
+
+    def result(self, timeout):
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"GIMP did not answer command {self.command_id} within {timeout} s")
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return "\n".join(self.lines).strip()
+
+
+class GIMPSession:
+    # One long-lived GIMP batch interpreter. Commands are written to its stdin as soon as
+    # they are submitted, so several can be in flight (pipelined); a reader thread matches
+    # the framed answers to the waiting commands. A crashed or hung process is killed,
+    # every command in flight fails, and the next command starts a fresh process (at most
+    # max_restarts times per restart_window seconds).
+    def __init__(self, command=None, start_timeout=60, command_timeout=30, max_restarts=3, restart_window=300):
+        self.command = command or [GIMP_PATH] + GIMP_BATCH_ARGS
+        self.start_timeout = start_timeout
+        self.command_timeout = command_timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
         self.process = None
+        self.starts = 0
+        self._restart_times = []
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        with self._lock:
+            if self.is_running():
+                return True
+            now = time.monotonic()
+            self._restart_times = [t for t in self._restart_times if now - t < self.restart_window]
+            if self.starts and len(self._restart_times) >= self.max_restarts:
+                logging.error(f"GIMP restarted {len(self._restart_times)} times in {self.restart_window} s, giving up")
+                return False
+            if self.starts:
+                self._restart_times.append(now)
+            try:
+                logging.info(f"Starting GIMP batch session: {' '.join(self.command)}")
+                process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE, text=True, encoding='utf-8',
+                                           errors='replace', bufsize=1)
+            except Exception as e:
+                logging.error(f"Error starting GIMP: {str(e)}")
+                return False
+            self.process = process
+            self.starts += 1
+            for stream in (process.stdout, process.stderr):
+                threading.Thread(target=self._read, args=(process, stream), daemon=True).start()
+        # Ready once the interpreter evaluates its first expression, however long that takes
+        try:
+            self.execute("(+ 1 1)", timeout=self.start_timeout)
+        except (RuntimeError, TimeoutError) as e:
+            logging.error(f"GIMP did not become ready: {str(e)}")
+            self._kill(process)
+            return False
+        logging.info("GIMP batch session ready")
+        return True
+
+    def submit(self, expression):
+        # Returns a pending command; call .result(timeout) to wait for its answer
+        if not self.is_running() and not self.start():
+            raise RuntimeError("GIMP batch session is not available")
+        with self._lock:
+            process = self.process
+            pending = _PendingCommand(next(self._ids), expression)
+            self._pending[pending.command_id] = (process, pending)
+        command_id = pending.command_id
+        framed = ('(begin (display "\\n{p}begin {i}\\n") '
+                  '(catch (display "\\n{p}error {i}\\n") (write (begin {e})) (display "\\n{p}end {i}\\n")))\n'
+                  .format(p=MARKER_PREFIX, i=command_id, e=expression))
+        try:
+            with self._write_lock:
+                process.stdin.write(framed)
+                process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self._finish(command_id, f"Could not send command to GIMP: {str(e)}")
+        return pending
+
+    def execute(self, expression, timeout=None):
+        return self.wait(self.submit(expression), timeout)
+
+    def pipeline(self, expressions, timeout=None):
+        # Sends every expression before waiting for the first answer. Returns one
+        # (result, error) pair per expression.
+        pending = [self.submit(expression) for expression in expressions]
+        results = []
+        for command in pending:
+            try:
+                results.append((self.wait(command, timeout), None))
+            except (RuntimeError, TimeoutError) as e:
+                results.append((None, e))
+        return results
+
+    def wait(self, pending, timeout=None):
+        try:
+            return pending.result(self.command_timeout if timeout is None else timeout)
+        except TimeoutError:
+            # The interpreter is stuck (or lost the framing): its state is unknown, start over
+            logging.error(f"GIMP command {pending.command_id} timed out, killing the session")
+            with self._lock:
+                entry = self._pending.get(pending.command_id)
+            if entry is not None:
+                self._kill(entry[0])
+            raise
+
+    def _read(self, process, stream):
+        current = None
+        for line in stream:
+            line = line.rstrip('\r\n')
+            match = MARKER_LINE.match(line)
+            if match is None:
+                if current is not None:
+                    current.lines.append(line)
+                elif line:
+                    logging.debug(f"GIMP: {line}")
+                continue
+            kind, command_id = match.group(1), int(match.group(2))
+            if kind == "begin":
+                with self._lock:
+                    entry = self._pending.get(command_id)
+                current = entry[1] if entry is not None else None
+            elif kind == "end":
+                self._finish(command_id)
+                current = None
+            else:
+                self._finish(command_id, f"Script-Fu error in command {command_id}")
+                current = None
+        # End of stream: the process is gone, nothing in flight on it will ever be answered
+        code = process.wait()
+        with self._lock:
+            orphans = [command_id for command_id, (owner, _) in self._pending.items() if owner is process]
+        for command_id in orphans:
+            self._finish(command_id, f"GIMP exited with code {code}")
+
+    def _finish(self, command_id, error=None):
+        with self._lock:
+            entry = self._pending.pop(command_id, None)
+        if entry is not None:
+            entry[1].error = error
+            entry[1].done.set()
+
+    def _kill(self, process):
+        if process.poll() is None:
+            process.kill()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            logging.error("GIMP process did not exit after kill")
+
+    def close(self, timeout=10):
+        with self._lock:
+            process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            with self._write_lock:
+                process.stdin.write("(gimp-quit 0)\n")
+                process.stdin.close()
+            process.wait(timeout=timeout)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self._kill(process)
+        logging.info("GIMP batch session closed")
+
+
+class GIMPHandler:
+    # Keeps one batch session across autosave runs instead of spawning GIMP every time
+    def __init__(self, session=None):
+        self.session = session or GIMPSession()
 
     def connect(self):
         try:
-            logging.info(f"Attempting to connect to GIMP at: {GIMP_PATH}")
-            self.process = subprocess.Popen([GIMP_PATH, '-i', '-b', '(gimp-message "Connected")'], 
-                                            stdout=subprocess.PIPE, 
-                                            stderr=subprocess.PIPE,
-                                            stdin=subprocess.PIPE)
-            time.sleep(2)  # Attendez que GIMP démarre
-            stdout, stderr = self.process.communicate()
-            logging.debug(f"GIMP stdout: {stdout.decode()}")
-            logging.debug(f"GIMP stderr: {stderr.decode()}")
-            if "Connected" in stdout.decode():
+            logging.info(f"Attempting to connect to GIMP at: {self.session.command[0]}")
+            if self.session.start():
                 logging.info("Successfully connected to GIMP")
                 return True
-            else:
-                logging.error("Failed to receive connection confirmation from GIMP")
-                return False
+            logging.error("Failed to receive connection confirmation from GIMP")
+            return False
         except Exception as e:
             logging.error(f"Error connecting to GIMP: {str(e)}")
-            logging.error(f"GIMP path used: {GIMP_PATH}")
+            logging.error(f"GIMP path used: {self.session.command[0]}")
             return False
 
     def disconnect(self):
-        if self.process:
-            self.process.terminate()
-            self.process = None
-            logging.info("Disconnected from GIMP")
+        self.session.close()
+        logging.info("Disconnected from GIMP")
 
     def get_open_files(self):
-        if not self.process:
-            logging.warning("GIMP process not connected")
-            return []
         try:
-            self.process.stdin.write(b'(gimp-image-list)\n')
-            self.process.stdin.flush()
-            output = self.process.stdout.readline().decode().strip()
+            output = self.session.execute(
+                "(map (lambda (image) (car (gimp-image-get-filename image)))"
+                " (vector->list (cadr (gimp-image-list))))")
             logging.info(f"Raw output from GIMP: {output}")
-            # Parsez la sortie pour obtenir les noms de fichiers
-            # Ceci est une simplification, vous devrez ajuster en fonction de la sortie réelle
-            open_files = [file for file in output.split() if file.endswith(('.xcf', '.png', '.jpg'))]
+            open_files = [file for file in parse_scheme_strings(output) if file.endswith(('.xcf', '.png', '.jpg'))]
             logging.info(f"Open files in GIMP: {open_files}")
             return open_files
         except Exception as e:
             logging.error(f"Error getting open files from GIMP: {str(e)}")
             return []
 
+    def save_script(self, file_path, save_path):
+        file_name, save_name = scheme_string(file_path), scheme_string(save_path)
+        return (f"(let* ((image (car (gimp-file-load RUN-NONINTERACTIVE {file_name} {file_name})))"
+                f" (drawable (car (gimp-image-get-active-layer image))))"
+                f" (gimp-file-save RUN-NONINTERACTIVE image drawable {save_name} {save_name})"
+                f" (gimp-image-delete image))")
+
     def save_document(self, file_path, save_path):
-        if not self.process:
-            logging.warning("GIMP process not connected")
-            return False
+        return self.save_documents([(file_path, save_path)])[0]
+
+    def save_documents(self, documents):
+        # documents: (file path, save path) pairs, sent to GIMP in one pipeline
         try:
-            script = f"""
-            (let* ((image (car (gimp-file-load RUN-NONINTERACTIVE "{file_path}" "{file_path}")))
-                   (drawable (car (gimp-image-get-active-layer image))))
-              (gimp-file-save RUN-NONINTERACTIVE image drawable "{save_path}" "{save_path}")
-              (gimp-image-delete image))
-            """
-            self.process.stdin.write(script.encode())
-            self.process.stdin.flush()
-            time.sleep(1)  # Attendez que la sauvegarde soit terminée
-            logging.info(f"Successfully saved GIMP document: {save_path}")
-            return True
+            results = self.session.pipeline([self.save_script(file_path, save_path)
+                                             for file_path, save_path in documents])
         except Exception as e:
-            logging.error(f"Error saving GIMP document: {str(e)}")
-            return False
+            logging.error(f"Error saving GIMP documents: {str(e)}")
+            return [False] * len(documents)
+        saved = []
+        for (file_path, save_path), (_, error) in zip(documents, results):
+            if error is None:
+                logging.info(f"Successfully saved GIMP document: {save_path}")
+            else:
+                logging.error(f"Error saving GIMP document {file_path}: {str(error)}")
+            saved.append(error is None)
+        return saved
+
 
-def autosave_gimp(save_directory):
-    handler = GIMPHandler()
+def autosave_gimp(save_directory, handler=None):
+    # Pass a handler to reuse its warm GIMP session across runs; without one GIMP is
+    # started for this run only
+    owns_handler = handler is None
+    handler = handler or GIMPHandler()
     if handler.connect():
         open_files = handler.get_open_files()
-        for file in open_files:
-            save_path = os.path.join(save_directory, f"AutoSave_{os.path.basename(file)}")
-            if handler.save_document(file, save_path):
+        documents = [(file, os.path.join(save_directory, f"AutoSave_{os.path.basename(file)}")) for file in open_files]
+        for (file, save_path), saved in zip(documents, handler.save_documents(documents)):
+            if saved:
                 logging.info(f"Autosaved GIMP document: {save_path}")
             else:
                 logging.error(f"Failed to autosave GIMP document: {file}")
-        handler.disconnect()
+        if owns_handler:
+            handler.disconnect()
     else:
         logging.error("Failed to connect to GIMP")
 
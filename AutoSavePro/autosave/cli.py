@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+
+# Modules the headless core must never pull in; their presence means a Qt or
+# platform-specific import crept back into the startup path
+FORBIDDEN_AT_STARTUP = ("PyQt5", "win32gui", "win32process", "win32api")
+DEFAULT_STARTUP_BUDGET_MS = 300
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+def parse_app(value):
+    # "notepad.exe=.txt,.log" -> ("notepad.exe", [".txt", ".log"])
+    name, _, extensions = value.partition("=")
+    extensions = [ext if ext.startswith(".") else "." + ext for ext in extensions.split(",") if ext]
+    if not name or not extensions:
+        raise argparse.ArgumentTypeError(f"Expected NAME=.ext1,.ext2, got {value!r}")
+    return name, extensions
+
+
+def parse_frequency(value):
+    if value == "auto":
+        return value
+    try:
+        seconds = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a number of seconds or 'auto', got {value!r}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("Save frequency must be positive")
+    return seconds
+
+
+def run(args):
+    logging.basicConfig(level=getattr(logging, args.log_level),
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    # Imported only now so that --help and argument errors stay instant
+    from autosave.core.watcher import Watcher
+
+    watcher = Watcher(args.save_dir, io_budget_mb_s=args.io_budget, metrics_port=args.metrics_port,
+                      metrics_dump_path=args.metrics_dump, replica_directories=args.replica,
+                      replica_bandwidth_mb_s=args.replica_bandwidth)
+    watcher.log_signal.connect(logging.info)
+    for app_name, extensions in args.app:
+        watcher.add_application(app_name, extensions)
+        if args.frequency == "auto":
+            watcher.set_adaptive_frequency(app_name)
+        else:
+            watcher.set_save_frequency(app_name, args.frequency)
+
+    stop_requested = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_requested.set())
+
+    # The watcher loop runs in a worker thread so the main thread stays free for signals
+    thread = threading.Thread(target=watcher.run, name="watcher")
+    thread.start()
+    logging.info(f"AutoSavePro running headless, saving to {args.save_dir}")
+    while thread.is_alive() and not stop_requested.wait(0.5):
+        pass
+    logging.info("Stopping AutoSavePro")
+    watcher.stop()
+    thread.join()
+    return 0
+
+
+def measure_startup(module):
+    # Runs `python -X importtime -c "import <module>"` in a fresh interpreter and returns
+    # (total microseconds, [(cumulative us, module name)] of its direct imports)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()[-2000:]}")
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules.append((cumulative, depth, name))
+        if depth == 1:
+            total += cumulative
+    return total, modules
+
+
+def check_startup(args):
+    try:
+        total, modules = measure_startup(args.module)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    total_ms = total / 1000.0
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms} ms)")
+    for cumulative, _, name in sorted((m for m in modules if m[1] <= 3), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000.0:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted({name for _, _, name in modules if name.split(".")[0] in FORBIDDEN_AT_STARTUP})
+    if forbidden:
+        print(f"Forbidden modules imported at startup: {', '.join(forbidden)}", file=sys.stderr)
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"Startup budget exceeded by {total_ms - args.budget_ms:.1f} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+def restore(args):
+    logging.basicConfig(level=getattr(logging, args.log_level),
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    from autosave.core.saver import Saver
+    from autosave.core.catalog import parse_timestamp
+    from autosave.core.restore import restore_app
+
+    at = parse_timestamp(args.at)
+    saver = Saver(args.save_dir)
+    try:
+        items = restore_app(saver, args.app, at, args.target_dir, args.workers, args.dry_run)
+    finally:
+        saver.close()
+    for item in items:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(item.timestamp))
+        outcome = item.action if args.dry_run else item.status
+        print(f"{outcome:<9}  {stamp}  {item.target_path}  <-  {item.save_path}")
+        if item.error:
+            print(f"           {item.error}")
+    if not items:
+        print(f"No snapshot of {args.app} at or before {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(at))}")
+    return 1 if any(item.status == "failed" for item in items) else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="autosave", description="AutoSavePro without the GUI")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="Watch applications and save their files")
+    run_parser.add_argument("--save-dir", required=True, help="Directory receiving the saves")
+    run_parser.add_argument("--app", action="append", type=parse_app, default=[], metavar="NAME=.EXT,...",
+                            help="Process name and the extensions to save, e.g. notepad.exe=.txt (repeatable)")
+    run_parser.add_argument("--frequency", type=parse_frequency, default=300,
+                            help="Seconds between periodic saves, or 'auto' for adaptive (default: 300)")
+    run_parser.add_argument("--io-budget", type=float, default=None, metavar="MB_S",
+                            help="Write budget shared by adaptive saves, in MB/s")
+    run_parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port")
+    run_parser.add_argument("--metrics-dump", default=None, metavar="PATH", help="Write metrics as JSON to PATH")
+    run_parser.add_argument("--replica", action="append", default=[], metavar="DIR",
+                            help="Also copy every snapshot to DIR, e.g. a NAS mount (repeatable)")
+    run_parser.add_argument("--replica-bandwidth", type=float, default=None, metavar="MB_S",
+                            help="Bandwidth limit shared by all replicas, in MB/s")
+    run_parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    run_parser.set_defaults(handler=run)
+
+    restore_parser = commands.add_parser("restore", help="Put every file of an application back as it was at a time")
+    restore_parser.add_argument("--save-dir", required=True, help="Directory holding the saves")
+    restore_parser.add_argument("--app", required=True, help="Application name, as used for saving")
+    restore_parser.add_argument("--at", required=True,
+                                help="Restore the newest snapshots at or before this time (epoch or \"2024-05-01 14:05\")")
+    restore_parser.add_argument("--target-dir", default=None,
+                                help="Restore into this directory instead of over the original files")
+    restore_parser.add_argument("--workers", type=int, default=4, help="Files restored in parallel (default: 4)")
+    restore_parser.add_argument("--dry-run", action="store_true", help="Only list what would be created or overwritten")
+    restore_parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    restore_parser.set_defaults(handler=restore)
+
+    startup_parser = commands.add_parser("check-startup",
+                                         help="Measure import time with python -X importtime against a budget")
+    startup_parser.add_argument("--budget-ms", type=float, default=DEFAULT_STARTUP_BUDGET_MS)
+    startup_parser.add_argument("--module", default="autosave.core.watcher", help="Module whose import is measured")
+    startup_parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    startup_parser.set_defaults(handler=check_startup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
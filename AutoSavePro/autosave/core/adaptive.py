@@ -0,0 +1,158 @@
+import time
+import threading
+
+DEFAULT_MIN_INTERVAL = 30
+DEFAULT_MAX_INTERVAL = 3600
+# Weight of the newest observation in the moving averages
+SMOOTHING = 0.3
+# A file may spend at most this fraction of its interval being saved
+MAX_DUTY_CYCLE = 0.05
+
+
+class _FileStats:
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.change_interval = None  # EWMA of the time between two changes
+        self.last_change = None
+        self.size = 0
+        self.save_seconds = 0.0  # EWMA of how long one snapshot takes
+        self.dirty = False
+
+
+def _ewma(previous, sample):
+    return sample if previous is None else previous + SMOOTHING * (sample - previous)
+
+
+def _size_class(size):
+    # Sizes within a factor of two weigh about the same on the I/O budget
+    return size.bit_length()
+
+
+class AdaptiveFrequency:
+    # Picks a snapshot interval per file. The target is the file's own change rate (a file
+    # edited every 20 s is saved about every 20 s, one idle for an hour rarely), within the
+    # app's [min, max] bounds. The I/O budget (MB/s over all adaptive files) is shared with
+    # max-min fairness: files needing less than an equal share keep their rate and the rest
+    # is split between the heavy ones, whose intervals stretch instead of starving others.
+    def __init__(self, io_budget_mb_s=None, rebalance_interval=1.0):
+        self.io_budget_mb_s = io_budget_mb_s
+        self.rebalance_interval = rebalance_interval
+        self.bounds = {}
+        self._files = {}
+        self._intervals = {}
+        self._balanced_at = None
+        self._lock = threading.Lock()
+
+    def set_bounds(self, app_name, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError(f"Invalid adaptive bounds: {min_interval}-{max_interval} seconds")
+        with self._lock:
+            self.bounds[app_name] = (min_interval, max_interval)
+            self._balanced_at = None
+
+    def remove_app(self, app_name):
+        # Returns the files that were tracked for app_name
+        with self._lock:
+            self.bounds.pop(app_name, None)
+            removed = [path for path, stats in self._files.items() if stats.app_name == app_name]
+            for path in removed:
+                del self._files[path]
+            self._balanced_at = None
+        return removed
+
+    def is_adaptive(self, app_name):
+        return app_name in self.bounds
+
+    def set_io_budget(self, mb_per_second):
+        with self._lock:
+            self.io_budget_mb_s = mb_per_second
+            self._balanced_at = None
+
+    def observe_change(self, app_name, file_path, size, now=None):
+        # Returns True for a file seen for the first time
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            stats = self._files.get(file_path)
+            is_new = stats is None
+            if is_new:
+                stats = self._files[file_path] = _FileStats(app_name)
+            elif stats.last_change is not None:
+                stats.change_interval = _ewma(stats.change_interval, now - stats.last_change)
+            # Only a file that weighs differently on the budget forces a rebalance; a new
+            # change rate waits for the next periodic one
+            if is_new or stats.app_name != app_name or _size_class(stats.size) != _size_class(size):
+                stats.app_name = app_name
+                self._balanced_at = None
+            stats.last_change = now
+            stats.size = size
+            stats.dirty = True
+        return is_new
+
+    def observe_save(self, file_path, seconds, size):
+        with self._lock:
+            stats = self._files.get(file_path)
+            if stats is not None:
+                stats.save_seconds = _ewma(stats.save_seconds or None, seconds)
+                stats.size = size
+
+    def take_dirty(self, file_path):
+        # True (once) if the file changed since it was last handed out for saving
+        with self._lock:
+            stats = self._files.get(file_path)
+            if stats is None or not stats.dirty:
+                return False
+            stats.dirty = False
+            return True
+
+    def forget(self, file_path):
+        with self._lock:
+            self._files.pop(file_path, None)
+            self._intervals.pop(file_path, None)
+
+    def interval(self, file_path, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._balanced_at is None or now - self._balanced_at >= self.rebalance_interval:
+                self._rebalance(now)
+            if file_path in self._intervals:
+                return self._intervals[file_path]
+            stats = self._files.get(file_path)
+            bounds = self.bounds.get(stats.app_name if stats else None, (DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL))
+            return bounds[1]
+
+    def _rebalance(self, now):
+        desired = {}
+        for path, stats in self._files.items():
+            low, high = self.bounds.get(stats.app_name, (DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL))
+            # Time since the last change counts too, so an idle file drifts to the max
+            observed = stats.change_interval or high
+            if stats.last_change is not None:
+                observed = max(observed, now - stats.last_change)
+            desired[path] = (min(max(observed, low), high), low, high)
+
+        granted = {}
+        if self.io_budget_mb_s:
+            remaining = self.io_budget_mb_s * 1024 * 1024
+            demands = sorted((self._files[path].size / interval, path) for path, (interval, _, _) in desired.items())
+            for index, (rate, path) in enumerate(demands):
+                share = remaining / (len(demands) - index)
+                granted[path] = min(rate, share)
+                remaining -= granted[path]
+
+        intervals = {}
+        for path, (interval, low, high) in desired.items():
+            stats = self._files[path]
+            if granted.get(path):
+                interval = max(interval, stats.size / granted[path])
+            interval = max(interval, stats.save_seconds / MAX_DUTY_CYCLE)
+            intervals[path] = min(max(interval, low), high)
+        self._intervals = intervals
+        self._balanced_at = now
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "io_budget_mb_s": self.io_budget_mb_s,
+                "intervals": dict(self._intervals),
+            }
@@ -0,0 +1,314 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import datetime
+import threading
+from autosave.core import delta
+from autosave.core.chunk_store import ChunkStore
+from autosave.core import compression
+from autosave.core.pack_store import PACKS_DIRECTORY, PACKED_SUFFIX, scan_packs
+
+CATALOG_NAME = "catalog.db"
+HASH_BUFFER_SIZE = 1024 * 1024
+# Sidecar of copies and compressed copies holding what their name does not tell (manifests,
+# delta headers and pack records carry the same fields), read back by rebuild_from_disk
+META_SUFFIX = ".meta"
+SIDECAR_SUFFIXES = (META_SUFFIX, delta.SIGNATURE_SUFFIX)
+
+# <stem>_<YYYYmmdd_HHMMSS[_ffffff]><ext>[.manifest|.delta|.gz|.xz|.bz2|.packed], as written by
+# Saver.save_file (older snapshots have no microseconds)
+SNAPSHOT_NAME = re.compile(r"^(?P<stem>.+)_(?P<stamp>\d{8}_\d{6}(?:_\d{6})?)(?P<ext>(\.[^.]+)?)"
+                           r"(?P<suffix>\.manifest|\.delta|\.gz|\.xz|\.bz2|\.packed)?$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    save_path TEXT NOT NULL UNIQUE,
+    app TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    original_path TEXT,
+    timestamp REAL NOT NULL,
+    size INTEGER,
+    hash TEXT,
+    storage TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_app_file_time ON snapshots (app, file_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_original_time ON snapshots (original_path, timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_app_time ON snapshots (app, timestamp);
+"""
+
+
+def file_sha256(file_path, opener=open):
+    digest = hashlib.sha256()
+    with opener(file_path, 'rb') as src:
+        while True:
+            data = src.read(HASH_BUFFER_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def write_snapshot_meta(meta_path, original_path, timestamp, size=None, file_hash=None):
+    # What a manifest or a delta header records, for snapshots that have neither: a
+    # compressed file does not tell its logical size, and hashing it means decompressing it
+    with open(meta_path, 'w', encoding='utf-8') as dst:
+        json.dump({"original_path": original_path, "timestamp": timestamp, "size": size, "sha256": file_hash}, dst)
+
+
+def read_snapshot_meta(save_path):
+    try:
+        with open(save_path + META_SUFFIX, 'r', encoding='utf-8') as src:
+            return json.load(src)
+    except FileNotFoundError:
+        return {}
+
+
+class SnapshotCatalog:
+    # SQLite index of every snapshot in the save root, so lookups never list directories
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logging.info(f"Snapshot catalog opened: {db_path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, save_path, app, file_name, original_path, timestamp, size, file_hash, storage):
+        # A save path is never reused: adding one twice raises sqlite3.IntegrityError
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots "
+                "(save_path, app, file_name, original_path, timestamp, size, hash, storage) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (save_path, app, file_name, original_path, timestamp, size, file_hash, storage))
+            return cursor.lastrowid
+
+    def remove(self, save_paths):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM snapshots WHERE save_path = ?", [(path,) for path in save_paths])
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def find(self, app, file_name, start=None, end=None, limit=None):
+        # Newest first, optionally restricted to start <= timestamp <= end
+        sql = "SELECT * FROM snapshots WHERE app = ? AND file_name = ?"
+        params = [app, file_name]
+        sql, params = self._time_range(sql, params, start, end)
+        return self._query(sql + " ORDER BY timestamp DESC, id DESC" + self._limit(limit), params)
+
+    def find_by_original_path(self, original_path, start=None, end=None, limit=None):
+        sql = "SELECT * FROM snapshots WHERE original_path = ?"
+        sql, params = self._time_range(sql, [original_path], start, end)
+        return self._query(sql + " ORDER BY timestamp DESC, id DESC" + self._limit(limit), params)
+
+    def latest(self, app, original_path):
+        # Newest snapshot of one file in one app, or None
+        rows = self._query("SELECT * FROM snapshots WHERE app = ? AND original_path = ? "
+                           "ORDER BY timestamp DESC, id DESC LIMIT 1", [app, original_path])
+        return rows[0] if rows else None
+
+    def latest_per_file(self, app, end=None):
+        # Newest snapshot at or before `end` of every file of the app, newest first. Files
+        # are told apart by original path, by name for rows that have none. SQLite takes the
+        # other columns from the row that holds MAX(timestamp).
+        sql = "SELECT *, MAX(timestamp) AS latest FROM snapshots WHERE app = ?"
+        sql, params = self._time_range(sql, [app], None, end)
+        return self._query(sql + " GROUP BY COALESCE(original_path, file_name) ORDER BY timestamp DESC, id DESC",
+                           params)
+
+    def find_app(self, app, start=None, end=None, limit=None):
+        sql = "SELECT * FROM snapshots WHERE app = ?"
+        sql, params = self._time_range(sql, [app], start, end)
+        return self._query(sql + " ORDER BY timestamp DESC, id DESC" + self._limit(limit), params)
+
+    def find_by_storage(self, storage):
+        return self._query("SELECT * FROM snapshots WHERE storage = ?", [storage])
+
+    def get(self, save_path):
+        rows = self._query("SELECT * FROM snapshots WHERE save_path = ?", [save_path])
+        return rows[0] if rows else None
+
+    def after(self, last_id, limit=None):
+        # Snapshots in the order they were committed, for consumers that keep an id cursor
+        return self._query("SELECT * FROM snapshots WHERE id > ? ORDER BY id" + self._limit(limit), [last_id])
+
+    def first_after(self, last_id):
+        rows = self.after(last_id, 1)
+        return rows[0] if rows else None
+
+    def count_after(self, last_id):
+        return self._query("SELECT COUNT(*) AS n FROM snapshots WHERE id > ?", [last_id])[0]["n"]
+
+    def page(self, app, file_name=None, before=None, limit=200):
+        # One page of history, newest first. `before` is the (timestamp, id) of the last row
+        # of the previous page: seeking past it stays an index range scan however deep the
+        # page, where OFFSET would walk every row before it.
+        sql = "SELECT * FROM snapshots WHERE app = ?"
+        params = [app]
+        if file_name is not None:
+            sql += " AND file_name = ?"
+            params.append(file_name)
+        if before is not None:
+            sql += " AND (timestamp, id) < (?, ?)"
+            params.extend(before)
+        return self._query(sql + " ORDER BY timestamp DESC, id DESC" + self._limit(limit), params)
+
+    def apps(self):
+        return [row["app"] for row in self._query("SELECT DISTINCT app FROM snapshots ORDER BY app", [])]
+
+    def files(self, app):
+        return [row["file_name"] for row in
+                self._query("SELECT DISTINCT file_name FROM snapshots WHERE app = ? ORDER BY file_name", [app])]
+
+    def count(self, app=None, file_name=None):
+        sql = "SELECT COUNT(*) AS n FROM snapshots"
+        params = []
+        if app is not None:
+            sql += " WHERE app = ?"
+            params.append(app)
+            if file_name is not None:
+                sql += " AND file_name = ?"
+                params.append(file_name)
+        return self._query(sql, params)[0]["n"]
+
+    def _time_range(self, sql, params, start, end):
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND timestamp <= ?"
+            params.append(end)
+        return sql, params
+
+    def _limit(self, limit):
+        return f" LIMIT {int(limit)}" if limit is not None else ""
+
+    def rebuild_from_disk(self, base_save_directory, compute_hashes=True, skip_dirs=()):
+        # Recovery path: forget everything and re-read the snapshots present on disk
+        rows = []
+        for app in sorted(os.listdir(base_save_directory)):
+            app_dir = os.path.join(base_save_directory, app)
+            if app in skip_dirs or app.startswith('.') or not os.path.isdir(app_dir):
+                continue
+            names = os.listdir(app_dir)
+            present = set(names)
+            for name in names:
+                # Sidecars (metadata, delta signatures) sit next to the snapshot they describe
+                if any(name.endswith(suffix) and name[:-len(suffix)] in present for suffix in SIDECAR_SUFFIXES):
+                    continue
+                match = SNAPSHOT_NAME.match(name) if '.tmp-' not in name else None
+                if not match:
+                    continue
+                save_path = os.path.join(app_dir, name)
+                try:
+                    rows.append(self._describe(app, save_path, match, compute_hashes))
+                except Exception as e:
+                    logging.error(f"Skipping unreadable snapshot {save_path}: {str(e)}")
+        rows.extend(self._describe_packed(base_save_directory))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM snapshots")
+            self._conn.executemany(
+                "INSERT INTO snapshots (save_path, app, file_name, original_path, timestamp, size, hash, storage) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        logging.info(f"Catalog rebuilt from {base_save_directory}: {len(rows)} snapshots")
+        return len(rows)
+
+    def _describe(self, app, save_path, match, compute_hashes):
+        file_name = match.group("stem") + match.group("ext")
+        # Snapshots written before their metadata was recorded fall back to the file's mtime
+        mtime = os.path.getmtime(save_path)
+        suffix = match.group("suffix")
+        if suffix == ".manifest":
+            manifest = ChunkStore.read_manifest(save_path)
+            return (save_path, app, file_name, manifest.get("original_path"), manifest.get("timestamp", mtime),
+                    manifest["size"], manifest.get("sha256"), "chunked")
+        if suffix == ".delta":
+            header = delta.read_delta_header(save_path)
+            return (save_path, app, file_name, header.get("original_path"), header.get("timestamp", mtime),
+                    header.get("size"), header.get("sha256"), "delta")
+        meta = read_snapshot_meta(save_path)
+        file_hash = meta.get("sha256")
+        if suffix in compression.COMPRESSED_SUFFIXES:
+            if file_hash is None and compute_hashes:
+                file_hash = file_sha256(save_path, lambda path, mode: compression.open_decompressed(path))
+            return (save_path, app, file_name, meta.get("original_path"), meta.get("timestamp", mtime),
+                    meta.get("size"), file_hash, "compressed")
+        if file_hash is None and compute_hashes:
+            file_hash = file_sha256(save_path)
+        return (save_path, app, file_name, meta.get("original_path"), meta.get("timestamp", mtime),
+                os.path.getsize(save_path), file_hash, "copy")
+
+    def _describe_packed(self, base_save_directory):
+        # Packed snapshots have no file of their own: they are listed from the packs, read
+        # only, since the daemon may be appending to them while the catalog is rebuilt
+        packs_dir = os.path.join(base_save_directory, PACKS_DIRECTORY)
+        if not os.path.isdir(packs_dir):
+            return []
+        rows = []
+        for key, timestamp, size, file_hash, meta in scan_packs(packs_dir):
+            save_path = os.path.join(base_save_directory, *key.split('/')) + PACKED_SUFFIX
+            match = SNAPSHOT_NAME.match(os.path.basename(save_path))
+            if match:
+                rows.append((save_path, key.split('/')[0], match.group("stem") + match.group("ext"),
+                             meta.get("original_path"), timestamp, size, file_hash, "packed"))
+        return rows
+
+
+def parse_timestamp(value):
+    # Accepts epoch seconds or an ISO date ("2024-05-01 14:05")
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoSavePro snapshot catalog")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Rebuild the catalog from the snapshots on disk")
+    rebuild.add_argument("save_directory")
+    rebuild.add_argument("--no-hash", action="store_true", help="Do not hash plain copies")
+    listing = subparsers.add_parser("list", help="List snapshots of a file")
+    listing.add_argument("save_directory")
+    listing.add_argument("app")
+    listing.add_argument("file_name")
+    listing.add_argument("--since")
+    listing.add_argument("--until")
+    args = parser.parse_args(argv)
+
+    catalog = SnapshotCatalog(os.path.join(args.save_directory, CATALOG_NAME))
+    if args.command == "rebuild":
+        count = catalog.rebuild_from_disk(args.save_directory, compute_hashes=not args.no_hash)
+        print(f"Catalog rebuilt: {count} snapshots")
+    else:
+        start = parse_timestamp(args.since) if args.since else None
+        end = parse_timestamp(args.until) if args.until else None
+        for row in catalog.find(args.app, args.file_name, start, end):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["timestamp"]))
+            print(f"{stamp}  {row['size'] or 0:>12}  {row['storage']:<8}  {row['save_path']}")
+    catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+import threading
+
+# Content-defined chunking: cut points come from the content itself, so bytes inserted or
+# removed in a file only change the chunks around the edit and every later chunk still
+# dedups. Chunks are CHUNK_MIN_SIZE + CHUNK_AVG_SIZE long on average, never longer than
+# CHUNK_MAX_SIZE.
+CHUNK_MIN_SIZE = 256 * 1024
+CHUNK_AVG_SIZE = 1024 * 1024
+CHUNK_MAX_SIZE = 4 * 1024 * 1024
+READ_SIZE = 4 * 1024 * 1024
+MANIFEST_SUFFIX = ".manifest"
+
+# A gear-style hash of every position, computed a whole block at a time: bytes are spread
+# by a fixed substitution table, then the block, read as one little-endian integer, is
+# multiplied by an odd 64-bit constant, so each hash byte depends on the bytes just
+# before it. Positions whose hash matches CANDIDATE (12 bits) are confirmed with a CRC of
+# the CUT_WINDOW bytes ending there; all the per-byte work runs in C.
+GEAR_TABLE = bytes(hashlib.sha256(b"autosave-cdc-%d" % value).digest()[0] for value in range(256))
+GEAR_MULTIPLIER = 0x9E3779B97F4A7C15
+GEAR_CONTEXT = 16
+CANDIDATE = re.compile(b"[\x00-\x0f]\x00", re.S)
+CANDIDATE_BITS = 12
+CUT_WINDOW = 64
+
+
+def _gear_hashes(context, data):
+    value = int.from_bytes((context + data).translate(GEAR_TABLE), 'little') * GEAR_MULTIPLIER
+    return value.to_bytes(len(context) + len(data) + 8, 'little')[len(context):len(context) + len(data)]
+
+
+def content_chunks(src, min_size=CHUNK_MIN_SIZE, avg_size=CHUNK_AVG_SIZE, max_size=CHUNK_MAX_SIZE):
+    # Yields the chunks of an open binary file; avg_size must be a power of two
+    confirm_mask = max(1, avg_size >> CANDIDATE_BITS) - 1
+    pending = bytearray()
+    hashes = bytearray()
+    context = bytes(GEAR_CONTEXT)
+    while True:
+        data = src.read(READ_SIZE)
+        if data:
+            pending += data
+            hashes += _gear_hashes(context, data)
+            context = (context + data)[-GEAR_CONTEXT:]
+        while len(pending) > min_size:
+            cut = None
+            for match in CANDIDATE.finditer(hashes, min_size, min(len(pending), max_size)):
+                if zlib.crc32(pending[match.end() - CUT_WINDOW:match.end()]) & confirm_mask == 0:
+                    cut = match.end()
+                    break
+            if cut is None:
+                if len(pending) < max_size:
+                    break
+                cut = max_size
+            yield bytes(pending[:cut])
+            del pending[:cut]
+            del hashes[:cut]
+        if not data:
+            if pending:
+                yield bytes(pending)
+            return
+
+
+class ChunkStore:
+    # Content-addressed store: each chunk lives once under <root>/<sha256[:2]>/<sha256>
+    # and every snapshot is a small JSON manifest listing its chunks.
+    def __init__(self, root, min_size=CHUNK_MIN_SIZE, avg_size=CHUNK_AVG_SIZE, max_size=CHUNK_MAX_SIZE):
+        self.root = root
+        self.chunk_sizes = (min_size, avg_size, max_size)
+        # Saves may run concurrently with each other but never with gc, otherwise a
+        # chunk deduplicated by a save in progress could be swept before its manifest lands.
+        self._gc_condition = threading.Condition()
+        self._active_saves = 0
+        self._gc_running = False
+        os.makedirs(self.root, exist_ok=True)
+        logging.info(f"ChunkStore initialized at {root} with chunk sizes {min_size}/{avg_size}/{max_size}")
+
+    def chunk_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has_chunk(self, digest):
+        return os.path.exists(self.chunk_path(digest))
+
+    def put_chunk(self, digest, data, staged=None):
+        # With a staged dict the chunk is left under its temporary name and recorded as
+        # staged[final path] = temporary path, for the caller to commit in one batch
+        path = self.chunk_path(digest)
+        if os.path.exists(path) or (staged is not None and path in staged):
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, 'wb') as dst:
+            dst.write(data)
+        if staged is None:
+            os.replace(tmp_path, path)
+        else:
+            staged[path] = tmp_path
+        return len(data)
+
+    def begin_save(self):
+        with self._gc_condition:
+            while self._gc_running:
+                self._gc_condition.wait()
+            self._active_saves += 1
+
+    def end_save(self):
+        with self._gc_condition:
+            self._active_saves -= 1
+            self._gc_condition.notify_all()
+
+    def put_file(self, file_path, staged=None):
+        # Returns (manifest, bytes_written); unchanged chunks cost nothing.
+        # Callers must wrap put_file, write_manifest and any commit of the staged
+        # chunks in begin_save/end_save.
+        chunks = []
+        size = 0
+        bytes_written = 0
+        file_hash = hashlib.sha256()
+        with open(file_path, 'rb') as src:
+            for data in content_chunks(src, *self.chunk_sizes):
+                digest = hashlib.sha256(data).hexdigest()
+                bytes_written += self.put_chunk(digest, data, staged)
+                file_hash.update(data)
+                chunks.append([digest, len(data)])
+                size += len(data)
+        manifest = {
+            "original_path": os.path.abspath(file_path),
+            "size": size,
+            "sha256": file_hash.hexdigest(),
+            "chunk_sizes": list(self.chunk_sizes),
+            "chunks": chunks,
+        }
+        return manifest, bytes_written
+
+    def write_manifest(self, manifest, manifest_path):
+        tmp_path = f"{manifest_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as dst:
+            json.dump(manifest, dst)
+        os.replace(tmp_path, manifest_path)
+        return os.path.getsize(manifest_path)
+
+    @staticmethod
+    def read_manifest(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as src:
+            return json.load(src)
+
+    def restore(self, manifest, dest_path):
+        with open(dest_path, 'wb') as dst:
+            for digest, length in manifest["chunks"]:
+                with open(self.chunk_path(digest), 'rb') as src:
+                    data = src.read()
+                if len(data) != length:
+                    raise IOError(f"Chunk {digest} is corrupted: expected {length} bytes, got {len(data)}")
+                dst.write(data)
+
+    def gc(self, manifest_paths_func):
+        # Mark and sweep: every chunk not referenced by a live manifest is removed.
+        with self._gc_condition:
+            while self._gc_running or self._active_saves:
+                self._gc_condition.wait()
+            self._gc_running = True
+        try:
+            return self._collect(manifest_paths_func())
+        finally:
+            with self._gc_condition:
+                self._gc_running = False
+                self._gc_condition.notify_all()
+
+    def _collect(self, manifest_paths):
+        live = set()
+        for manifest_path in manifest_paths:
+            try:
+                manifest = self.read_manifest(manifest_path)
+            except Exception as e:
+                logging.error(f"Unable to read manifest {manifest_path}, keeping store intact: {str(e)}")
+                return 0
+            live.update(digest for digest, _ in manifest["chunks"])
+
+        removed = 0
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name not in live and '.tmp-' not in name:
+                    try:
+                        os.remove(os.path.join(prefix_dir, name))
+                        removed += 1
+                    except Exception as e:
+                        logging.error(f"Error removing chunk {name}: {str(e)}")
+        logging.info(f"Chunk store GC removed {removed} unreferenced chunks")
+        return removed
@@ -0,0 +1,40 @@
+import threading
+
+
+class ChangeCoalescer:
+    # Collapses bursts of file-system events into one change per path: a path becomes
+    # due once no new event arrived for it during quiet_period seconds.
+    def __init__(self, quiet_period=2.0):
+        self.quiet_period = quiet_period
+        self._last_event = {}
+        self._lock = threading.Lock()
+        self.events_received = 0
+        self.events_coalesced = 0
+
+    def touch(self, path, now):
+        with self._lock:
+            self.events_received += 1
+            if path in self._last_event:
+                self.events_coalesced += 1
+            self._last_event[path] = now
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._last_event)
+
+    def next_deadline(self):
+        with self._lock:
+            if not self._last_event:
+                return None
+            return min(self._last_event.values()) + self.quiet_period
+
+    def pop_due(self, now):
+        with self._lock:
+            due = [path for path, last in self._last_event.items() if now - last >= self.quiet_period]
+            for path in due:
+                del self._last_event[path]
+        return due
+
+    def discard(self, path):
+        with self._lock:
+            self._last_event.pop(path, None)
@@ -0,0 +1,103 @@
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import hashlib
+import logging
+
+BUFFER_SIZE = 1024 * 1024
+
+# codec name -> (snapshot suffix, module, level keyword, default level)
+CODECS = {
+    "zlib": (".gz", gzip, "compresslevel", 6),
+    "lzma": (".xz", lzma, "preset", 6),
+    "bz2": (".bz2", bz2, "compresslevel", 9),
+}
+COMPRESSED_SUFFIXES = tuple(codec[0] for codec in CODECS.values())
+
+# Formats that are already compressed: recompressing them only burns CPU
+COMPRESSED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".heic", ".avif",
+    ".zip", ".gz", ".xz", ".bz2", ".7z", ".rar", ".zst",
+    ".mp3", ".mp4", ".m4a", ".mov", ".mkv", ".avi", ".ogg", ".flac",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".aep",
+}
+COMPRESSED_MAGIC = (
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"PK\x03\x04", b"\x1f\x8b", b"\xfd7zXZ",
+    b"BZh", b"7z\xbc\xaf", b"Rar!", b"\x28\xb5\x2f\xfd", b"ID3", b"OggS", b"fLaC",
+)
+
+
+def codec_for_suffix(save_path):
+    for codec, (suffix, _, _, _) in CODECS.items():
+        if save_path.endswith(suffix):
+            return codec
+    return None
+
+
+def is_already_compressed(file_path):
+    if os.path.splitext(file_path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return True
+    try:
+        with open(file_path, 'rb') as src:
+            head = src.read(12)
+    except OSError:
+        return False
+    if head[:4] == b"RIFF" and head[8:12] in (b"WEBP", b"AVI "):
+        return True
+    return head.startswith(COMPRESSED_MAGIC)
+
+
+class CompressionPolicy:
+    # Extension rules win over app rules, which win over the default (None = store as is)
+    def __init__(self, default=None):
+        self.default = default
+        self.by_app = {}
+        self.by_extension = {}
+
+    def set(self, codec, level=None, app_name=None, extension=None):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        rule = (codec, level if level is not None else CODECS[codec][3]) if codec else None
+        if extension is not None:
+            self.by_extension[extension.lower()] = rule
+        elif app_name is not None:
+            self.by_app[app_name] = rule
+        else:
+            self.default = rule
+
+    def resolve(self, app_name, file_path):
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in self.by_extension:
+            rule = self.by_extension[extension]
+        else:
+            rule = self.by_app.get(app_name, self.default)
+        if rule is None or is_already_compressed(file_path):
+            return None
+        return rule
+
+
+def compress_file(src_path, dst_path, codec, level):
+    # Streams src into a compressed snapshot; returns the SHA-256 of the original bytes
+    _, module, level_keyword, _ = CODECS[codec]
+    digest = hashlib.sha256()
+    with open(src_path, 'rb') as src, module.open(dst_path, 'wb', **{level_keyword: level}) as dst:
+        while True:
+            data = src.read(BUFFER_SIZE)
+            if not data:
+                break
+            digest.update(data)
+            dst.write(data)
+    shutil.copystat(src_path, dst_path)
+    return digest.hexdigest()
+
+
+def open_decompressed(save_path):
+    return CODECS[codec_for_suffix(save_path)][1].open(save_path, 'rb')
+
+
+def decompress_file(save_path, dst_path):
+    with open_decompressed(save_path) as src, open(dst_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, BUFFER_SIZE)
+    logging.debug(f"Decompressed {save_path} to {dst_path}")
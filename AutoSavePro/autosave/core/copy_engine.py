@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import errno
+import shutil
+import hashlib
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+STRATEGIES = ("reflink", "copy_file_range", "sendfile", "chunked")
+# Errors meaning "this strategy cannot work here", as opposed to a real I/O failure
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY,
+                errno.EBADF, errno.EPERM, errno.ETXTBSY}
+
+
+class CopyResult:
+    def __init__(self, strategy, bytes_copied, seconds, sha256=None):
+        self.strategy = strategy
+        self.bytes_copied = bytes_copied
+        self.seconds = seconds
+        self.sha256 = sha256
+
+    @property
+    def throughput(self):
+        # bytes per second; a reflink of any size is effectively instantaneous
+        return self.bytes_copied / self.seconds if self.seconds > 0 else float("inf")
+
+    def __repr__(self):
+        return f"CopyResult({self.strategy}, {self.bytes_copied} bytes, {self.throughput / 1e6:.1f} MB/s)"
+
+
+class CopyEngine:
+    # Tries the cheapest copy first: a CoW clone shares extents and writes no data,
+    # copy_file_range/sendfile keep bytes in the kernel, the chunked loop works anywhere.
+    # Strategies that fail as unsupported are remembered per (source device, target device).
+    def __init__(self, strategies=STRATEGIES, chunk_size=CHUNK_SIZE):
+        self.strategies = [name for name in strategies if self._available(name) and name != "chunked"]
+        self.strategies.append("chunked")  # always the last resort
+        self.chunk_size = chunk_size
+        self._unsupported = set()
+        self._lock = threading.Lock()
+        self.stats = {name: {"count": 0, "bytes": 0, "seconds": 0.0} for name in self.strategies}
+
+    @staticmethod
+    def _available(name):
+        if name == "reflink":
+            return fcntl is not None and sys.platform.startswith("linux")
+        if name == "copy_file_range":
+            return hasattr(os, "copy_file_range")
+        if name == "sendfile":
+            return hasattr(os, "sendfile") and sys.platform.startswith("linux")
+        return name == "chunked"
+
+    def copy(self, src_path, dst_path, want_hash=False, preserve_stat=True, hash_clones=True):
+        # With hash_clones=False a reflinked copy comes back without its hash: hashing it
+        # would read the whole file, which is all the clone saved
+        devices = (os.stat(src_path).st_dev, os.stat(os.path.dirname(os.path.abspath(dst_path))).st_dev)
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            for name in self.strategies:
+                if (name, devices) in self._unsupported:
+                    continue
+                started = time.perf_counter()
+                try:
+                    digest = getattr(self, "_copy_" + name)(src, dst, size, want_hash)
+                except OSError as e:
+                    if name == "chunked" or e.errno not in _UNSUPPORTED:
+                        raise
+                    logging.debug(f"Copy strategy {name} unsupported for {src_path}: {str(e)}")
+                    with self._lock:
+                        self._unsupported.add((name, devices))
+                    src.seek(0)
+                    dst.seek(0)
+                    dst.truncate()
+                    continue
+                result = CopyResult(name, size, time.perf_counter() - started, digest)
+                break
+        if want_hash and result.sha256 is None and (hash_clones or result.strategy != "reflink"):
+            # Kernel-side copies never surface the bytes: hash what was actually stored
+            result.sha256 = _sha256_of(dst_path)
+        if preserve_stat:
+            shutil.copystat(src_path, dst_path)
+        with self._lock:
+            stats = self.stats[result.strategy]
+            stats["count"] += 1
+            stats["bytes"] += result.bytes_copied
+            stats["seconds"] += result.seconds
+        return result
+
+    def _copy_reflink(self, src, dst, size, want_hash):
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return None
+
+    def _copy_copy_file_range(self, src, dst, size, want_hash):
+        copied = 0
+        while copied < size:
+            sent = os.copy_file_range(src.fileno(), dst.fileno(), size - copied)
+            if sent == 0:
+                break
+            copied += sent
+        if copied == 0 and size:
+            # Some filesystems report success but copy nothing (e.g. procfs-like sources)
+            raise OSError(errno.EINVAL, "copy_file_range copied no data")
+        return None
+
+    def _copy_sendfile(self, src, dst, size, want_hash):
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, min(size - offset, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+        return None
+
+    def _copy_chunked(self, src, dst, size, want_hash):
+        digest = hashlib.sha256() if want_hash else None
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        while True:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            if digest:
+                digest.update(view[:read])
+            dst.write(view[:read])
+        return digest.hexdigest() if digest else None
+
+
+def _sha256_of(file_path):
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb') as src:
+        while True:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
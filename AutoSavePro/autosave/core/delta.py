@@ -0,0 +1,233 @@
+import os
+import json
+import struct
+import hashlib
+import logging
+from autosave.core.chunk_store import content_chunks
+
+# Both versions are cut into content-defined blocks (the chunker of chunk_store, with
+# small blocks): an edit only changes the blocks around it, even when it shifts the rest
+# of the file, so blocks are matched by their strong hash alone and no checksum has to be
+# rolled over every byte offset in Python.
+BLOCK_MIN_SIZE = 8 * 1024
+BLOCK_AVG_SIZE = 32 * 1024
+BLOCK_MAX_SIZE = 128 * 1024
+BLOCK_SIZES = (BLOCK_MIN_SIZE, BLOCK_AVG_SIZE, BLOCK_MAX_SIZE)
+READ_SIZE = 4 * 1024 * 1024
+MAX_LITERAL = 1024 * 1024
+DELTA_SUFFIX = ".delta"
+SIGNATURE_SUFFIX = ".sig"
+
+DELTA_MAGIC = b"ASPDELTA1\n"
+SIGNATURE_MAGIC = b"ASPSIG2\n"
+_COPY = b"C"
+_LITERAL = b"L"
+_END = b"E"
+_COPY_STRUCT = struct.Struct(">QI")
+_LEN_STRUCT = struct.Struct(">I")
+_SIG_HEADER = struct.Struct(">IIII")
+_SIG_ENTRY = struct.Struct(">I16s")
+
+
+def _strong(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class Signature:
+    # Length and strong checksum of each block of one version of a file, enough to diff against it
+    def __init__(self, block_sizes=BLOCK_SIZES):
+        self.block_sizes = tuple(block_sizes)
+        self.strong = {}
+        self.entries = []
+        self.size = 0
+
+    def add_block(self, data):
+        strong = _strong(data)
+        self._add(len(data), strong)
+        return strong
+
+    def _add(self, length, strong):
+        self.strong.setdefault(strong, self.size)
+        self.entries.append(_SIG_ENTRY.pack(length, strong))
+        self.size += length
+
+    @classmethod
+    def from_file(cls, file_path, block_sizes=BLOCK_SIZES):
+        signature = cls(block_sizes)
+        with open(file_path, 'rb') as src:
+            for data in content_chunks(src, *block_sizes):
+                signature.add_block(data)
+        return signature
+
+    @classmethod
+    def load(cls, sig_path):
+        with open(sig_path, 'rb') as src:
+            if src.read(len(SIGNATURE_MAGIC)) != SIGNATURE_MAGIC:
+                raise ValueError(f"Not a signature file: {sig_path}")
+            min_size, avg_size, max_size, count = _SIG_HEADER.unpack(src.read(_SIG_HEADER.size))
+            entries = src.read(count * _SIG_ENTRY.size)
+        if len(entries) != count * _SIG_ENTRY.size:
+            raise ValueError(f"Truncated signature file: {sig_path}")
+        signature = cls((min_size, avg_size, max_size))
+        for length, strong in _SIG_ENTRY.iter_unpack(entries):
+            signature._add(length, strong)
+        return signature
+
+    def write(self, sig_path):
+        tmp_path = f"{sig_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as dst:
+            dst.write(SIGNATURE_MAGIC)
+            dst.write(_SIG_HEADER.pack(*self.block_sizes, len(self.entries)))
+            dst.write(b"".join(self.entries))
+        os.replace(tmp_path, sig_path)
+        return os.path.getsize(sig_path)
+
+
+class _DeltaWriter:
+    def __init__(self, dst):
+        self.dst = dst
+        self.copy_offset = None
+        self.copy_length = 0
+        self.literal = bytearray()
+        self.copied_bytes = 0
+        self.literal_bytes = 0
+
+    def copy(self, offset, length):
+        self.flush_literal()
+        if self.copy_offset is not None and self.copy_offset + self.copy_length == offset \
+                and self.copy_length + length < 0xFFFFFFFF:
+            self.copy_length += length
+        else:
+            self.flush_copy()
+            self.copy_offset, self.copy_length = offset, length
+        self.copied_bytes += length
+
+    def literal_bytes_from(self, data):
+        if not data:
+            return
+        self.flush_copy()
+        self.literal += data
+        if len(self.literal) >= MAX_LITERAL:
+            self.flush_literal()
+
+    def pending_literal_bytes(self):
+        return self.literal_bytes + len(self.literal)
+
+    def flush_copy(self):
+        if self.copy_offset is not None:
+            self.dst.write(_COPY + _COPY_STRUCT.pack(self.copy_offset, self.copy_length))
+            self.copy_offset, self.copy_length = None, 0
+
+    def flush_literal(self):
+        if self.literal:
+            self.dst.write(_LITERAL + _LEN_STRUCT.pack(len(self.literal)))
+            self.dst.write(self.literal)
+            self.literal_bytes += len(self.literal)
+            self.literal = bytearray()
+
+    def close(self):
+        self.flush_copy()
+        self.flush_literal()
+
+
+def write_delta(signature, target_path, delta_path, header, sig_path=None, max_literal_bytes=None):
+    # Streams target_path against the signature of the previous version and writes the
+    # COPY/LITERAL ops to delta_path. Optionally writes the signature of target_path too.
+    # Gives up as soon as more than max_literal_bytes of new data would have to be stored:
+    # returns None and leaves nothing behind, the caller is better off with a full copy.
+    signer = Signature(signature.block_sizes) if sig_path else None
+    file_hash = hashlib.sha256()
+    size = 0
+    too_large = False
+    tmp_path = f"{delta_path}.tmp-{os.getpid()}"
+    with open(target_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        header_bytes = json.dumps(header).encode('utf-8')
+        dst.write(DELTA_MAGIC + _LEN_STRUCT.pack(len(header_bytes)) + header_bytes)
+        writer = _DeltaWriter(dst)
+        for data in content_chunks(src, *signature.block_sizes):
+            strong = _strong(data)
+            file_hash.update(data)
+            size += len(data)
+            if signer:
+                signer._add(len(data), strong)
+            offset = signature.strong.get(strong)
+            if offset is not None:
+                writer.copy(offset, len(data))
+                continue
+            writer.literal_bytes_from(data)
+            if max_literal_bytes is not None and writer.pending_literal_bytes() > max_literal_bytes:
+                too_large = True
+                break
+        if not too_large:
+            writer.close()
+            # Size and hash are only known at the end; the trailer is readable from EOF
+            trailer = json.dumps({"size": size, "sha256": file_hash.hexdigest()}).encode('utf-8')
+            dst.write(_END + trailer + _LEN_STRUCT.pack(len(trailer)))
+    if too_large:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, delta_path)
+
+    stats = {
+        "size": size,
+        "sha256": file_hash.hexdigest(),
+        "copied_bytes": writer.copied_bytes,
+        "literal_bytes": writer.literal_bytes,
+        "delta_bytes": os.path.getsize(delta_path),
+        "signature_bytes": signer.write(sig_path) if signer else 0,
+    }
+    return stats
+
+
+def write_signature(file_path, sig_path, block_sizes=BLOCK_SIZES):
+    # Returns (signature size, SHA-256 of file_path) from a single read of the file
+    signature = Signature(block_sizes)
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as src:
+        for data in content_chunks(src, *block_sizes):
+            signature.add_block(data)
+            file_hash.update(data)
+    return signature.write(sig_path), file_hash.hexdigest()
+
+
+def read_delta_header(delta_path):
+    # Header fields (base, depth, ...) merged with the trailer (size, sha256)
+    with open(delta_path, 'rb') as src:
+        header = _read_header(src, delta_path)
+        src.seek(-_LEN_STRUCT.size, os.SEEK_END)
+        (length,) = _LEN_STRUCT.unpack(src.read(_LEN_STRUCT.size))
+        src.seek(-(_LEN_STRUCT.size + length), os.SEEK_END)
+        header.update(json.loads(src.read(length).decode('utf-8')))
+    return header
+
+
+def _read_header(src, delta_path):
+    if src.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise ValueError(f"Not a delta file: {delta_path}")
+    (length,) = _LEN_STRUCT.unpack(src.read(_LEN_STRUCT.size))
+    return json.loads(src.read(length).decode('utf-8'))
+
+
+def apply_delta(base_path, delta_path, output_path):
+    with open(delta_path, 'rb') as delta, open(base_path, 'rb') as base, open(output_path, 'wb') as dst:
+        header = _read_header(delta, delta_path)
+        while True:
+            op = delta.read(1)
+            if not op or op == _END:
+                break
+            if op == _COPY:
+                offset, length = _COPY_STRUCT.unpack(delta.read(_COPY_STRUCT.size))
+                base.seek(offset)
+                while length:
+                    data = base.read(min(length, READ_SIZE))
+                    if not data:
+                        raise IOError(f"Delta {delta_path} references data past the end of {base_path}")
+                    dst.write(data)
+                    length -= len(data)
+            elif op == _LITERAL:
+                (length,) = _LEN_STRUCT.unpack(delta.read(_LEN_STRUCT.size))
+                dst.write(delta.read(length))
+            else:
+                raise ValueError(f"Corrupted delta file {delta_path}: unknown op {op!r}")
+    logging.debug(f"Applied delta {delta_path} onto {base_path}")
+    return header
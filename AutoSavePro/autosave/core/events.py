@@ -0,0 +1,28 @@
+import logging
+import threading
+
+
+class Signal:
+    # Plain callback list standing in for a Qt signal, so the core runs without Qt.
+    # emit() calls every subscriber synchronously on the emitting thread; a GUI that
+    # needs to touch widgets must hand the call over to its own thread (the log view
+    # buffers messages and a Qt signal can be connected as a subscriber too).
+    def __init__(self):
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def connect(self, callback):
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks = self._callbacks + [callback]
+
+    def disconnect(self, callback):
+        with self._lock:
+            self._callbacks = [existing for existing in self._callbacks if existing != callback]
+
+    def emit(self, *args):
+        for callback in self._callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"Error in signal subscriber {callback!r}: {str(e)}")
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from autosave.utils.file_utils import normalize_path
+
+FINGERPRINTS_NAME = "fingerprints.json"
+HASH_BUFFER_SIZE = 1024 * 1024
+# A file modified this close to when we fingerprinted it may have changed again within
+# the same mtime tick, so a matching stat is not trusted without hashing (git's "racy clean")
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+def stream_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as src:
+        while True:
+            data = src.read(HASH_BUFFER_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class FingerprintCache:
+    # Remembers (size, mtime_ns, inode, sha256) of each file as of its last snapshot
+    def __init__(self, path, hash_when_unsure=True, flush_interval=30):
+        self.path = path
+        self.hash_when_unsure = hash_when_unsure
+        self.flush_interval = flush_interval
+        self._entries = {}
+        # Hashes of changed files computed by is_unchanged, for the save that follows
+        self._computed = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self.checks = 0
+        self.stat_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+        self.bytes_skipped = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as src:
+                self._entries = json.load(src)
+            logging.info(f"Loaded {len(self._entries)} file fingerprints from {self.path}")
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable fingerprint cache {self.path}: {str(e)}")
+            self._entries = {}
+
+    def is_unchanged(self, file_path):
+        key = normalize_path(file_path)
+        with self._lock:
+            self.checks += 1
+            entry = self._entries.get(key)
+        if entry is None:
+            return self._miss()
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return self._miss()
+        if st.st_size != entry["size"]:
+            return self._miss()
+
+        same_stat = st.st_mtime_ns == entry["mtime_ns"] and st.st_ino == entry["inode"]
+        racy = entry["recorded_ns"] - entry["mtime_ns"] < RACY_WINDOW_NS
+        if same_stat and not racy:
+            with self._lock:
+                self.stat_hits += 1
+                self.bytes_skipped += st.st_size
+            return True
+        if not self.hash_when_unsure or not entry.get("sha256"):
+            return self._miss()
+
+        hashed_ns = time.time_ns()
+        try:
+            digest = stream_sha256(file_path)
+        except OSError:
+            return self._miss()
+        if digest != entry["sha256"]:
+            with self._lock:
+                self._computed[key] = (st.st_size, st.st_mtime_ns, st.st_ino, hashed_ns, digest)
+            return self._miss()
+        with self._lock:
+            self.hash_hits += 1
+            self.bytes_skipped += st.st_size
+            # Same content under a new stat: trust the new stat from now on
+            entry.update(mtime_ns=st.st_mtime_ns, inode=st.st_ino, recorded_ns=time.time_ns())
+            self._dirty = True
+        return True
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+        return False
+
+    def computed_hash(self, file_path, st):
+        # The sha256 is_unchanged computed for exactly this version of the file (same stat,
+        # not racy), or None
+        with self._lock:
+            computed = self._computed.pop(normalize_path(file_path), None)
+        if computed is None:
+            return None
+        size, mtime_ns, inode, hashed_ns, digest = computed
+        if (size, mtime_ns, inode) != (st.st_size, st.st_mtime_ns, st.st_ino) or hashed_ns - mtime_ns < RACY_WINDOW_NS:
+            return None
+        return digest
+
+    def record(self, file_path, st, file_hash):
+        # st must be taken before the file was read for the snapshot. file_hash may be
+        # None, the stat alone then decides whether the file is unchanged
+        with self._lock:
+            self._computed.pop(normalize_path(file_path), None)
+            self._entries[normalize_path(file_path)] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "inode": st.st_ino,
+                "sha256": file_hash,
+                "recorded_ns": time.time_ns(),
+            }
+            self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def forget(self, file_path):
+        with self._lock:
+            if self._entries.pop(normalize_path(file_path), None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as dst:
+                json.dump(snapshot, dst)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Error writing fingerprint cache {self.path}: {str(e)}")
+            with self._lock:
+                self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "checks": self.checks,
+                "stat_hits": self.stat_hits,
+                "hash_hits": self.hash_hits,
+                "misses": self.misses,
+                "bytes_skipped": self.bytes_skipped,
+            }
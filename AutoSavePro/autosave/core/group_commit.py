@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+import logging
+import threading
+
+SYNC_MODES = ("group", "always", "none")
+
+# syncfs(2) flushes a whole filesystem in one journal commit; Linux only, reached through libc
+_syncfs = None
+if sys.platform.startswith("linux"):
+    try:
+        import ctypes
+        _syncfs = ctypes.CDLL(None, use_errno=True).syncfs
+    except (ImportError, OSError, AttributeError):
+        _syncfs = None
+
+
+def temp_path(final_path):
+    return f"{final_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _fsync_file(path):
+    # Windows can only flush a handle opened for writing
+    fd = os.open(path, os.O_RDWR if os.name == 'nt' else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _sync_filesystem(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if _syncfs(fd) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(path):
+    # Makes renames in path durable; NTFS journals them and has no directory handles
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _CommitRequest:
+    def __init__(self, renames, depends):
+        self.renames = list(renames)
+        self.depends = list(depends)
+        self.error = None
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    # Files are written under a temporary name, then committed: flushed to disk, renamed to
+    # their final name and their directory fsynced. In "group" mode one committer thread does
+    # this for every request that arrived within max_delay, so a burst of saves shares its
+    # syncs: the data of the whole batch is flushed before any rename, with one syncfs per
+    # filesystem where available (each file is fsynced elsewhere), then each directory is
+    # fsynced once. "always" syncs each commit on its own, "none" only renames (atomic but
+    # not durable).
+    def __init__(self, sync_mode="group", max_delay=0.01, max_batch=128):
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {sync_mode}")
+        self.sync_mode = sync_mode
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.batches = 0
+        self.files = 0
+        self.fsyncs = 0
+        self.largest_batch = 0
+
+    def commit(self, renames, depends=()):
+        # renames/depends: (temp path, final path) pairs. Every depends pair is durable
+        # before any renames pair becomes visible (chunks before the manifest using them).
+        # Blocks until the batch holding this request is on disk; raises if it failed.
+        request = _CommitRequest(renames, depends)
+        if not request.renames and not request.depends:
+            return
+        if self.sync_mode != "group":
+            self._apply([request])
+        else:
+            with self._condition:
+                if self._stopped:
+                    raise RuntimeError("Group committer is stopped")
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                    self._thread.start()
+                self._pending.append(request)
+                self._condition.notify_all()
+            request.done.wait()
+        if request.error is not None:
+            self.discard(request.depends + request.renames)
+            raise request.error
+
+    def discard(self, staged):
+        # Removes temporary files left by a save that failed before or during its commit
+        for tmp_path, _ in staged:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Could not remove temporary file {tmp_path}: {str(e)}")
+
+    def stop(self):
+        # Commits whatever is still pending, then stops the committer thread
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                # The first request opens the batch; later ones join it until max_delay
+                deadline = time.monotonic() + self.max_delay
+                while len(self._pending) < self.max_batch and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            try:
+                self._apply(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = request.error or e
+            for request in batch:
+                request.done.set()
+
+    def _apply(self, batch):
+        durable = self.sync_mode != "none"
+        fsyncs = self._flush_data(batch) if durable else 0
+
+        for phase in ("depends", "renames"):
+            directories = {}
+            for request in batch:
+                if request.error is not None:
+                    continue
+                try:
+                    for tmp_path, final_path in getattr(request, phase):
+                        os.replace(tmp_path, final_path)
+                        directories.setdefault(os.path.dirname(os.path.abspath(final_path)), []).append(request)
+                except OSError as e:
+                    request.error = e
+            if not durable:
+                continue
+            for directory, requests in directories.items():
+                try:
+                    fsync_directory(directory)
+                    fsyncs += 1
+                except OSError as e:
+                    logging.error(f"Could not sync directory {directory}: {str(e)}")
+                    for request in requests:
+                        request.error = request.error or e
+
+        with self._condition:
+            self.batches += 1
+            self.files += sum(len(request.depends) + len(request.renames) for request in batch)
+            self.fsyncs += fsyncs
+            self.largest_batch = max(self.largest_batch, len(batch))
+        logging.debug(f"Committed {len(batch)} saves with {fsyncs} fsyncs")
+
+    def _flush_data(self, batch):
+        # Makes the content of every temporary file of the batch durable before the renames.
+        # Files are grouped by filesystem: a single file is fsynced, several share a syncfs.
+        devices = {}
+        for request in batch:
+            try:
+                for tmp_path, _ in request.depends + request.renames:
+                    device = devices.setdefault(os.stat(tmp_path).st_dev, ([], set()))
+                    device[0].append(tmp_path)
+                    device[1].add(request)
+            except OSError as e:
+                request.error = e
+        fsyncs = 0
+        for paths, requests in devices.values():
+            try:
+                if _syncfs is not None and len(paths) > 1:
+                    _sync_filesystem(paths[0])
+                    fsyncs += 1
+                else:
+                    for tmp_path in paths:
+                        _fsync_file(tmp_path)
+                        fsyncs += 1
+            except OSError as e:
+                logging.error(f"Could not flush {len(paths)} files to disk: {str(e)}")
+                for request in requests:
+                    request.error = request.error or e
+        return fsyncs
+
+    def stats(self):
+        with self._condition:
+            return {
+                "sync_mode": self.sync_mode,
+                "batches": self.batches,
+                "files": self.files,
+                "fsyncs": self.fsyncs,
+                "largest_batch": self.largest_batch,
+                "pending": len(self._pending),
+            }
@@ -0,0 +1,208 @@
+import os
+import mmap
+import difflib
+import tempfile
+import contextlib
+
+HISTORY_PAGE_SIZE = 200
+DIFF_CONTEXT = 3
+# Past these the diff is summarised: difflib is quadratic on the changed region
+MAX_DIFF_BYTES = 1024 * 1024
+MAX_DIFF_LINES = 5000
+PREVIEW_BYTES = 64 * 1024
+COMPARE_BLOCK = 64 * 1024
+COUNT_BLOCK = 1024 * 1024
+BINARY_SNIFF = 8192
+
+
+class HistoryPager:
+    # Walks the history of an app (or of one of its files) newest first, one page at a
+    # time. The position is the last row handed out, so snapshots added or deleted by
+    # retention meanwhile never shift the pages still to come.
+    def __init__(self, catalog, app, file_name=None, page_size=HISTORY_PAGE_SIZE):
+        self.catalog = catalog
+        self.app = app
+        self.file_name = file_name
+        self.page_size = page_size
+        self.before = None
+        self.exhausted = False
+
+    def next_page(self):
+        if self.exhausted:
+            return []
+        rows = self.catalog.page(self.app, self.file_name, self.before, self.page_size)
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if rows:
+            self.before = (rows[-1]["timestamp"], rows[-1]["id"])
+        return rows
+
+    def total(self):
+        return self.catalog.count(self.app, self.file_name)
+
+
+def previous_version(catalog, row):
+    # The snapshot of the same file just before `row`, or None for its first version
+    rows = catalog.page(row["app"], row["file_name"], (row["timestamp"], row["id"]), 1)
+    return rows[0] if rows else None
+
+
+@contextlib.contextmanager
+def _mapped(path):
+    with open(path, 'rb') as src:
+        if os.fstat(src.fileno()).st_size == 0:
+            yield b""  # empty files cannot be mapped
+            return
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+@contextlib.contextmanager
+def open_snapshot(saver, save_path):
+    # Yields the content of a snapshot as a read-only buffer. Plain copies are mapped in
+    # place and packed ones come from the pack store; the other kinds are rebuilt in a
+    # temporary file, which is mapped and removed afterwards.
+    storage = saver.storage_of(save_path)
+    if storage == "packed":
+        yield saver.pack_store.get(saver.pack_key(save_path))
+        return
+    if storage == "copy":
+        with _mapped(save_path) as buffer:
+            yield buffer
+        return
+    with tempfile.TemporaryDirectory(prefix="autosave-history-") as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, os.path.basename(save_path))
+        saver.materialize(save_path, tmp_path, storage)
+        with _mapped(tmp_path) as buffer:
+            yield buffer
+
+
+def _first_difference(x, y):
+    # Index of the first differing byte (or the shorter length); slices compare at memcmp speed
+    low, high = 0, min(len(x), len(y))
+    while low < high:
+        middle = (low + high) // 2
+        if x[low:middle + 1] == y[low:middle + 1]:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _common_prefix(a, b):
+    limit = min(len(a), len(b))
+    position = 0
+    while position < limit:
+        end = min(position + COMPARE_BLOCK, limit)
+        block_a, block_b = a[position:end], b[position:end]
+        if block_a != block_b:
+            return position + _first_difference(block_a, block_b)
+        position = end
+    return limit
+
+
+def _common_suffix(a, b, limit):
+    length = 0
+    while length < limit:
+        end = min(length + COMPARE_BLOCK, limit)
+        block_a = a[len(a) - end:len(a) - length]
+        block_b = b[len(b) - end:len(b) - length]
+        if block_a != block_b:
+            return length + _first_difference(block_a[::-1], block_b[::-1])
+        length = end
+    return limit
+
+
+def _count_lines(buffer, end):
+    return sum(buffer[position:min(position + COUNT_BLOCK, end)].count(b'\n')
+               for position in range(0, end, COUNT_BLOCK))
+
+
+def _split_lines(data):
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    return [line.rstrip(b'\r').decode('utf-8', 'replace') for line in lines]
+
+
+def _is_binary(data):
+    return b'\0' in data[:BINARY_SNIFF]
+
+
+def _unified_range(start, length):
+    # Same notation as diff -u: 1-based, ",length" unless it is 1
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def diff_buffers(old, new, old_label="old", new_label="new", context=DIFF_CONTEXT,
+                 max_bytes=MAX_DIFF_BYTES, max_lines=MAX_DIFF_LINES):
+    # Unified diff of two buffers (bytes or mmaps) as a list of lines. Versions of a file
+    # mostly share a long head and tail: those are skipped with block compares on the
+    # buffers, and only the changed lines in between (plus context) are decoded and diffed.
+    if len(old) == len(new) and _common_prefix(old, new) == len(old):
+        return []
+    header = [f"--- {old_label}", f"+++ {new_label}"]
+    if _is_binary(old) or _is_binary(new):
+        return header + [f"Binary files differ ({len(old)} -> {len(new)} bytes)"]
+
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    # Widen the changed region to whole lines, then by `context` lines on each side.
+    # Bytes before `prefix` and in the suffix are the same in both buffers, so a newline
+    # found there is at the same place in both.
+    start = old.rfind(b'\n', 0, prefix) + 1
+    for _ in range(context):
+        if start == 0:
+            break
+        start = old.rfind(b'\n', 0, start - 1) + 1
+    tail = 0
+    suffix_start = len(old) - suffix
+    for _ in range(context + 1):
+        newline = old.find(b'\n', suffix_start + tail)
+        if newline < 0:
+            tail = suffix
+            break
+        tail = newline + 1 - suffix_start
+    old_end, new_end = suffix_start + tail, len(new) - suffix + tail
+    if max(old_end, new_end) - start > max_bytes:
+        return header + [f"Changes too large to show ({old_end - start} -> {new_end - start} bytes)"]
+
+    first_line = _count_lines(old, start)
+    old_lines = _split_lines(old[start:old_end])
+    new_lines = _split_lines(new[start:new_end])
+    lines = list(header)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    for group in matcher.get_grouped_opcodes(context):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        lines.append(f"@@ -{_unified_range(first_line + i1, i2 - i1)} "
+                     f"+{_unified_range(first_line + j1, j2 - j1)} @@")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == 'equal':
+                lines.extend(' ' + line for line in old_lines[a1:a2])
+                continue
+            lines.extend('-' + line for line in old_lines[a1:a2])
+            lines.extend('+' + line for line in new_lines[b1:b2])
+        if len(lines) > max_lines:
+            lines = lines[:max_lines]
+            lines.append(f"... diff truncated after {max_lines} lines")
+            break
+    return lines
+
+
+def diff_snapshots(saver, old_path, new_path, context=DIFF_CONTEXT):
+    with open_snapshot(saver, old_path) as old, open_snapshot(saver, new_path) as new:
+        return diff_buffers(old, new, os.path.basename(old_path), os.path.basename(new_path), context)
+
+
+def preview_snapshot(saver, save_path, max_bytes=PREVIEW_BYTES):
+    # Start of a snapshot, for the first version of a file where there is nothing to diff against
+    with open_snapshot(saver, save_path) as buffer:
+        head = buffer[:max_bytes]
+        if _is_binary(head):
+            return [f"Binary file, {len(buffer)} bytes"]
+        lines = _split_lines(head)
+        if len(buffer) > max_bytes:
+            lines.append(f"... {len(buffer) - max_bytes} more bytes")
+        return lines
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+# Seconds; covers a sub-millisecond tick up to a multi-minute save
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # The unlabelled series
+        return self.labels()
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, function):
+        # Read at scrape time: a count the program already keeps costs nothing to export
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            try:
+                value = child.get()
+            except Exception as e:
+                logging.debug(f"Counter {self.name} unavailable: {str(e)}")
+                continue
+            yield self.name, _label_text(self.labelnames, values), value
+
+
+class _GaugeValue:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            try:
+                value = child.get()
+            except Exception as e:
+                logging.debug(f"Gauge {self.name} unavailable: {str(e)}")
+                continue
+            yield self.name, _label_text(self.labelnames, values), value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return _Timer(self._default())
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield (self.name + "_bucket",
+                       _label_text(self.labelnames + ("le",), values + (le,)), cumulative)
+            yield self.name + "_sum", _label_text(self.labelnames, values), total
+            yield self.name + "_count", _label_text(self.labelnames, values), count
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    # Metrics are created once (get-or-create by name) and updated in place; nothing is
+    # formatted until somebody scrapes or dumps the registry
+    def __init__(self, prefix="autosave_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labelnames, **kwargs):
+        full_name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, help_text, labelnames, **kwargs)
+                if not metric.labelnames:
+                    metric.labels()  # exported as 0 before the first update
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {full_name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text="", labelnames=()):
+        # Prometheus text format 0.0.4 wants the _total suffix on the family name too
+        if not name.endswith("_total"):
+            name += "_total"
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text="", labelnames=()):
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        result = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            for sample_name, labels, value in metric.samples():
+                result[sample_name + labels] = value
+        return result
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    # Serves the registry as Prometheus text on http://<host>:<port>/metrics (localhost only
+    # by default) and/or rewrites a JSON file every dump_interval seconds
+    def __init__(self, registry=REGISTRY, port=None, host="127.0.0.1", dump_path=None, dump_interval=60):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._server = None
+        self._threads = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self.port is not None:
+            # Imported here: http.server is one of the slowest imports of the core
+            from http.server import ThreadingHTTPServer
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            self._spawn(self._server.serve_forever, "metrics-http")
+            logging.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+        if self.dump_path is not None:
+            self._spawn(self._dump_loop, "metrics-dump")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would flood the log
+
+        return Handler
+
+    def _dump_loop(self):
+        while not self._stopped.wait(self.dump_interval):
+            self.dump()
+
+    def dump(self):
+        tmp_path = f"{self.dump_path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as dst:
+                json.dump({"timestamp": time.time(), "metrics": self.registry.as_dict()}, dst, indent=1)
+            os.replace(tmp_path, self.dump_path)
+        except Exception as e:
+            logging.error(f"Error writing metrics to {self.dump_path}: {str(e)}")
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.dump_path is not None:
+            self.dump()
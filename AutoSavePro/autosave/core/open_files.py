@@ -0,0 +1,131 @@
+import os
+import sys
+import stat
+import logging
+import threading
+import psutil
+
+# Same message for both backends when a process cannot be inspected
+UNAVAILABLE = "Unable to access files for {}: {}"
+
+
+class PsutilOpenFiles:
+    # Portable backend: psutil lists every descriptor again on each call
+    def open_files(self, proc):
+        try:
+            return [file.path for file in proc.open_files()]
+        except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
+            logging.warning(UNAVAILABLE.format(proc.info['name'], str(e)))
+            return []
+
+    def retain(self, pids):
+        pass
+
+    def stats(self):
+        return {"backend": "psutil"}
+
+
+class _ProcessFds:
+    def __init__(self, create_time):
+        self.create_time = create_time
+        self.targets = {}  # fd name -> link target
+        self.regular = {}  # link target -> is a regular file
+
+
+class ProcFdOpenFiles:
+    # Linux backend reading /proc/<pid>/fd. The last answer of each process is kept under
+    # (pid, create_time), so a recycled pid never reuses it. Each call lists the fd directory
+    # and reads the links; only a descriptor whose target changed since the last call is
+    # stat()ed again. psutil reads the link, stats the target and opens /proc/<pid>/fdinfo
+    # for every descriptor on every call, for the same list of regular files.
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+        self._processes = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.readlinks = 0
+        self.stats_done = 0
+
+    @staticmethod
+    def available():
+        return sys.platform.startswith("linux") and os.path.isdir("/proc/self/fd")
+
+    def open_files(self, proc):
+        try:
+            create_time = proc.create_time()
+            fd_dir = os.path.join(self.proc_root, str(proc.pid), "fd")
+            names = os.listdir(fd_dir)
+        except (psutil.NoSuchProcess, FileNotFoundError, ProcessLookupError):
+            logging.warning(UNAVAILABLE.format(proc.info['name'], "process no longer exists"))
+            self._forget(proc.pid)
+            return []
+        except (psutil.AccessDenied, PermissionError) as e:
+            logging.warning(UNAVAILABLE.format(proc.info['name'], str(e)))
+            return []
+
+        with self._lock:
+            cached = self._processes.get(proc.pid)
+            if cached is None or cached.create_time != create_time:
+                cached = self._processes[proc.pid] = _ProcessFds(create_time)
+        targets = {}
+        regular = {}
+        files = []
+        readlinks = stats_done = 0
+        for name in sorted(names, key=int):
+            try:
+                target = os.readlink(os.path.join(fd_dir, name))
+            except OSError:
+                continue  # closed since the directory was listed
+            readlinks += 1
+            targets[name] = target
+            # Sockets, pipes and anon inodes ("socket:[123]") are never files
+            if not target.startswith('/'):
+                continue
+            is_regular = regular.get(target)
+            if is_regular is None:
+                if cached.targets.get(name) == target and target in cached.regular:
+                    is_regular = cached.regular[target]
+                else:
+                    is_regular = self._is_regular(target)
+                    stats_done += 1
+                regular[target] = is_regular
+            if is_regular:
+                files.append(target)
+        cached.targets = targets
+        cached.regular = regular
+        with self._lock:
+            self.scans += 1
+            self.readlinks += readlinks
+            self.stats_done += stats_done
+        return files
+
+    def _is_regular(self, path):
+        # Deleted files show up as "/path (deleted)" and fail here, as they do in psutil
+        try:
+            return stat.S_ISREG(os.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def _forget(self, pid):
+        with self._lock:
+            self._processes.pop(pid, None)
+
+    def retain(self, pids):
+        # Drops the cache of every process that has exited
+        with self._lock:
+            for pid in set(self._processes) - set(pids):
+                del self._processes[pid]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "procfs",
+                "processes": len(self._processes),
+                "scans": self.scans,
+                "readlinks": self.readlinks,
+                "stats": self.stats_done,
+            }
+
+
+def default_open_files():
+    return ProcFdOpenFiles() if ProcFdOpenFiles.available() else PsutilOpenFiles()
@@ -0,0 +1,546 @@
+import os
+import re
+import json
+import mmap
+import time
+import struct
+import hashlib
+import logging
+import threading
+from autosave.core.group_commit import fsync_directory
+
+PACKS_DIRECTORY = ".packs"
+# Packed snapshots have no file of their own; their catalog path ends with this suffix
+PACKED_SUFFIX = ".packed"
+PACK_SIZE = 64 * 1024 * 1024
+# Files up to this size are packed, bigger ones are saved as plain copies
+PACK_THRESHOLD = 1024 * 1024
+
+PACK_NAME = re.compile(r"^pack-(\d{6})\.pack$")
+INDEX_NAME = "index"
+
+# Record: magic, type, key length, data length, timestamp, sha256 of the data, metadata
+# length; then the key (utf-8), the metadata (JSON, e.g. the original path) and the data.
+# Records describe themselves, so the index can always be rebuilt by reading the packs
+# in order.
+RECORD = struct.Struct("<4sBHQd32sH")
+RECORD_MAGIC = b"ASPR"
+PUT = 1
+DELETE = 2  # data is the id of the pack holding the record it cancels
+
+# Index: header, then an open-addressing hash table of fixed-size slots, memory-mapped.
+# A slot holds a 64-bit hash of the key and where its record is; keys themselves are
+# only compared (against the record) when two hashes are equal.
+INDEX_HEADER = struct.Struct("<8sQQQIQI")
+INDEX_MAGIC = b"ASPKIDX1"
+INDEX_HEADER_SIZE = 64
+SLOT = struct.Struct("<QIQQI")
+SLOT_SIZE = 32
+LIVE = 1
+TOMBSTONE = 2
+MIN_CAPACITY = 1024
+MAX_LOAD = 0.5
+FLUSH_EVERY = 1024
+
+
+def _key_hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little') or 1
+
+
+def _pack_path(root, pack_id):
+    return os.path.join(root, f"pack-{pack_id:06d}.pack")
+
+
+def _pack_ids(root):
+    ids = []
+    for name in os.listdir(root):
+        match = PACK_NAME.match(name)
+        if match:
+            ids.append(int(match.group(1)))
+    return sorted(ids)
+
+
+def scan_packs(root):
+    # Read-only listing of the live snapshots in a pack directory, straight from the packs:
+    # (key, timestamp, size, sha256, metadata dict). Safe while a PackStore (maybe in
+    # another process) has the directory open: the index is not used, nothing is written
+    # or truncated, and a record still being appended at the end of a pack is not listed.
+    live = {}
+    for pack_id in _pack_ids(root):
+        try:
+            src = open(_pack_path(root, pack_id), 'rb')
+        except FileNotFoundError:
+            continue  # removed by a compaction; its live records are in a later pack
+        with src:
+            while True:
+                record = PackStore._read_record(src)
+                if record is None:
+                    break
+                kind, key_bytes, meta, data, timestamp, digest = record
+                if kind == PUT:
+                    live[key_bytes] = (pack_id, timestamp, len(data), digest, meta)
+                elif key_bytes in live and live[key_bytes][0] == int.from_bytes(data, 'little'):
+                    del live[key_bytes]
+    for key_bytes, (_, timestamp, size, digest, meta) in live.items():
+        yield key_bytes.decode('utf-8'), timestamp, size, digest.hex(), json.loads(meta) if meta else {}
+
+
+class PackStore:
+    # Small snapshots appended to rolling pack files instead of one file each. Lookups go
+    # through the memory-mapped index (one probe in the common case, then a single read
+    # of the record). Deleting only marks the record dead; compact() rewrites packs that
+    # are mostly dead. The index is written back every FLUSH_EVERY changes together with
+    # a high-water mark, and records after the mark are replayed when the store is opened.
+    def __init__(self, root, pack_size=PACK_SIZE, sync_mode="group"):
+        self.root = root
+        self.pack_size = pack_size
+        self.sync_mode = sync_mode
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._synced = (0, 0)
+        self._readers = {}
+        self._writer = None
+        self._index = None
+        self._changes = 0
+        self.compacted_bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self._open_index()
+
+    # -- files
+
+    def pack_path(self, pack_id):
+        return _pack_path(self.root, pack_id)
+
+    def pack_ids(self):
+        return _pack_ids(self.root)
+
+    def _open_writer(self):
+        ids = self.pack_ids()
+        self._current_id = ids[-1] if ids else 1
+        self._writer = open(self.pack_path(self._current_id), 'ab')
+        self._current_size = self._writer.tell()
+        if not ids:
+            fsync_directory(self.root)
+        self._synced = (self._current_id, self._current_size)
+
+    def _roll(self):
+        # The full pack is made durable before the next one is started
+        self._writer.flush()
+        if self.sync_mode != "none":
+            os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._synced = max(self._synced, (self._current_id, self._current_size))
+        self._current_id += 1
+        self._writer = open(self.pack_path(self._current_id), 'ab')
+        self._current_size = 0
+        if self.sync_mode != "none":
+            fsync_directory(self.root)
+
+    def _append(self, record):
+        if self._current_size and self._current_size + len(record) > self.pack_size:
+            self._roll()
+        offset = self._current_size
+        self._writer.write(record)
+        self._writer.flush()
+        self._current_size += len(record)
+        return self._current_id, offset
+
+    def _sync(self, position):
+        # Group sync: one fsync covers every record appended before it started, so
+        # concurrent savers whose record is already covered return at once
+        if self.sync_mode == "none":
+            return
+        with self._sync_lock:
+            if position <= self._synced:
+                return
+            with self._lock:
+                target = (self._current_id, self._current_size)
+                fd = os.dup(self._writer.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced = max(self._synced, target)
+
+    def _read_at(self, pack_id, offset, length):
+        with self._lock:
+            reader = self._readers.get(pack_id)
+            if reader is None:
+                reader = self._readers[pack_id] = open(self.pack_path(pack_id), 'rb')
+            reader.seek(offset)
+            return reader.read(length)
+
+    # -- index
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_NAME)
+
+    def _open_index(self):
+        replay_from = (0, 0)
+        try:
+            self._map_index()
+            _, _, _, _, pack_id, offset, clean = INDEX_HEADER.unpack_from(self._index, 0)
+            if not clean:
+                # Slots may be newer than the counters in the header after a crash
+                self._recount()
+            replay_from = (pack_id, offset)
+            # The mark must not point past what the packs really hold (lost unsynced tail)
+            if pack_id and (not os.path.exists(self.pack_path(pack_id)) or
+                            os.path.getsize(self.pack_path(pack_id)) < offset):
+                raise ValueError("index is ahead of the pack files")
+        except (OSError, ValueError, struct.error) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"Rebuilding pack index in {self.root}: {str(e)}")
+            self._close_index()
+            self._write_index([], MIN_CAPACITY)
+            self._map_index()
+            replay_from = (0, 0)
+        replayed = self._replay(*replay_from)
+        self._open_writer()
+        # Marked unclean on disk until close()
+        self.flush()
+        if replayed:
+            logging.info(f"Pack index in {self.root}: replayed {replayed} records")
+
+    def _map_index(self):
+        self._index_file = open(self._index_path(), 'r+b')
+        try:
+            self._index = mmap.mmap(self._index_file.fileno(), 0)
+        except (OSError, ValueError):
+            self._index_file.close()
+            raise
+        magic, self._capacity, self._count, self._tombstones, _, _, _ = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or len(self._index) != INDEX_HEADER_SIZE + self._capacity * SLOT_SIZE:
+            raise ValueError("bad index header")
+
+    def _close_index(self):
+        if self._index is not None:
+            self._index.close()
+            self._index_file.close()
+            self._index = None
+
+    def _write_index(self, slots, capacity, mark=(0, 0)):
+        # Writes a fresh table holding `slots` (key hash, pack id, offset, length)
+        table = bytearray(INDEX_HEADER_SIZE + capacity * SLOT_SIZE)
+        mask = capacity - 1
+        for key_hash, pack_id, offset, length in slots:
+            index = key_hash & mask
+            while SLOT.unpack_from(table, INDEX_HEADER_SIZE + index * SLOT_SIZE)[0]:
+                index = (index + 1) & mask
+            SLOT.pack_into(table, INDEX_HEADER_SIZE + index * SLOT_SIZE, key_hash, pack_id, offset, length, LIVE)
+        INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, capacity, len(slots), 0, mark[0], mark[1], 0)
+        tmp_path = f"{self._index_path()}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as dst:
+            dst.write(table)
+            dst.flush()
+            if self.sync_mode != "none":
+                os.fsync(dst.fileno())
+        os.replace(tmp_path, self._index_path())
+
+    def _slots(self, live_only=True):
+        for index in range(self._capacity):
+            key_hash, pack_id, offset, length, state = SLOT.unpack_from(self._index, INDEX_HEADER_SIZE + index * SLOT_SIZE)
+            if key_hash and (state == LIVE or not live_only):
+                yield index, key_hash, pack_id, offset, length, state
+
+    def _recount(self):
+        self._count = self._tombstones = 0
+        for _, _, _, _, _, state in self._slots(live_only=False):
+            if state == LIVE:
+                self._count += 1
+            else:
+                self._tombstones += 1
+
+    def _grow_if_needed(self):
+        if self._count + self._tombstones + 1 <= self._capacity * MAX_LOAD:
+            return
+        capacity = self._capacity
+        while self._count + 1 > capacity * MAX_LOAD / 2:
+            capacity *= 2
+        self._rehash(capacity)
+
+    def _rehash(self, capacity):
+        # Drops the tombstones; the table is rewritten and mapped again
+        slots = [(key_hash, pack_id, offset, length)
+                 for _, key_hash, pack_id, offset, length, _ in self._slots()]
+        mark = (self._current_id, self._current_size) if self._writer is not None else (0, 0)
+        self._close_index()
+        self._write_index(slots, capacity, mark)
+        self._map_index()
+
+    def _find(self, key_bytes):
+        # Returns (slot index, pack id, offset, length) of the live record for key, or None
+        key_hash = _key_hash(key_bytes)
+        mask = self._capacity - 1
+        index = key_hash & mask
+        while True:
+            slot_hash, pack_id, offset, length, state = SLOT.unpack_from(self._index, INDEX_HEADER_SIZE + index * SLOT_SIZE)
+            if not slot_hash:
+                return None
+            if slot_hash == key_hash and state == LIVE and self._record_key(pack_id, offset) == key_bytes:
+                return index, pack_id, offset, length
+            index = (index + 1) & mask
+
+    def _record_header(self, pack_id, offset, with_meta=False):
+        # (key, data length, timestamp, sha256, metadata) read from the start of a record
+        header = self._read_at(pack_id, offset, RECORD.size + 256)
+        _, _, key_length, data_length, timestamp, digest, meta_length = RECORD.unpack_from(header, 0)
+        needed = RECORD.size + key_length + (meta_length if with_meta else 0)
+        if needed > len(header):
+            header = self._read_at(pack_id, offset, needed)
+        meta = header[RECORD.size + key_length:needed] if with_meta else b""
+        return header[RECORD.size:RECORD.size + key_length], data_length, timestamp, digest, meta
+
+    def _record_key(self, pack_id, offset):
+        return self._record_header(pack_id, offset)[0]
+
+    def _index_put(self, key_bytes, pack_id, offset, length):
+        found = self._find(key_bytes)
+        if found is not None:
+            SLOT.pack_into(self._index, INDEX_HEADER_SIZE + found[0] * SLOT_SIZE,
+                           _key_hash(key_bytes), pack_id, offset, length, LIVE)
+            return
+        self._grow_if_needed()
+        key_hash = _key_hash(key_bytes)
+        mask = self._capacity - 1
+        index = key_hash & mask
+        while SLOT.unpack_from(self._index, INDEX_HEADER_SIZE + index * SLOT_SIZE)[0]:
+            index = (index + 1) & mask
+        SLOT.pack_into(self._index, INDEX_HEADER_SIZE + index * SLOT_SIZE, key_hash, pack_id, offset, length, LIVE)
+        self._count += 1
+
+    def _index_delete(self, key_bytes, only_pack=None):
+        found = self._find(key_bytes)
+        if found is None or (only_pack is not None and found[1] != only_pack):
+            return None
+        index, pack_id, offset, length = found
+        SLOT.pack_into(self._index, INDEX_HEADER_SIZE + index * SLOT_SIZE,
+                       _key_hash(key_bytes), pack_id, offset, length, TOMBSTONE)
+        self._count -= 1
+        self._tombstones += 1
+        return pack_id
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self, clean=False):
+        # Writes the index back and moves the replay mark to the end of the current pack
+        with self._lock:
+            INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, self._capacity, self._count, self._tombstones,
+                                   self._current_id, self._current_size, 1 if clean else 0)
+            self._index.flush()
+            self._changes = 0
+
+    # -- replay
+
+    def _replay(self, from_pack, from_offset):
+        replayed = 0
+        ids = [pack_id for pack_id in self.pack_ids() if pack_id >= from_pack]
+        for pack_id in ids:
+            path = self.pack_path(pack_id)
+            offset = from_offset if pack_id == from_pack else 0
+            with open(path, 'rb') as src:
+                src.seek(offset)
+                while True:
+                    record = self._read_record(src)
+                    if record is None:
+                        break
+                    kind, key_bytes, meta, data, _, _ = record
+                    length = RECORD.size + len(key_bytes) + len(meta) + len(data)
+                    if kind == PUT:
+                        self._index_put(key_bytes, pack_id, offset, length)
+                    else:
+                        self._index_delete(key_bytes, int.from_bytes(data, 'little'))
+                    offset += length
+                    replayed += 1
+                end = src.seek(0, os.SEEK_END)
+            if offset < end and pack_id == ids[-1]:
+                # A record torn by a crash at the end of the current pack
+                logging.warning(f"Truncating {path} at {offset} ({end - offset} bytes of incomplete record)")
+                with open(path, 'r+b') as dst:
+                    dst.truncate(offset)
+            elif offset < end:
+                logging.error(f"Unreadable record in {path} at {offset}, the rest of this pack is skipped")
+        return replayed
+
+    @staticmethod
+    def _read_record(src):
+        header = src.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None
+        magic, kind, key_length, data_length, timestamp, digest, meta_length = RECORD.unpack(header)
+        if magic != RECORD_MAGIC or kind not in (PUT, DELETE):
+            return None
+        key_bytes = src.read(key_length)
+        meta = src.read(meta_length)
+        data = src.read(data_length)
+        if len(key_bytes) < key_length or len(meta) < meta_length or len(data) < data_length:
+            return None
+        if kind == PUT and hashlib.sha256(data).digest() != digest:
+            return None
+        return kind, key_bytes, meta, data, timestamp, digest
+
+    # -- public API
+
+    def put_bytes(self, key, data, timestamp=None, meta=None):
+        # Returns the sha256 of data once the record is durable (per sync_mode). meta is a
+        # small dict kept with the record and handed back by entries()
+        key_bytes = key.encode('utf-8')
+        meta_bytes = json.dumps(meta).encode('utf-8') if meta else b""
+        digest = hashlib.sha256(data).digest()
+        record = RECORD.pack(RECORD_MAGIC, PUT, len(key_bytes), len(data),
+                             time.time() if timestamp is None else timestamp, digest,
+                             len(meta_bytes)) + key_bytes + meta_bytes + data
+        with self._lock:
+            pack_id, offset = self._append(record)
+            self._index_put(key_bytes, pack_id, offset, len(record))
+            self._changed()
+            position = (pack_id, offset + len(record))
+        self._sync(position)
+        return digest.hex()
+
+    def put_file(self, key, file_path, timestamp=None, meta=None):
+        # Returns (size, sha256)
+        with open(file_path, 'rb') as src:
+            data = src.read()
+        return len(data), self.put_bytes(key, data, timestamp, meta)
+
+    def contains(self, key):
+        with self._lock:
+            return self._find(key.encode('utf-8')) is not None
+
+    def get(self, key):
+        key_bytes = key.encode('utf-8')
+        with self._lock:
+            found = self._find(key_bytes)
+            if found is None:
+                raise KeyError(key)
+            record = self._read_at(found[1], found[2], found[3])
+        _, _, key_length, data_length, _, digest, meta_length = RECORD.unpack_from(record, 0)
+        data = record[RECORD.size + key_length + meta_length:]
+        if len(data) != data_length or hashlib.sha256(data).digest() != digest:
+            raise IOError(f"Packed snapshot {key} is corrupted")
+        return data
+
+    def restore(self, key, dest_path):
+        with open(dest_path, 'wb') as dst:
+            dst.write(self.get(key))
+
+    def delete(self, key):
+        # Returns False when key is not in the store
+        key_bytes = key.encode('utf-8')
+        with self._lock:
+            pack_id = self._index_delete(key_bytes)
+            if pack_id is None:
+                return False
+            data = pack_id.to_bytes(4, 'little')
+            record = RECORD.pack(RECORD_MAGIC, DELETE, len(key_bytes), len(data), time.time(), bytes(32), 0)
+            record_pack, offset = self._append(record + key_bytes + data)
+            self._changed()
+            position = (record_pack, offset + RECORD.size + len(key_bytes) + len(data))
+        self._sync(position)
+        return True
+
+    def entries(self):
+        # (key, timestamp, size, sha256, metadata dict) of every live snapshot
+        with self._lock:
+            slots = list(self._slots())
+        for _, _, pack_id, offset, _, _ in slots:
+            key_bytes, data_length, timestamp, digest, meta = self._record_header(pack_id, offset, with_meta=True)
+            yield key_bytes.decode('utf-8'), timestamp, data_length, digest.hex(), json.loads(meta) if meta else {}
+
+    def compact(self, min_dead_ratio=0.5):
+        # Rewrites every full pack in which at least min_dead_ratio of the bytes belong to
+        # deleted snapshots: live records move to the current pack and the old file goes.
+        # Runs record by record under the lock, so saves continue in between.
+        with self._lock:
+            live = {}
+            for _, _, pack_id, _, length, _ in self._slots():
+                live[pack_id] = live.get(pack_id, 0) + length
+            current = self._current_id
+        victims = []
+        for pack_id in self.pack_ids():
+            if pack_id >= current:
+                continue
+            size = os.path.getsize(self.pack_path(pack_id))
+            if size and 1 - live.get(pack_id, 0) / size >= min_dead_ratio:
+                victims.append((pack_id, size))
+        if not victims:
+            return 0
+        victim_ids = {pack_id for pack_id, _ in victims}
+        existing = set(self.pack_ids())
+        moved = 0
+        for pack_id, _ in victims:
+            with open(self.pack_path(pack_id), 'rb') as src:
+                offset = 0
+                while True:
+                    record = self._read_record(src)
+                    if record is None:
+                        break
+                    kind, key_bytes, meta, data, timestamp, digest = record
+                    length = RECORD.size + len(key_bytes) + len(meta) + len(data)
+                    raw = RECORD.pack(RECORD_MAGIC, kind, len(key_bytes), len(data), timestamp, digest,
+                                      len(meta)) + key_bytes + meta + data
+                    with self._lock:
+                        if kind == PUT:
+                            found = self._find(key_bytes)
+                            if found is not None and found[1:3] == (pack_id, offset):
+                                new_pack, new_offset = self._append(raw)
+                                SLOT.pack_into(self._index, INDEX_HEADER_SIZE + found[0] * SLOT_SIZE,
+                                               _key_hash(key_bytes), new_pack, new_offset, length, LIVE)
+                                moved += 1
+                        elif int.from_bytes(data, 'little') in existing - victim_ids:
+                            # Still cancels a record in a pack that stays
+                            self._append(raw)
+                    offset += length
+        with self._lock:
+            position = (self._current_id, self._current_size)
+        self._sync(position)
+        # The index must point at the new copies on disk before the old packs disappear
+        self.flush()
+        reclaimed = 0
+        for pack_id, size in victims:
+            with self._lock:
+                reader = self._readers.pop(pack_id, None)
+                if reader is not None:
+                    reader.close()
+            try:
+                os.remove(self.pack_path(pack_id))
+                reclaimed += size
+            except OSError as e:
+                logging.error(f"Could not remove pack {pack_id}: {str(e)}")
+        with self._lock:
+            if self._tombstones > self._count:
+                # Mostly tombstones: rehash to keep probe sequences short
+                self._rehash(self._capacity)
+        self.compacted_bytes += reclaimed
+        logging.info(f"Pack compaction rewrote {len(victims)} packs, moved {moved} snapshots, reclaimed "
+                     f"{reclaimed} bytes")
+        return reclaimed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "packs": len(self.pack_ids()),
+                "snapshots": self._count,
+                "tombstones": self._tombstones,
+                "index_capacity": self._capacity,
+                "compacted_bytes": self.compacted_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._writer is None:
+                return
+            self.flush(clean=True)
+            self._writer.flush()
+            if self.sync_mode != "none":
+                os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+            for reader in self._readers.values():
+                reader.close()
+            self._readers = {}
+            self._close_index()
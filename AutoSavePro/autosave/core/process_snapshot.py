@@ -0,0 +1,51 @@
+import time
+import psutil
+from autosave.core.metrics import REGISTRY
+from autosave.core.open_files import PsutilOpenFiles
+
+PROCESS_SCAN = REGISTRY.histogram("process_scan_seconds", "Time to walk the process table")
+OPEN_FILES_SCAN = REGISTRY.histogram("open_files_scan_seconds", "Time to list the open files of one process")
+
+
+class ProcessSnapshot:
+    # One walk of the process table per watcher tick, shared by every ApplicationWatcher.
+    # Open files are only fetched for processes somebody asks about, and only once per tick;
+    # the backend (see open_files.py) may keep what it learnt across ticks.
+    def __init__(self, open_files_backend=None):
+        started = time.perf_counter()
+        self.backend = open_files_backend or PsutilOpenFiles()
+        self.by_name = {}
+        pids = []
+        for proc in psutil.process_iter(['name']):
+            pids.append(proc.pid)
+            name = proc.info['name']
+            if name:
+                self.by_name.setdefault(name.lower(), []).append(proc)
+        self.backend.retain(pids)
+        self._matches = {}
+        self._open_files = {}
+        PROCESS_SCAN.observe(time.perf_counter() - started)
+
+    def find(self, app_name):
+        # Same matching rule as before: the app name is a substring of the process name
+        key = app_name.lower()
+        matches = self._matches.get(key)
+        if matches is None:
+            matches = list(self.by_name.get(key, []))
+            for name, procs in self.by_name.items():
+                if key in name and name != key:
+                    matches.extend(procs)
+            self._matches[key] = matches
+        return matches
+
+    def is_running(self, app_name):
+        return bool(self.find(app_name))
+
+    def open_files(self, proc):
+        files = self._open_files.get(proc.pid)
+        if files is None:
+            started = time.perf_counter()
+            files = self.backend.open_files(proc)
+            OPEN_FILES_SCAN.observe(time.perf_counter() - started)
+            self._open_files[proc.pid] = files
+        return files
@@ -0,0 +1,310 @@
+import os
+import json
+import errno
+import shutil
+import time
+import logging
+import threading
+from autosave.core.catalog import SnapshotCatalog, CATALOG_NAME, META_SUFFIX
+from autosave.core.chunk_store import ChunkStore
+from autosave.core.pack_store import PackStore, PACKS_DIRECTORY
+from autosave.core.copy_engine import CopyEngine
+from autosave.core.group_commit import GroupCommitter, temp_path
+from autosave.core.metrics import REGISTRY
+from autosave.core.retention import lower_thread_priority
+
+CURSOR_NAME = "replication.json"
+COPY_BUFFER_SIZE = 1024 * 1024
+# Errors that say the target cannot take anything right now, whatever the snapshot
+TARGET_ERRNOS = (errno.ENOSPC, errno.EDQUOT, errno.EROFS)
+
+REPLICATION_LAG = REGISTRY.gauge("replication_lag_seconds",
+                                 "Age of the oldest snapshot not yet copied to the target", ("target",))
+REPLICATION_PENDING = REGISTRY.gauge("replication_pending_snapshots", "Snapshots not yet copied to the target",
+                                     ("target",))
+REPLICATED_BYTES = REGISTRY.counter("replicated_bytes", "Bytes copied to replication targets", ("target",))
+REPLICATION_ERRORS = REGISTRY.counter("replication_errors", "Failed replication batches", ("target",))
+
+
+class TokenBucket:
+    # Shared by every target so that the limit holds for replication as a whole. Callers
+    # take the bytes they are about to copy and wait for the returned delay; going into
+    # debt keeps large reads simple and still averages out to `rate` bytes per second.
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, COPY_BUFFER_SIZE)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class _Target:
+    def __init__(self, replicator, directory):
+        self.replicator = replicator
+        self.directory = directory
+        self.label = os.path.abspath(directory)
+        self.committer = GroupCommitter(replicator.sync_mode)
+        self.catalog = None
+        self._packs = None
+        self.cursor = 0
+        self.thread = None
+        self.wake = threading.Event()
+        self.replicated = 0
+        self.skipped = 0
+        # Snapshot id -> failed attempts; rows given up on are kept in the cursor file
+        self.failures = {}
+        self.dead_letters = []
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.catalog = SnapshotCatalog(os.path.join(self.directory, CATALOG_NAME))
+        self.cursor, self.dead_letters = self._load_cursor()
+
+    @property
+    def packs(self):
+        if self._packs is None:
+            self._packs = PackStore(os.path.join(self.directory, PACKS_DIRECTORY), sync_mode=self.replicator.sync_mode)
+        return self._packs
+
+    def close(self):
+        if self._packs is not None:
+            self._packs.close()
+            self._packs = None
+        if self.catalog is not None:
+            self.catalog.close()
+            self.catalog = None
+
+    def _cursor_path(self):
+        return os.path.join(self.directory, CURSOR_NAME)
+
+    def _load_cursor(self):
+        # The cursor lives in the target, so an emptied or replaced disk starts over
+        try:
+            with open(self._cursor_path(), 'r', encoding='utf-8') as src:
+                state = json.load(src)
+        except FileNotFoundError:
+            return 0, []
+        except Exception as e:
+            logging.warning(f"Unreadable replication cursor in {self.directory}, starting over: {str(e)}")
+            return 0, []
+        if state.get("source") != os.path.abspath(self.replicator.source_directory):
+            logging.warning(f"{self.directory} was replicated from {state.get('source')}, starting over")
+            return 0, []
+        return state.get("last_id", 0), state.get("dead_letters", [])
+
+    def save_cursor(self):
+        tmp_path = temp_path(self._cursor_path())
+        with open(tmp_path, 'w', encoding='utf-8') as dst:
+            json.dump({"source": os.path.abspath(self.replicator.source_directory), "last_id": self.cursor,
+                       "dead_letters": self.dead_letters}, dst)
+        os.replace(tmp_path, self._cursor_path())
+
+    def pending(self):
+        return self.replicator.saver.catalog.count_after(self.cursor)
+
+    def lag(self):
+        row = self.replicator.saver.catalog.first_after(self.cursor)
+        return max(0.0, time.time() - row["timestamp"]) if row else 0.0
+
+
+class Replicator:
+    # Copies every committed snapshot of a save root to one or more other directories
+    # (a second disk, a NAS mount) in the background. Each target is tailed by its own
+    # thread in catalog order: a batch of new snapshots (and the chunks their manifests
+    # use) is copied under temporary names, committed in one go, recorded in the target's
+    # own catalog, and only then is the target's cursor moved past it. Replicas are
+    # append-only: retention on the source does not delete from them.
+    def __init__(self, saver, targets, bandwidth_mb_s=None, batch_size=64, poll_interval=30, retry_interval=60,
+                 sync_mode="group", busy_check=None, max_row_attempts=5):
+        self.saver = saver
+        self.source_directory = saver.base_save_directory
+        self.bucket = TokenBucket(bandwidth_mb_s * 1024 * 1024) if bandwidth_mb_s else None
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.max_row_attempts = max_row_attempts
+        self.sync_mode = sync_mode
+        self.busy_check = busy_check or (lambda: False)
+        self.copy_engine = CopyEngine()
+        self.targets = [_Target(self, directory) for directory in targets]
+        self._stopped = threading.Event()
+        for target in self.targets:
+            REPLICATION_LAG.labels(target.label).set_function(target.lag)
+            REPLICATION_PENDING.labels(target.label).set_function(target.pending)
+        # New snapshots wake the targets up instead of waiting for the next poll
+        saver.committed.connect(self.notify)
+
+    def notify(self, *args):
+        for target in self.targets:
+            target.wake.set()
+
+    def start(self):
+        for target in self.targets:
+            if target.thread is None:
+                target.thread = threading.Thread(target=self._run, args=(target,), name="replication", daemon=True)
+                target.thread.start()
+        logging.info(f"Replicating {self.source_directory} to {[target.directory for target in self.targets]}")
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self.notify()
+        self.saver.committed.disconnect(self.notify)
+        for target in self.targets:
+            if target.thread is not None:
+                target.thread.join(timeout)
+                target.thread = None
+            target.committer.stop()
+            target.close()
+
+    def _run(self, target):
+        lower_thread_priority()
+        while not self._stopped.is_set():
+            try:
+                if target.catalog is None:
+                    target.open()
+                while not self._stopped.is_set() and self.replicate_batch(target):
+                    pass
+                delay = self.poll_interval
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                # Typically the target is offline: keep the cursor and try again later
+                REPLICATION_ERRORS.labels(target.label).inc()
+                logging.error(f"Replication to {target.directory} failed: {str(e)}")
+                delay = self.retry_interval
+            target.wake.wait(delay)
+            target.wake.clear()
+
+    def replicate_batch(self, target):
+        # Returns the number of snapshots handled; 0 when the target is up to date
+        rows = self.saver.catalog.after(target.cursor, self.batch_size)
+        if not rows:
+            return 0
+        while self.busy_check() and not self._stopped.is_set():
+            time.sleep(0.2)
+
+        renames, depends, copied, written = [], [], [], 0
+        chunk_digests = set()
+        try:
+            for row in rows:
+                if self._stopped.is_set():
+                    break
+                source = row["save_path"]
+                destination = self._target_path(target, source)
+                staged = len(renames)
+                try:
+                    if row["storage"] == "packed":
+                        written += self._copy_packed(target, row)
+                        copied.append((row, destination))
+                        continue
+                    if row["storage"] == "chunked":
+                        for digest, _ in ChunkStore.read_manifest(source)["chunks"]:
+                            if digest not in chunk_digests:
+                                chunk_digests.add(digest)
+                                written += self._stage_copy(target, self.saver.chunk_store.chunk_path(digest), depends)
+                    written += self._stage_copy(target, source, renames)
+                    if row["storage"] in ("copy", "compressed") and os.path.exists(source + META_SUFFIX):
+                        written += self._stage_copy(target, source + META_SUFFIX, renames)
+                except Exception as e:
+                    if isinstance(e, FileNotFoundError) and not os.path.exists(source):
+                        # Deleted by retention before it could be copied: nothing left to replicate
+                        logging.info(f"Snapshot {source} is gone, not replicated: {str(e)}")
+                        target.skipped += 1
+                    elif not self._give_up(target, row, e):
+                        raise
+                    # Chunks already staged are valid on their own, the snapshot's files are not
+                    target.committer.discard(renames[staged:])
+                    del renames[staged:]
+                    copied.append((row, None))
+                    continue
+                copied.append((row, destination))
+            target.committer.commit(renames, depends=depends)
+        except Exception:
+            target.committer.discard(depends + renames)
+            raise
+
+        for row, destination in copied:
+            # Already indexed when the cursor was lost after a previous run copied the batch
+            if destination is not None and target.catalog.get(destination) is None:
+                target.catalog.add(destination, row["app"], row["file_name"], row["original_path"], row["timestamp"],
+                                   row["size"], row["hash"], row["storage"])
+        for row, _ in copied:
+            target.failures.pop(row["id"], None)
+        if copied:
+            target.cursor = copied[-1][0]["id"]
+            target.save_cursor()
+            target.replicated += len(copied)
+        REPLICATED_BYTES.labels(target.label).inc(written)
+        logging.debug(f"Replicated {len(copied)} snapshots ({written} bytes) to {target.directory}")
+        return len(copied)
+
+    def _give_up(self, target, row, error):
+        # A snapshot that keeps failing must not hold the cursor back forever. Failures that
+        # come from the target (offline, full, read-only) are not counted against the row.
+        path = getattr(error, "filename", None)
+        if not os.path.isdir(target.directory) or getattr(error, "errno", None) in TARGET_ERRNOS or \
+                (isinstance(path, str) and os.path.abspath(path).startswith(target.label + os.sep)):
+            return False
+        attempts = target.failures.get(row["id"], 0) + 1
+        target.failures[row["id"]] = attempts
+        if attempts < self.max_row_attempts:
+            return False
+        logging.error(f"Snapshot {row['save_path']} failed {attempts} times, not replicated to "
+                      f"{target.directory}: {str(error)}")
+        target.dead_letters.append({"id": row["id"], "save_path": row["save_path"], "error": str(error)})
+        target.skipped += 1
+        return True
+
+    def _target_path(self, target, source_path):
+        return os.path.join(target.directory, os.path.relpath(source_path, self.source_directory))
+
+    def _copy_packed(self, target, row):
+        # Packed snapshots go into the target's own pack store under the same key
+        key = self.saver.pack_key(row["save_path"])
+        if target.packs.contains(key):
+            return 0
+        try:
+            data = self.saver.pack_store.get(key)
+        except KeyError:
+            raise FileNotFoundError(f"{key} is no longer in the pack store")
+        if self.bucket is not None:
+            self._stopped.wait(self.bucket.take(len(data)))
+        target.packs.put_bytes(key, data, row["timestamp"], {"original_path": row["original_path"]})
+        return len(data)
+
+    def _stage_copy(self, target, source_path, staged):
+        # Snapshots and chunks never change once committed: one already in the target is skipped
+        destination = self._target_path(target, source_path)
+        if os.path.exists(destination):
+            return 0
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_path = temp_path(destination)
+        staged.append((tmp_path, destination))
+        if self.bucket is None:
+            return self.copy_engine.copy(source_path, tmp_path).bytes_copied
+        written = 0
+        with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            while not self._stopped.is_set():
+                data = src.read(COPY_BUFFER_SIZE)
+                if not data:
+                    break
+                self._stopped.wait(self.bucket.take(len(data)))
+                dst.write(data)
+                written += len(data)
+        if self._stopped.is_set():
+            raise InterruptedError("Replication stopped")
+        shutil.copystat(source_path, tmp_path)
+        return written
+
+    def stats(self):
+        return {target.directory: {"cursor": target.cursor, "replicated": target.replicated,
+                                   "skipped": target.skipped, "dead_letters": len(target.dead_letters)}
+                for target in self.targets}
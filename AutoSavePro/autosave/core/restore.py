@@ -0,0 +1,104 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from autosave.core.catalog import file_sha256
+
+DEFAULT_RESTORE_WORKERS = 4
+
+
+class RestoreItem:
+    def __init__(self, row, target_path):
+        self.save_path = row["save_path"]
+        self.file_name = row["file_name"]
+        self.timestamp = row["timestamp"]
+        self.size = row["size"]
+        self.hash = row["hash"]
+        self.target_path = target_path
+        # create, overwrite or unchanged once planned; restored, failed or skipped afterwards
+        self.action = None
+        self.status = "planned"
+        self.verified = False
+        self.error = None
+
+    def __repr__(self):
+        return f"<RestoreItem {self.target_path} <- {self.save_path} {self.action}/{self.status}>"
+
+
+def resolve_snapshots(catalog, app_name, at, target_directory=None):
+    # The newest snapshot at or before `at` of every file the app has snapshots of. Files
+    # are told apart by their original path; snapshots indexed without one (rebuilt from
+    # an old save root) can only be restored into target_directory.
+    items = []
+    targets = set()
+    for row in catalog.latest_per_file(app_name, end=at):
+        if target_directory is not None:
+            target_path = os.path.join(target_directory, row["file_name"])
+        elif row["original_path"]:
+            target_path = row["original_path"]
+        else:
+            logging.warning(f"No original path recorded for {row['save_path']}, use a target directory")
+            continue
+        # Rows come newest first: two files sharing a name in target_directory keep the newest
+        if os.path.normcase(target_path) in targets:
+            logging.warning(f"Skipping {row['save_path']}: {target_path} is restored from a newer snapshot")
+            continue
+        targets.add(os.path.normcase(target_path))
+        items.append(RestoreItem(row, target_path))
+    items.sort(key=lambda item: item.target_path)
+    return items
+
+
+def plan_item(item):
+    # Compares the file on disk with the snapshot: size first, the hash only when needed
+    try:
+        current_size = os.path.getsize(item.target_path)
+    except FileNotFoundError:
+        item.action = "create"
+        return item
+    if item.hash and (item.size is None or item.size == current_size) and file_sha256(item.target_path) == item.hash:
+        item.action = "unchanged"
+    else:
+        item.action = "overwrite"
+    return item
+
+
+def restore_app(saver, app_name, at, target_directory=None, workers=DEFAULT_RESTORE_WORKERS, dry_run=False):
+    # Puts every file of app_name back as it was at `at` (epoch seconds). Files are planned
+    # and restored by a bounded pool; each one is written atomically and checked against
+    # its recorded hash, and files already identical to their snapshot are left alone.
+    # With dry_run nothing is written: the returned items only carry their planned action.
+    started = time.perf_counter()
+    items = resolve_snapshots(saver.catalog, app_name, at, target_directory)
+
+    def run(item):
+        try:
+            plan_item(item)
+        except Exception as e:
+            item.action = "overwrite"
+            logging.warning(f"Could not compare {item.target_path} with its snapshot: {str(e)}")
+        if dry_run:
+            return item
+        if item.action == "unchanged":
+            item.status = "skipped"
+            return item
+        try:
+            item.verified = saver.restore_to(item.save_path, item.target_path)
+            item.status = "restored"
+            logging.info(f"File restored: {item.target_path} from {item.save_path}")
+        except Exception as e:
+            item.status = "failed"
+            item.error = str(e)
+            logging.error(f"Error restoring {item.target_path} from {item.save_path}: {str(e)}")
+        return item
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="restore") as pool:
+        items = list(pool.map(run, items))
+    counts = {}
+    for item in items:
+        key = item.action if dry_run else item.status
+        counts[key] = counts.get(key, 0) + 1
+    logging.info(f"{'Planned' if dry_run else 'Finished'} restore of {app_name} as of "
+                 f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(at))}: {counts} "
+                 f"in {time.perf_counter() - started:.2f} s")
+    return items
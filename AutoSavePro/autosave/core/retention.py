@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import logging
+import datetime
+import threading
+
+HOUR = 3600
+
+
+class RetentionPolicy:
+    # Grandfather-father-son retention: the newest keep_last snapshots of each file, plus
+    # the newest snapshot of each of the last `hourly` hours, `daily` days and `weekly`
+    # ISO weeks. max_age (seconds) and max_total_bytes (per app, logical size) are hard
+    # caps applied on top; the newest snapshot of a file is never removed by them.
+    def __init__(self, keep_last=5, hourly=24, daily=7, weekly=4, max_age=None, max_total_bytes=None):
+        self.keep_last = keep_last
+        self.hourly = hourly
+        self.daily = daily
+        self.weekly = weekly
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+
+    def select_deletions(self, snapshots, now=None):
+        # snapshots: catalog rows of one app, newest first. Returns the rows to delete.
+        now = now or time.time()
+        per_file = {}
+        keep = set()
+        for row in snapshots:
+            state = per_file.get(row["file_name"])
+            if state is None:
+                state = per_file[row["file_name"]] = {"count": 0, "hours": set(), "days": set(), "weeks": set()}
+                keep.add(row["save_path"])  # newest snapshot of every file
+            state["count"] += 1
+            if self.max_age is not None and now - row["timestamp"] > self.max_age:
+                continue
+            stamp = datetime.datetime.fromtimestamp(row["timestamp"])
+            kept = state["count"] <= self.keep_last
+            kept = self._bucket(state["hours"], stamp.strftime("%Y%m%d%H"), self.hourly) or kept
+            kept = self._bucket(state["days"], stamp.date(), self.daily) or kept
+            kept = self._bucket(state["weeks"], stamp.isocalendar()[:2], self.weekly) or kept
+            if kept:
+                keep.add(row["save_path"])
+
+        if self.max_total_bytes is not None:
+            total = 0
+            newest_seen = set()
+            for row in snapshots:
+                if row["save_path"] not in keep:
+                    continue
+                is_newest = row["file_name"] not in newest_seen
+                newest_seen.add(row["file_name"])
+                size = row["size"] or 0
+                if is_newest or total + size <= self.max_total_bytes:
+                    total += size
+                else:
+                    keep.discard(row["save_path"])
+
+        return [row for row in snapshots if row["save_path"] not in keep]
+
+    def _bucket(self, seen, key, limit):
+        # Keeps the first (newest) snapshot of each bucket until `limit` buckets are used
+        if key in seen or len(seen) >= limit:
+            return False
+        seen.add(key)
+        return True
+
+
+class RetentionWorker:
+    # Low-priority background pruning: evaluates each app in one pass over the catalog
+    # and deletes in small batches, backing off whenever foreground saves are pending.
+    def __init__(self, saver, default_policy=None, interval=HOUR, batch_size=100, batch_pause=0.2, busy_check=None):
+        self.saver = saver
+        self.default_policy = default_policy
+        self.policies = {}
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.busy_check = busy_check or (lambda: False)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.deleted_total = 0
+
+    def set_policy(self, policy, app_name=None):
+        if app_name is None:
+            self.default_policy = policy
+        else:
+            self.policies[app_name] = policy
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        lower_thread_priority()
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Retention pass failed: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def run_once(self):
+        deleted = 0
+        for app_name in self.saver.catalog.apps():
+            policy = self.policies.get(app_name, self.default_policy)
+            if policy is None or self._stopped.is_set():
+                continue
+            deleted += self.prune_app(app_name, policy)
+        return deleted
+
+    def prune_app(self, app_name, policy):
+        rows = self.saver.catalog.find_app(app_name)
+        victims = self.saver.without_needed_bases(
+            [row["save_path"] for row in rows],
+            [row["save_path"] for row in policy.select_deletions(rows)])
+        deleted = []
+        for start in range(0, len(victims), self.batch_size):
+            while self.busy_check() and not self._stopped.is_set():
+                time.sleep(max(self.batch_pause, 0.05))
+            if self._stopped.is_set():
+                break
+            deleted.extend(self.saver.delete_saves(victims[start:start + self.batch_size], collect_garbage=False))
+            time.sleep(self.batch_pause)
+        if deleted:
+            self.saver.collect_garbage(deleted)
+            logging.info(f"Retention removed {len(deleted)} snapshots of {app_name}")
+        self.deleted_total += len(deleted)
+        return len(deleted)
+
+
+def lower_thread_priority():
+    # Only this thread: on Linux, setpriority on a thread id affects that thread alone
+    if sys.platform.startswith("linux") and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError as e:
+            logging.debug(f"Could not lower background thread priority: {str(e)}")
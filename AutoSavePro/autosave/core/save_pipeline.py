@@ -0,0 +1,169 @@
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from autosave.core.metrics import REGISTRY
+
+POLICIES = ("drop_oldest", "drop_newest", "block")
+
+QUEUE_WAIT = REGISTRY.histogram("save_queue_wait_seconds", "Time a save job waited for a worker")
+SAVE_LATENCY = REGISTRY.histogram("save_latency_seconds", "Time from save request to end of the save")
+
+
+class SaveJob:
+    def __init__(self, key, func, args):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.submitted_at = time.monotonic()
+
+
+class SavePipeline:
+    # Bounded queue of save jobs served by a small worker pool. At most one job per key
+    # (normalized file path) is queued: a newer submission replaces the queued one, and
+    # a key that is already being saved is not picked up again until that save ends.
+    def __init__(self, workers=2, max_queue=256, policy="drop_oldest", block_timeout=5.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.worker_count = workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._pending = OrderedDict()
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._latencies = deque(maxlen=1024)
+        self.submitted = 0
+        self.replaced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        for index in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"save-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Save pipeline started with {self.worker_count} workers (queue {self.max_queue}, {self.policy})")
+
+    def stop(self, drain=True, timeout=None):
+        with self._condition:
+            if not drain:
+                self.dropped += len(self._pending)
+                self._pending.clear()
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, key, func, *args):
+        job = SaveJob(key, func, args)
+        with self._condition:
+            self.submitted += 1
+            if not self._running:
+                # No worker would ever pick it up
+                self.dropped += 1
+                logging.warning(f"Save pipeline is stopped, dropping save of {key}")
+                return False
+            queued = self._pending.get(key)
+            if queued is not None:
+                # Keep the original position and wait time, run the newest request
+                job.submitted_at = queued.submitted_at
+                self._pending[key] = job
+                self.replaced += 1
+                return True
+            if len(self._pending) >= self.max_queue:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    logging.warning(f"Save queue full, dropping save of {key}")
+                    return False
+                if self.policy == "drop_oldest":
+                    oldest_key, _ = self._pending.popitem(last=False)
+                    self.dropped += 1
+                    logging.warning(f"Save queue full, dropping queued save of {oldest_key}")
+                else:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._pending) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._running:
+                            self.dropped += 1
+                            logging.warning(f"Save queue still full after {self.block_timeout}s, dropping save of {key}")
+                            return False
+                        self._condition.wait(remaining)
+            self._pending[key] = job
+            self._condition.notify()
+        return True
+
+    def _next_job(self):
+        for key, job in self._pending.items():
+            if key not in self._in_flight:
+                del self._pending[key]
+                self._in_flight.add(key)
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if not self._running and not self._pending:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                # A slot freed up for blocked submitters
+                self._condition.notify_all()
+            started = time.monotonic()
+            try:
+                job.func(*job.args)
+                succeeded = True
+            except Exception as e:
+                logging.error(f"Save job for {job.key} failed: {str(e)}")
+                succeeded = False
+            finished = time.monotonic()
+            QUEUE_WAIT.observe(started - job.submitted_at)
+            SAVE_LATENCY.observe(finished - job.submitted_at)
+            with self._condition:
+                self._in_flight.discard(job.key)
+                self._latencies.append((started - job.submitted_at, finished - job.submitted_at))
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                # Another job for the same key may be waiting on this one
+                self._condition.notify_all()
+
+    def queue_depth(self):
+        with self._condition:
+            return len(self._pending)
+
+    def stats(self):
+        with self._condition:
+            latencies = sorted(total for _, total in self._latencies)
+            waits = sorted(wait for wait, _ in self._latencies)
+            return {
+                "queue_depth": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "submitted": self.submitted,
+                "replaced": self.replaced,
+                "dropped": self.dropped,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_p50": _percentile(waits, 0.50),
+                "latency_p50": _percentile(latencies, 0.50),
+                "latency_p95": _percentile(latencies, 0.95),
+                "latency_max": latencies[-1] if latencies else 0.0,
+            }
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
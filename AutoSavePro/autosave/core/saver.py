@@ -1,21 +1,144 @@
 import os
 import shutil
+import time
 import datetime
 import logging
+import tempfile
+import threading
+from autosave.core.chunk_store import ChunkStore, MANIFEST_SUFFIX
+from autosave.core.pack_store import PackStore, PACKS_DIRECTORY, PACKED_SUFFIX, PACK_THRESHOLD
+from autosave.core import delta
+from autosave.core.delta import DELTA_SUFFIX, SIGNATURE_SUFFIX
+from autosave.core.catalog import SnapshotCatalog, CATALOG_NAME, SNAPSHOT_NAME, META_SUFFIX, file_sha256, \
+    write_snapshot_meta
+from autosave.core import compression
+from autosave.core.compression import CompressionPolicy
+from autosave.core.copy_engine import CopyEngine
+from autosave.core.fingerprint import FingerprintCache, FINGERPRINTS_NAME
+from autosave.core.group_commit import GroupCommitter, temp_path
+from autosave.core.metrics import REGISTRY
+from autosave.core.events import Signal
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Where the GUI and the examples save when nothing else is configured
+DEFAULT_SAVE_DIRECTORY = "C:/AutoSavePro/Saves"
+STORAGE_MODES = ("copy", "chunked", "delta", "packed")
+CHUNKS_DIRECTORY = ".chunks"
+# A delta bigger than this fraction of the file is not worth its restore cost
+MAX_DELTA_RATIO = 0.5
+# Snapshots a delta can be diffed against: plain files in the same directory
+DELTA_BASE_STORAGES = ("copy", "delta")
+# Hard limit when following a chain on disk, whatever max_chain_length it was written with
+MAX_DELTA_CHAIN = 1000
+# <stem>_<stamp><ext>; microseconds keep saves of the same file within a second apart
+SNAPSHOT_STAMP = "%Y%m%d_%H%M%S_%f"
+SNAPSHOT_SUFFIXES = ("", MANIFEST_SUFFIX, DELTA_SUFFIX, PACKED_SUFFIX) + compression.COMPRESSED_SUFFIXES
+
+SAVES = REGISTRY.counter("saves", "Snapshots written", ("storage",))
+SAVE_ERRORS = REGISTRY.counter("save_errors", "Snapshots that could not be written")
+BYTES_WRITTEN = REGISTRY.counter("bytes_written", "Bytes written to the save store")
+LOGICAL_BYTES = REGISTRY.counter("logical_bytes", "Size of the files that were snapshotted")
+SAVE_DURATION = REGISTRY.histogram("save_duration_seconds", "Time to write and commit one snapshot")
+
+def snapshot_storage(save_path):
+    # Best guess from the name alone; the catalog records the real storage kind
+    match = SNAPSHOT_NAME.match(os.path.basename(save_path))
+    suffix = match.group("suffix") if match else None
+    if suffix == MANIFEST_SUFFIX:
+        return "chunked"
+    if suffix == DELTA_SUFFIX:
+        return "delta"
+    if suffix == PACKED_SUFFIX:
+        return "packed"
+    if suffix in compression.COMPRESSED_SUFFIXES:
+        return "compressed"
+    return "copy"
+
+class SaveReport:
+    def __init__(self, file_path, save_path, storage_mode, logical_size, bytes_written, copy_result=None):
+        self.file_path = file_path
+        self.save_path = save_path
+        self.storage_mode = storage_mode
+        self.logical_size = logical_size
+        self.bytes_written = bytes_written
+        # Set when the snapshot was a plain copy: which strategy ran and how fast
+        self.copy_strategy = copy_result.strategy if copy_result else None
+        self.throughput = copy_result.throughput if copy_result else None
+
+    @property
+    def ratio(self):
+        return self.bytes_written / self.logical_size if self.logical_size else 1.0
+
+    def __repr__(self):
+        return (f"SaveReport({self.save_path!r}, mode={self.storage_mode}, "
+                f"written={self.bytes_written}, logical={self.logical_size})")
+
 class Saver:
-    def __init__(self, base_save_directory):
+    def __init__(self, base_save_directory, storage_mode="copy", max_chain_length=10, sync_mode="group",
+                 commit_delay=0.01, pack_threshold=PACK_THRESHOLD):
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
         self.base_save_directory = base_save_directory
-        logging.info(f"Saver initialized with base save directory: {base_save_directory}")
+        self.storage_mode = storage_mode
+        # Longest run of deltas before a new full base is written; bounds restore time
+        self.max_chain_length = max_chain_length
+        self._chunk_store = None
+        # Packed mode: files up to pack_threshold bytes go to pack files, bigger ones are copies
+        self.pack_threshold = pack_threshold
+        self._pack_store = None
+        # Only applies to copy mode: chunked and delta snapshots already avoid
+        # rewriting unchanged data, and delta bases must stay seekable
+        self.compression = CompressionPolicy()
+        self.copy_engine = CopyEngine()
+        # Snapshots are written under a temporary name and only renamed into place once
+        # fsynced; concurrent saves share their fsyncs (at most commit_delay seconds apart)
+        self.committer = GroupCommitter(sync_mode, max_delay=commit_delay)
+        self._report_lock = threading.Lock()
+        # Snapshot names handed out to saves that have not reached the catalog yet
+        self._names_lock = threading.Lock()
+        self._reserved_names = set()
+        # Emitted with the catalog row id once a snapshot is durable and indexed
+        self.committed = Signal()
+        self.last_report = None
+        self.total_bytes_written = 0
+        self.total_logical_bytes = 0
+        os.makedirs(base_save_directory, exist_ok=True)
+        catalog_path = os.path.join(base_save_directory, CATALOG_NAME)
+        is_new_catalog = not os.path.exists(catalog_path)
+        self.catalog = SnapshotCatalog(catalog_path)
+        if is_new_catalog and any(os.path.isdir(os.path.join(base_save_directory, entry))
+                                  for entry in os.listdir(base_save_directory)):
+            # Save root written before the catalog existed: index what is already there
+            self.catalog.rebuild_from_disk(base_save_directory, compute_hashes=False)
+        self.fingerprints = FingerprintCache(os.path.join(base_save_directory, FINGERPRINTS_NAME))
+        logging.info(f"Saver initialized with base save directory: {base_save_directory} (mode: {storage_mode})")
+
+    @property
+    def chunk_store(self):
+        # Created on first use so copy-mode savers can still restore chunked snapshots
+        if self._chunk_store is None:
+            self._chunk_store = ChunkStore(os.path.join(self.base_save_directory, CHUNKS_DIRECTORY))
+        return self._chunk_store
+
+    @property
+    def pack_store(self):
+        if self._pack_store is None:
+            self._pack_store = PackStore(os.path.join(self.base_save_directory, PACKS_DIRECTORY),
+                                         sync_mode=self.committer.sync_mode)
+        return self._pack_store
+
+    def pack_key(self, save_path):
+        # Packed snapshots are stored under their path relative to the save root
+        relative = os.path.relpath(save_path[:-len(PACKED_SUFFIX)], self.base_save_directory)
+        return relative.replace(os.sep, '/')
 
     def create_save_directory(self, app_name):
         save_dir = os.path.join(self.base_save_directory, app_name)
         if not os.path.exists(save_dir):
             try:
-                os.makedirs(save_dir)
+                os.makedirs(save_dir, exist_ok=True)
                 logging.info(f"Created save directory: {save_dir}")
             except Exception as e:
                 logging.error(f"Failed to create save directory {save_dir}: {str(e)}")
@@ -28,53 +151,356 @@ class Saver:
             return None
 
         file_name = os.path.basename(file_path)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        save_name = f"{os.path.splitext(file_name)[0]}_{timestamp}{os.path.splitext(file_name)[1]}"
-        save_path = os.path.join(save_dir, save_name)
+        original_path = os.path.abspath(file_path)
+        saved_at = time.time()
+        save_path = reserved_path = self._reserve_save_path(save_dir, file_name)
 
+        staged = []
+        started = time.perf_counter()
         try:
-            shutil.copy2(file_path, save_path)
+            source_stat = os.stat(file_path)
+            copy_result = None
+            if self.storage_mode == "chunked":
+                save_path, logical_size, bytes_written, file_hash = self._save_chunked(file_path, save_path, staged,
+                                                                                       saved_at)
+                storage = "chunked"
+            elif self.storage_mode == "packed" and source_stat.st_size <= self.pack_threshold:
+                save_path += PACKED_SUFFIX
+                logical_size, file_hash = self.pack_store.put_file(self.pack_key(save_path), file_path, saved_at,
+                                                                   {"original_path": original_path})
+                bytes_written = logical_size
+                storage = "packed"
+            else:
+                if self.storage_mode == "delta":
+                    save_path, logical_size, bytes_written, file_hash, copy_result = \
+                        self._save_delta(file_path, save_path, app_name, staged, saved_at, source_stat.st_size)
+                    storage = "delta" if save_path.endswith(DELTA_SUFFIX) else "copy"
+                else:
+                    rule = self.compression.resolve(app_name, file_path)
+                    if rule:
+                        codec, level = rule
+                        save_path += compression.CODECS[codec][0]
+                        file_hash = compression.compress_file(file_path, self._stage(save_path, staged), codec, level)
+                        logical_size = source_stat.st_size
+                        storage = "compressed"
+                    else:
+                        # A reflink costs no read, hashing it would: its hash is only recorded
+                        # when the fingerprint check has just computed it
+                        copy_result = self.copy_engine.copy(file_path, self._stage(save_path, staged), want_hash=True,
+                                                            hash_clones=False)
+                        file_hash = copy_result.sha256 or self.fingerprints.computed_hash(file_path, source_stat)
+                        logical_size = copy_result.bytes_copied
+                        storage = "copy"
+                    bytes_written = os.path.getsize(staged[0][0])
+                if storage != "delta":
+                    write_snapshot_meta(self._stage(save_path + META_SUFFIX, staged), original_path, saved_at,
+                                        logical_size, file_hash)
+                self.committer.commit(staged)
+            row_id = self.catalog.add(save_path, app_name, file_name, original_path, saved_at,
+                                      logical_size, file_hash, storage)
+            self.fingerprints.record(file_path, source_stat, file_hash)
+            SAVES.labels(storage).inc()
+            SAVE_DURATION.observe(time.perf_counter() - started)
+            self._record_report(SaveReport(file_path, save_path, self.storage_mode, logical_size, bytes_written,
+                                           copy_result))
             logging.info(f"File saved: {save_path}")
+            self.committed.emit(row_id)
             return save_path
         except Exception as e:
+            self.committer.discard(staged)
+            SAVE_ERRORS.inc()
             logging.error(f"Error saving file {file_path}: {str(e)}")
             return None
+        finally:
+            with self._names_lock:
+                self._reserved_names.discard(reserved_path)
+
+    def _reserve_save_path(self, save_dir, file_name):
+        # A name already used by a snapshot (on disk, in the catalog or by a save still in
+        # progress) is never handed out again: the stamp is moved on until it is free
+        stem, ext = os.path.splitext(file_name)
+        moment = datetime.datetime.now()
+        with self._names_lock:
+            while True:
+                save_path = os.path.join(save_dir, f"{stem}_{moment.strftime(SNAPSHOT_STAMP)}{ext}")
+                if save_path not in self._reserved_names and not self._snapshot_exists(save_path):
+                    self._reserved_names.add(save_path)
+                    return save_path
+                moment += datetime.timedelta(microseconds=1)
+
+    def _snapshot_exists(self, save_path):
+        return any(os.path.exists(save_path + suffix) or self.catalog.get(save_path + suffix) is not None
+                   for suffix in SNAPSHOT_SUFFIXES)
+
+    def _stage(self, final_path, staged):
+        # Where to write final_path until it is committed
+        tmp_path = temp_path(final_path)
+        staged.append((tmp_path, final_path))
+        return tmp_path
+
+    def set_compression(self, codec, level=None, app_name=None, extension=None):
+        # codec is "zlib", "lzma", "bz2" or None; extension rules win over app rules
+        self.compression.set(codec, level, app_name, extension)
+        logging.info(f"Compression for {extension or app_name or 'all files'}: {codec or 'none'}")
+
+    def storage_of(self, save_path):
+        row = self.catalog.get(save_path)
+        return row["storage"] if row else snapshot_storage(save_path)
+
+    def is_unchanged(self, file_path):
+        # True when the file is identical to its last snapshot and saving it again is useless
+        return self.fingerprints.is_unchanged(file_path)
+
+    def close(self):
+        self.committer.stop()
+        logging.info(f"Group commit stats: {self.committer.stats()}")
+        self.fingerprints.flush()
+        if self._pack_store is not None:
+            self._pack_store.close()
+            logging.info(f"Pack store stats: {self._pack_store.stats()}")
+        self.catalog.close()
+
+    def _record_report(self, report):
+        with self._report_lock:
+            self.last_report = report
+            self.total_bytes_written += report.bytes_written
+            self.total_logical_bytes += report.logical_size
+        BYTES_WRITTEN.inc(report.bytes_written)
+        LOGICAL_BYTES.inc(report.logical_size)
+        via = f" via {report.copy_strategy} at {report.throughput / 1e6:.1f} MB/s" if report.copy_strategy else ""
+        logging.info(f"Save report for {report.file_path}: wrote {report.bytes_written} of "
+                     f"{report.logical_size} bytes ({report.ratio:.1%}) in {report.storage_mode} mode{via}")
+
+    def _save_chunked(self, file_path, save_path, staged, saved_at):
+        manifest_path = save_path + MANIFEST_SUFFIX
+        store = self.chunk_store
+        chunks = {}
+        store.begin_save()
+        try:
+            manifest, bytes_written = store.put_file(file_path, staged=chunks)
+            manifest["timestamp"] = saved_at
+            bytes_written += store.write_manifest(manifest, self._stage(manifest_path, staged))
+            # Committed before end_save so gc never sweeps chunks this manifest is about to use
+            self.committer.commit(staged, depends=[(tmp_path, path) for path, tmp_path in chunks.items()])
+        except Exception:
+            self.committer.discard([(tmp_path, path) for path, tmp_path in chunks.items()])
+            raise
+        finally:
+            store.end_save()
+        return manifest_path, manifest["size"], bytes_written, manifest["sha256"]
+
+    def _save_delta(self, file_path, save_path, app_name, staged, saved_at, source_size):
+        # The base is the previous snapshot of this very file, found by its original path
+        # (another file with the same name is not a base); anything else starts a new chain
+        original_path = os.path.abspath(file_path)
+        row = self.catalog.latest(app_name, original_path)
+        previous = row["save_path"] if row is not None and row["storage"] in DELTA_BASE_STORAGES else None
+
+        depth = 0
+        if previous is not None:
+            depth = delta.read_delta_header(previous)["depth"] if previous.endswith(DELTA_SUFFIX) else 0
+        if previous is None or depth >= self.max_chain_length:
+            return self._save_delta_base(file_path, save_path, previous, staged)
+
+        delta_path = save_path + DELTA_SUFFIX
+        header = {
+            "base": os.path.basename(previous),
+            "depth": depth + 1,
+            "original_path": original_path,
+            "timestamp": saved_at,
+        }
+        stats = delta.write_delta(self._load_signature(previous), file_path, self._stage(delta_path, staged), header,
+                                  sig_path=self._stage(delta_path + SIGNATURE_SUFFIX, staged),
+                                  max_literal_bytes=int(source_size * MAX_DELTA_RATIO))
+        if stats is None or stats["delta_bytes"] > stats["size"] * MAX_DELTA_RATIO:
+            logging.info(f"Delta for {file_path} would be over {MAX_DELTA_RATIO:.0%} of the file, "
+                         f"writing a full base instead")
+            self.committer.discard(staged)
+            del staged[:]
+            return self._save_delta_base(file_path, save_path, previous, staged)
+
+        self._remove_signature(previous)
+        logging.debug(f"Delta save of {file_path}: {stats['copied_bytes']} bytes reused, "
+                      f"{stats['literal_bytes']} bytes new, chain depth {depth + 1}")
+        return delta_path, stats["size"], stats["delta_bytes"] + stats["signature_bytes"], stats["sha256"], None
+
+    def _save_delta_base(self, file_path, save_path, previous, staged):
+        tmp_path = self._stage(save_path, staged)
+        copy_result = self.copy_engine.copy(file_path, tmp_path)
+        sig_bytes, file_hash = delta.write_signature(tmp_path, self._stage(save_path + SIGNATURE_SUFFIX, staged))
+        if previous is not None:
+            self._remove_signature(previous)
+        size = copy_result.bytes_copied
+        return save_path, size, size + sig_bytes, file_hash, copy_result
+
+    def _load_signature(self, save_path):
+        sig_path = save_path + SIGNATURE_SUFFIX
+        if os.path.exists(sig_path):
+            try:
+                return delta.Signature.load(sig_path)
+            except ValueError as e:
+                logging.warning(f"Ignoring signature {sig_path}: {str(e)}")
+        logging.info(f"No usable signature for {save_path}, rebuilding it from the snapshot")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            materialized = os.path.join(tmp_dir, "previous")
+            self._materialize_delta(save_path, materialized)
+            return delta.Signature.from_file(materialized)
+
+    def _remove_signature(self, save_path):
+        try:
+            os.remove(save_path + SIGNATURE_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def _remove_snapshot_files(self, save_path):
+        if save_path.endswith(PACKED_SUFFIX):
+            if not self.pack_store.delete(self.pack_key(save_path)):
+                raise FileNotFoundError(save_path)
+            return
+        os.remove(save_path)
+        self._remove_signature(save_path)
+        try:
+            os.remove(save_path + META_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def _delta_chain(self, save_path):
+        # Returns [full base, delta 1, ..., save_path]
+        chain = [save_path]
+        seen = {os.path.normcase(os.path.abspath(save_path))}
+        while chain[0].endswith(DELTA_SUFFIX):
+            if len(chain) > MAX_DELTA_CHAIN:
+                raise IOError(f"Delta chain of {save_path} is longer than {MAX_DELTA_CHAIN}")
+            header = delta.read_delta_header(chain[0])
+            base = os.path.join(os.path.dirname(chain[0]), header["base"])
+            if os.path.normcase(os.path.abspath(base)) in seen:
+                raise IOError(f"Delta chain of {save_path} loops back to {base}")
+            seen.add(os.path.normcase(os.path.abspath(base)))
+            chain.insert(0, base)
+        return chain
+
+    def _materialize_delta(self, save_path, output_path):
+        chain = self._delta_chain(save_path)
+        if len(chain) == 1:
+            shutil.copyfile(chain[0], output_path)
+            return
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as tmp_dir:
+            current = chain[0]
+            for index, delta_path in enumerate(chain[1:], start=1):
+                target = output_path if index == len(chain) - 1 else os.path.join(tmp_dir, f"step{index % 2}")
+                delta.apply_delta(current, delta_path, target)
+                current = target
 
     def restore_file(self, save_path, original_path):
         try:
-            shutil.copy2(save_path, original_path)
+            self.restore_to(save_path, original_path)
             logging.info(f"File restored: {original_path}")
             return True
         except Exception as e:
             logging.error(f"Error restoring file {save_path}: {str(e)}")
             return False
 
-    def list_saves(self, app_name, file_name):
-        save_dir = os.path.join(self.base_save_directory, app_name)
-        if not os.path.exists(save_dir):
-            logging.warning(f"Save directory does not exist: {save_dir}")
-            return []
+    def restore_to(self, save_path, dest_path):
+        # The snapshot is rebuilt next to dest_path, checked against the hash recorded at
+        # save time and only then renamed over dest_path, so a failed or interrupted restore
+        # leaves the current file untouched. Returns whether the hash could be verified.
+        row = self.catalog.get(save_path)
+        storage = row["storage"] if row else snapshot_storage(save_path)
+        expected_hash = row["hash"] if row else None
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        staged = []
+        try:
+            tmp_path = self._stage(dest_path, staged)
+            actual_hash = self.materialize(save_path, tmp_path, storage, want_hash=bool(expected_hash))
+            if expected_hash:
+                actual_hash = actual_hash or file_sha256(tmp_path)
+                if actual_hash != expected_hash:
+                    raise IOError(f"Checksum mismatch for {save_path}: expected {expected_hash}, got {actual_hash}")
+            self.committer.commit(staged)
+        except Exception:
+            self.committer.discard(staged)
+            raise
+        return bool(expected_hash)
 
-        saves = []
-        for file in os.listdir(save_dir):
-            if file.startswith(os.path.splitext(file_name)[0]) and file.endswith(os.path.splitext(file_name)[1]):
-                saves.append(os.path.join(save_dir, file))
+    def materialize(self, save_path, output_path, storage=None, want_hash=False):
+        # Writes the content of a snapshot to output_path, unchecked and not fsynced. Returns
+        # its sha256 when it came for free (plain copies are hashed while they are copied)
+        storage = storage or self.storage_of(save_path)
+        if storage == "chunked":
+            self.chunk_store.restore(self.chunk_store.read_manifest(save_path), output_path)
+        elif storage == "delta":
+            self._materialize_delta(save_path, output_path)
+        elif storage == "compressed":
+            compression.decompress_file(save_path, output_path)
+        elif storage == "packed":
+            self.pack_store.restore(self.pack_key(save_path), output_path)
+        else:
+            return self.copy_engine.copy(save_path, output_path, want_hash=want_hash).sha256
+        return None
+
+    def list_saves(self, app_name, file_name, start=None, end=None):
+        # Newest first. Matches the exact file name, so report.txt never picks up report_final.txt
+        saves = [row["save_path"] for row in self.catalog.find(app_name, file_name, start, end)]
         logging.info(f"Found {len(saves)} saves for {file_name} in {app_name}")
-        return sorted(saves, key=os.path.getmtime, reverse=True)
+        return saves
 
     def delete_old_saves(self, app_name, file_name, keep_count=5):
         saves = self.list_saves(app_name, file_name)
         if len(saves) > keep_count:
-            for old_save in saves[keep_count:]:
-                try:
-                    os.remove(old_save)
-                    logging.info(f"Deleted old save: {old_save}")
-                except Exception as e:
-                    logging.error(f"Error deleting old save {old_save}: {str(e)}")
+            self.delete_saves(self.without_needed_bases(saves, saves[keep_count:]))
+
+    def without_needed_bases(self, save_paths, victims):
+        # Bases of the deltas we keep must survive, whatever their age
+        victim_set = set(victims)
+        needed = set()
+        for kept in save_paths:
+            if kept not in victim_set and kept.endswith(DELTA_SUFFIX):
+                needed.update(self._delta_chain(kept))
+        return [save for save in victims if save not in needed]
+
+    def delete_saves(self, save_paths, collect_garbage=True):
+        deleted = []
+        for old_save in save_paths:
+            try:
+                self._remove_snapshot_files(old_save)
+                deleted.append(old_save)
+                logging.info(f"Deleted old save: {old_save}")
+            except FileNotFoundError:
+                deleted.append(old_save)
+            except Exception as e:
+                logging.error(f"Error deleting old save {old_save}: {str(e)}")
+        originals = {row["original_path"] for row in map(self.catalog.get, deleted) if row and row["original_path"]}
+        self.catalog.remove(deleted)
+        # A file left without any snapshot must be saved again, even if it has not changed
+        for original_path in originals:
+            if not self.catalog.find_by_original_path(original_path, limit=1):
+                self.fingerprints.forget(original_path)
+        if collect_garbage:
+            self.collect_garbage(deleted)
+        return deleted
+
+    def collect_garbage(self, deleted):
+        if any(save.endswith(MANIFEST_SUFFIX) for save in deleted):
+            self.chunk_store.gc(self.list_manifests)
+        if any(save.endswith(PACKED_SUFFIX) for save in deleted):
+            self.pack_store.compact()
+
+    def list_manifests(self):
+        # GC safety depends on seeing every manifest, so this reads the disk rather
+        # than the catalog, which may lag behind a save that is still finishing
+        manifests = []
+        for app_dir in os.listdir(self.base_save_directory):
+            app_path = os.path.join(self.base_save_directory, app_dir)
+            if app_dir == CHUNKS_DIRECTORY or not os.path.isdir(app_path):
+                continue
+            for file in os.listdir(app_path):
+                if file.endswith(MANIFEST_SUFFIX):
+                    manifests.append(os.path.join(app_path, file))
+        return manifests
 
 if __name__ == "__main__":
     # Example usage
-    saver = Saver("C:/AutoSavePro/Saves")
+    saver = Saver(DEFAULT_SAVE_DIRECTORY)
     
     # Save a file
     saved_path = saver.save_file("C:/Users/YourUsername/Documents/test.txt", "BlocNotes")
@@ -98,4 +524,4 @@ if __name__ == "__main__":
         logging.warning("No saves found to restore")
     
     # Delete old saves
-    saver.delete_old_saves("BlocNotes", "test.txt", keep_count=5)
\ No newline at end of file
+    saver.delete_old_saves("BlocNotes", "test.txt", keep_count=5)
@@ -0,0 +1,69 @@
+import os
+import logging
+import threading
+
+
+class WatchRegistry:
+    # One observer watch per directory, shared by every (app, file) pair that lives in it.
+    # The watch is only removed when the last pair referencing the directory goes away.
+    def __init__(self, observer, event_handler):
+        self.observer = observer
+        self.event_handler = event_handler
+        self._watches = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def add(self, app_name, file_path):
+        directory = os.path.dirname(file_path)
+        with self._lock:
+            refs = self._refs.setdefault(directory, set())
+            if (app_name, file_path) in refs:
+                return False
+            refs.add((app_name, file_path))
+            if directory not in self._watches:
+                try:
+                    self._watches[directory] = self.observer.schedule(self.event_handler, directory, recursive=False)
+                except Exception:
+                    refs.discard((app_name, file_path))
+                    if not refs:
+                        del self._refs[directory]
+                    raise
+                logging.debug(f"Scheduled watch on {directory}")
+        return True
+
+    def remove(self, app_name, file_path):
+        directory = os.path.dirname(file_path)
+        with self._lock:
+            refs = self._refs.get(directory)
+            if not refs or (app_name, file_path) not in refs:
+                return False
+            refs.discard((app_name, file_path))
+            if not refs:
+                self._release(directory)
+        return True
+
+    def remove_app(self, app_name):
+        with self._lock:
+            for directory in list(self._refs):
+                refs = self._refs[directory]
+                refs.difference_update([ref for ref in refs if ref[0] == app_name])
+                if not refs:
+                    self._release(directory)
+
+    def _release(self, directory):
+        del self._refs[directory]
+        watch = self._watches.pop(directory, None)
+        if watch is not None:
+            try:
+                self.observer.unschedule(watch)
+                logging.debug(f"Unscheduled watch on {directory}")
+            except KeyError:
+                pass
+
+    def watched_directories(self):
+        with self._lock:
+            return list(self._watches)
+
+    def ref_count(self, directory):
+        with self._lock:
+            return len(self._refs.get(directory, ()))
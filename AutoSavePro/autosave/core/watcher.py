@@ -1,49 +1,79 @@
 # watcher.py
 import os
 import time
-import psutil
+import queue
 import logging
-from autosave.core.saver import Saver
+import importlib
+from autosave.core.saver import Saver, DEFAULT_SAVE_DIRECTORY
+from autosave.core.process_snapshot import ProcessSnapshot
+from autosave.core.open_files import default_open_files
+from autosave.core.coalescer import ChangeCoalescer
+from autosave.core.watch_registry import WatchRegistry
+from autosave.core.save_pipeline import SavePipeline
+from autosave.core.retention import RetentionWorker
+from autosave.core.replication import Replicator
+from autosave.core.adaptive import AdaptiveFrequency, DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL
+from autosave.core.metrics import REGISTRY, MetricsExporter
+from autosave.core.events import Signal
+from autosave.utils.file_utils import normalize_path
+from scheduler import DeadlineScheduler
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from autosave.apps.bloc_notes import BlocNotesHandler
-from PyQt5.QtCore import QObject, pyqtSignal
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Scheduler keys: the process table check, one periodic save per application, and one
+# save per file for applications in adaptive mode
+PROCESS_CHECK = ("check", None)
+
+def periodic_save_key(app_name):
+    return ("save", app_name)
+
+def adaptive_save_key(app_name, file_path):
+    return ("file", app_name, file_path)
+
+# Platform-specific helpers (module, class), imported only once such an app is configured
+APP_HANDLERS = {
+    "notepad.exe": ("autosave.apps.bloc_notes", "BlocNotesHandler"),
+}
+
+TICK_DURATION = REGISTRY.histogram("tick_duration_seconds", "Time of one process check over all applications")
+WATCH_ERRORS = REGISTRY.counter("watch_errors", "Files that could not be watched")
+
 class ApplicationWatcher:
     def __init__(self, app_name, file_extensions):
         self.app_name = app_name
         self.file_extensions = file_extensions
+        # str.endswith matches the whole tuple in one call
+        self.extension_matcher = tuple(file_extensions)
         self.is_running = False
         self.watched_files = set()
+        # Watched files that get no change events (found by an app handler, not observed)
+        self.unobserved_files = set()
         self.save_frequency = 300  # Default to 5 minutes
         self.last_save_time = time.time()
 
-    def check_if_running(self):
-        for proc in psutil.process_iter(['name']):
-            if self.app_name.lower() in proc.info['name'].lower():
-                self.is_running = True
-                logging.debug("{} is running with process name: {}".format(self.app_name, proc.info['name']))
-                return True
+    def check_if_running(self, snapshot=None):
+        snapshot = snapshot or ProcessSnapshot()
+        procs = snapshot.find(self.app_name)
+        # Called every tick: let logging format the message only if debug output is on
+        if procs:
+            self.is_running = True
+            logging.debug("%s is running with process name: %s", self.app_name, procs[0].info['name'])
+            return True
         self.is_running = False
-        logging.debug("{} is not running".format(self.app_name))
+        logging.debug("%s is not running", self.app_name)
         return False
 
-    def get_open_files(self):
+    def get_open_files(self, snapshot=None):
+        snapshot = snapshot or ProcessSnapshot()
         open_files = set()
-        for proc in psutil.process_iter(['name', 'open_files']):
-            if self.app_name.lower() in proc.info['name'].lower():
-                try:
-                    files = proc.open_files()
-                    for file in files:
-                        if any(file.path.endswith(ext) for ext in self.file_extensions):
-                            open_files.add(file.path)
-                            logging.debug("Found open file for {}: {}".format(self.app_name, file.path))
-                except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
-                    logging.warning("Unable to access files for {}: {}".format(self.app_name, str(e)))
-        logging.debug("Open files for {}: {}".format(self.app_name, open_files))
+        for proc in snapshot.find(self.app_name):
+            for path in snapshot.open_files(proc):
+                if path.endswith(self.extension_matcher):
+                    open_files.add(path)
+        logging.debug("Open files for %s: %s", self.app_name, open_files)
         return open_files
 
 class FileChangeHandler(FileSystemEventHandler):
@@ -54,115 +84,359 @@ class FileChangeHandler(FileSystemEventHandler):
         if not event.is_directory:
             self.callback(event.src_path)
 
-class Watcher(QObject):
-    log_signal = pyqtSignal(str)
+    def on_created(self, event):
+        if not event.is_directory:
+            self.callback(event.src_path)
+
+    def on_moved(self, event):
+        # Editors often save by writing a temp file and renaming it over the original
+        if not event.is_directory:
+            self.callback(event.dest_path)
 
-    def __init__(self, base_save_directory):
-        super().__init__()
+class Watcher:
+    def __init__(self, base_save_directory, quiet_period=2.0, process_check_interval=10,
+                 save_workers=2, save_queue_size=256, save_queue_policy="drop_oldest", io_budget_mb_s=None,
+                 metrics_port=None, metrics_dump_path=None, metrics_dump_interval=60, replica_directories=(),
+                 replica_bandwidth_mb_s=None):
+        # Subscribers (GUI log view, CLI logger...) receive every status message
+        self.log_signal = Signal()
         self.app_watchers = {}
         self.observer = Observer()
         self.saver = Saver(base_save_directory)
-        self.bloc_notes_handler = BlocNotesHandler()
+        self._app_handlers = {}
         self.base_save_directory = base_save_directory
+        # Raw watchdog events land here from the observer thread and are coalesced per
+        # path by the watcher loop, so one logical save produces one snapshot
+        self.event_queue = queue.Queue()
+        self.coalescer = ChangeCoalescer(quiet_period)
+        self.watch_registry = WatchRegistry(self.observer, FileChangeHandler(self.queue_change))
+        # normalized path -> (app name, path as reported by the app); kept in step with
+        # every ApplicationWatcher.watched_files so event dispatch is a single lookup
+        self.path_index = {}
+        self.process_check_interval = process_check_interval
+        # Outlives each tick's ProcessSnapshot so open descriptors are not re-examined
+        self.open_files = default_open_files()
+        # Periodic work (process checks, per-app saves) runs off one deadline heap; the
+        # loop sleeps exactly until the earliest deadline or the next file event
+        self.scheduler = DeadlineScheduler()
+        self.scheduler.schedule(PROCESS_CHECK, process_check_interval, first_delay=0)
+        # Per-file intervals for apps switched to adaptive mode, within a global I/O budget
+        self.adaptive = AdaptiveFrequency(io_budget_mb_s)
+        # Copies run here, never on the observer or watcher loop thread
+        self.save_pipeline = SavePipeline(save_workers, save_queue_size, save_queue_policy)
+        # Pruning is off until a policy is set, and then yields to pending saves
+        self.retention = RetentionWorker(self.saver, busy_check=lambda: self.save_pipeline.queue_depth() > 0)
+        # Second copies of every snapshot on other disks, throttled and behind foreground saves
+        self.replicator = None
+        if replica_directories:
+            self.replicator = Replicator(self.saver, replica_directories, replica_bandwidth_mb_s,
+                                         busy_check=lambda: self.save_pipeline.queue_depth() > 0)
+        self._stop_requested = False
+        # Prometheus text on localhost:metrics_port and/or a JSON file, both off by default
+        self.metrics_exporter = MetricsExporter(REGISTRY, metrics_port, dump_path=metrics_dump_path,
+                                                dump_interval=metrics_dump_interval)
+        self._register_metrics()
         self.log_signal.emit("Watcher initialized with base save directory: {}".format(base_save_directory))
 
+    def _register_metrics(self):
+        # Counts these components already keep are read when the metrics are scraped
+        events = REGISTRY.counter("events", "File system events for watched files", ("kind",))
+        events.labels("received").set_function(lambda: self.coalescer.events_received)
+        events.labels("coalesced").set_function(lambda: self.coalescer.events_coalesced)
+        jobs = REGISTRY.counter("save_jobs", "Save jobs by outcome", ("outcome",))
+        for outcome in ("submitted", "replaced", "dropped", "completed", "failed"):
+            jobs.labels(outcome).set_function(lambda outcome=outcome: getattr(self.save_pipeline, outcome))
+        REGISTRY.gauge("save_queue_depth", "Save jobs waiting for a worker").set_function(self.save_pipeline.queue_depth)
+        REGISTRY.gauge("pending_changes", "Changed files waiting for their quiet period").set_function(
+            self.coalescer.pending_count)
+        REGISTRY.gauge("watched_files", "Files watched for changes").set_function(lambda: len(self.path_index))
+        REGISTRY.counter("unchanged_skips", "Saves skipped because the file was unchanged").set_function(
+            lambda: self.saver.fingerprints.stat_hits + self.saver.fingerprints.hash_hits)
+        REGISTRY.counter("retention_deletions", "Snapshots removed by retention").set_function(
+            lambda: self.retention.deleted_total)
+
     def add_application(self, app_name, file_extensions):
+        if app_name in self.app_watchers:
+            self._unwatch_app(app_name)
         self.app_watchers[app_name] = ApplicationWatcher(app_name, file_extensions)
+        self.app_handler(app_name)
+        self.scheduler.schedule(periodic_save_key(app_name), self.app_watchers[app_name].save_frequency)
+        self.event_queue.put(None)
         self.log_signal.emit("Added application to watch: {} with extensions {}".format(app_name, file_extensions))
 
+    def app_handler(self, app_name):
+        # None when the app needs no helper or its platform modules are unavailable
+        if app_name not in APP_HANDLERS:
+            return None
+        if app_name not in self._app_handlers:
+            module_name, class_name = APP_HANDLERS[app_name]
+            try:
+                self._app_handlers[app_name] = getattr(importlib.import_module(module_name), class_name)()
+            except ImportError as e:
+                logging.error(f"Handler for {app_name} unavailable on this platform: {str(e)}")
+                self._app_handlers[app_name] = None
+        return self._app_handlers[app_name]
+
     def set_save_frequency(self, app_name, seconds):
         if app_name in self.app_watchers:
             self.app_watchers[app_name].save_frequency = seconds
+            if self.adaptive.is_adaptive(app_name):
+                for file_path in self.adaptive.remove_app(app_name):
+                    self.scheduler.cancel(adaptive_save_key(app_name, file_path))
+            if not self.scheduler.reschedule(periodic_save_key(app_name), seconds):
+                self.scheduler.schedule(periodic_save_key(app_name), seconds)
+            self.event_queue.put(None)  # wake the loop so the new deadline applies now
             self.log_signal.emit("Set save frequency for {} to {} seconds".format(app_name, seconds))
 
+    def set_adaptive_frequency(self, app_name, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        # Each file of the app is then saved at its own pace instead of all on one timer; the
+        # app's timer is kept for its unobserved files, which no change event ever reports
+        if app_name in self.app_watchers:
+            self.adaptive.set_bounds(app_name, min_interval, max_interval)
+            self.event_queue.put(None)
+            self.log_signal.emit("Set adaptive save frequency for {} ({}-{} seconds)".format(
+                app_name, min_interval, max_interval))
+
+    def set_io_budget(self, mb_per_second):
+        self.adaptive.set_io_budget(mb_per_second)
+        self.log_signal.emit("Set adaptive I/O budget to {} MB/s".format(mb_per_second))
+
+    def set_retention_policy(self, policy, app_name=None):
+        self.retention.set_policy(policy, app_name)
+        self.retention.start()
+        self.log_signal.emit("Set retention policy for {}".format(app_name or "all applications"))
+
     def stop_watching_app(self, app_name):
         if app_name in self.app_watchers:
-            watcher = self.app_watchers[app_name]
-            for file in watcher.watched_files:
-                self.observer.unschedule_all()
-            watcher.watched_files.clear()
+            self._unwatch_app(app_name)
             self.log_signal.emit("Stopped watching {}".format(app_name))
         else:
             self.log_signal.emit("Application {} not found".format(app_name))        
 
+    def set_process_check_interval(self, seconds):
+        self.process_check_interval = seconds
+        self.scheduler.reschedule(PROCESS_CHECK, seconds)
+        self.event_queue.put(None)  # wake the loop so the new cadence applies now
+        self.log_signal.emit("Set process check interval to {} seconds".format(seconds))
+
+    def _watch_file(self, app_name, file_path, schedule=True):
+        key = normalize_path(file_path)
+        if schedule:
+            # Watching the resolved directory means raw event paths are already
+            # normalized up to case, so queue_change can look them up without syscalls
+            self.watch_registry.add(app_name, key)
+            self.app_watchers[app_name].unobserved_files.discard(file_path)
+        elif file_path not in self.app_watchers[app_name].watched_files:
+            self.app_watchers[app_name].unobserved_files.add(file_path)
+        self.app_watchers[app_name].watched_files.add(file_path)
+        self.path_index.setdefault(key, (app_name, file_path))
+
+    def _unwatch_app(self, app_name):
+        watcher = self.app_watchers[app_name]
+        self.watch_registry.remove_app(app_name)
+        for file_path in watcher.watched_files:
+            self.scheduler.cancel(adaptive_save_key(app_name, file_path))
+            self.adaptive.forget(file_path)
+            key = normalize_path(file_path)
+            if self.path_index.get(key, (None,))[0] == app_name:
+                del self.path_index[key]
+                # Hand the path over to another app that also has it open, if any
+                for other_name, other in self.app_watchers.items():
+                    if other_name != app_name and file_path in other.watched_files:
+                        self.path_index[key] = (other_name, file_path)
+                        break
+        watcher.watched_files.clear()
+        watcher.unobserved_files.clear()
+
+    def queue_change(self, file_path):
+        # Called on the observer thread: drop siblings of watched files before doing
+        # anything else, and only enqueue otherwise, never do I/O here
+        if os.path.normcase(file_path) not in self.path_index:
+            return
+        self.event_queue.put((file_path, time.monotonic()))
+
+    def stop(self):
+        self._stop_requested = True
+        self.event_queue.put(None)
+
     def start_watching(self):
         self.log_signal.emit("Starting to watch applications...")
         logging.info("Watcher loop started")
-        while True:
-            for app_name, watcher in self.app_watchers.items():
-                if watcher.check_if_running():
-                    current_time = time.time()
-                    if current_time - watcher.last_save_time >= watcher.save_frequency:
-                        self.save_open_files(app_name)
-                        watcher.last_save_time = current_time
-
-                    open_files = watcher.get_open_files()
-                    new_files = open_files - watcher.watched_files
-                    for file in new_files:
-                        self.log_signal.emit("Now watching: {}".format(file))
-                        event_handler = FileChangeHandler(self.on_file_changed)
-                        self.observer.schedule(event_handler, os.path.dirname(file), recursive=False)
-                    watcher.watched_files.update(new_files)
-                else:
-                    for file in watcher.watched_files:
-                        self.log_signal.emit("Stopped watching: {}".format(file))
-                        self.observer.unschedule_all()
-                    watcher.watched_files.clear()
-
-            # Specific handling for Bloc-notes
-            if "notepad.exe" in self.app_watchers:
-                if self.bloc_notes_handler.is_notepad_running():
-                    self.bloc_notes_handler.find_notepad_windows()
-                    open_files = self.bloc_notes_handler.get_open_files()
-                    if open_files:
-                        self.log_signal.emit("Open files in Bloc-notes: {}".format(open_files))
-                        self.app_watchers["notepad.exe"].watched_files.update(open_files)
-                    else:
-                        self.log_signal.emit("No files open in Bloc-notes")
-                else:
-                    self.log_signal.emit("Notepad is not running")
+        while not self._stop_requested:
+            for key in self.scheduler.pop_due():
+                self._run_scheduled(key)
+
+            wake_at = [deadline for deadline in (self.scheduler.next_deadline(), self.coalescer.next_deadline())
+                       if deadline is not None]
+            timeout = max(0, min(wake_at) - time.monotonic()) if wake_at else None
+            try:
+                item = self.event_queue.get(timeout=timeout)
+                while True:
+                    if item is not None:
+                        self.coalescer.touch(*item)
+                    item = self.event_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            for file_path in self.coalescer.pop_due(time.monotonic()):
+                self.on_file_changed(file_path)
+
+    def _run_scheduled(self, key):
+        kind, app_name = key[0], key[1]
+        if kind == "check":
+            self.check_applications()
+            return
+        watcher = self.app_watchers.get(app_name)
+        if watcher is None:
+            self.scheduler.cancel(key)
+        elif kind == "file":
+            self._run_adaptive_save(key, app_name, key[2])
+        elif watcher.is_running:
+            if self.adaptive.is_adaptive(app_name):
+                for file_path in list(watcher.unobserved_files):
+                    self._submit_save(app_name, file_path)
+            else:
+                self.save_open_files(app_name)
+            watcher.last_save_time = time.time()
+
+    def _run_adaptive_save(self, key, app_name, file_path):
+        if not self.adaptive.is_adaptive(app_name):
+            self.scheduler.cancel(key)
+            return
+        if self.adaptive.take_dirty(file_path):
+            self._submit_save(app_name, file_path)
+        interval = self.adaptive.interval(file_path)
+        if interval != self.scheduler.interval(key):
+            self.scheduler.reschedule(key, interval)
+
+    def check_applications(self):
+        with TICK_DURATION.time():
+            self._check_applications()
 
-            time.sleep(10)  # Check every 10 seconds
+    def _check_applications(self):
+        self.saver.fingerprints.flush()
+        # One process table walk per check, shared by every application below
+        snapshot = ProcessSnapshot(self.open_files)
+        for app_name, watcher in list(self.app_watchers.items()):
+            if watcher.check_if_running(snapshot):
+                open_files = watcher.get_open_files(snapshot)
+                new_files = open_files - watcher.watched_files
+                for file in new_files:
+                    try:
+                        self._watch_file(app_name, file)
+                    except Exception as e:
+                        WATCH_ERRORS.inc()
+                        self.log_signal.emit("Unable to watch {}: {}".format(file, str(e)))
+                        continue
+                    self.log_signal.emit("Now watching: {}".format(file))
+            else:
+                for file in watcher.watched_files:
+                    self.log_signal.emit("Stopped watching: {}".format(file))
+                self._unwatch_app(app_name)
 
-    def save_open_files(self, app_name):
+        # Specific handling for Bloc-notes
+        bloc_notes_handler = self.app_handler("notepad.exe") if "notepad.exe" in self.app_watchers else None
+        if bloc_notes_handler is not None:
+            if bloc_notes_handler.is_notepad_running(snapshot):
+                bloc_notes_handler.find_notepad_windows()
+                open_files = bloc_notes_handler.get_open_files()
+                if open_files:
+                    self.log_signal.emit("Open files in Bloc-notes: {}".format(open_files))
+                    for file in open_files:
+                        self._watch_file("notepad.exe", file, schedule=False)
+                else:
+                    self.log_signal.emit("No files open in Bloc-notes")
+            else:
+                self.log_signal.emit("Notepad is not running")
+
+    def save_open_files(self, app_name, snapshot=None):
         watcher = self.app_watchers[app_name]
-        open_files = watcher.get_open_files()
+        open_files = watcher.get_open_files(snapshot or ProcessSnapshot(self.open_files))
         for file_path in open_files:
             self.on_file_changed(file_path)
 
     def on_file_changed(self, file_path):
+        entry = self.path_index.get(os.path.normcase(file_path)) or self.path_index.get(normalize_path(file_path))
+        if entry is None:
+            return
+        app_name = entry[0]
         self.log_signal.emit("File changed: {}".format(file_path))
-        for app_name, watcher in self.app_watchers.items():
-            if file_path in watcher.watched_files:
-                self.log_signal.emit("File belongs to {}".format(app_name))
-                if app_name == "notepad.exe" and file_path.lower().endswith('.txt'):
-                    save_path = os.path.join(self.base_save_directory, "BlocNotes", "AutoSave_{}".format(os.path.basename(file_path)))
-                    if self.bloc_notes_handler.save_document(file_path):
-                        try:
-                            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                            os.replace(file_path, save_path)
-                            self.log_signal.emit("Successfully saved Bloc-notes file to {}".format(save_path))
-                        except Exception as e:
-                            self.log_signal.emit("Error moving saved file: {}".format(str(e)))
-                    else:
-                        self.log_signal.emit("Failed to save Bloc-notes file")
-                else:
-                    if self.saver.save_file(file_path, app_name):
-                        self.log_signal.emit("Successfully saved file {} for {}".format(file_path, app_name))
-                    else:
-                        self.log_signal.emit("Failed to save file {} for {}".format(file_path, app_name))
-                break
+        self.log_signal.emit("File belongs to {}".format(app_name))
+        if self.adaptive.is_adaptive(app_name):
+            self._note_adaptive_change(app_name, entry[1])
+        else:
+            self._submit_save(app_name, file_path)
+
+    def _note_adaptive_change(self, app_name, file_path):
+        # The change is only recorded; the file's own deadline decides when it is saved
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        self.adaptive.observe_change(app_name, file_path, size)
+        key = adaptive_save_key(app_name, file_path)
+        interval = self.adaptive.interval(file_path)
+        if key not in self.scheduler:
+            self.scheduler.schedule(key, interval, first_delay=0)  # first change: save now
+        elif interval < self.scheduler.interval(key):
+            self.scheduler.reschedule(key, interval)
+
+    def _submit_save(self, app_name, file_path):
+        if not self.save_pipeline.submit(normalize_path(file_path), self._save_file, app_name, file_path):
+            self.log_signal.emit("Save not queued, skipped {}".format(file_path))
+
+    def _save_file(self, app_name, file_path):
+        if self.saver.is_unchanged(file_path):
+            logging.debug("Skipping {}: unchanged since its last snapshot".format(file_path))
+            return
+        bloc_notes_handler = self.app_handler(app_name) if app_name == "notepad.exe" else None
+        if bloc_notes_handler is not None and file_path.lower().endswith('.txt'):
+            save_path = os.path.join(self.base_save_directory, "BlocNotes", "AutoSave_{}".format(os.path.basename(file_path)))
+            if bloc_notes_handler.save_document(file_path):
+                try:
+                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+                    os.replace(file_path, save_path)
+                    self.log_signal.emit("Successfully saved Bloc-notes file to {}".format(save_path))
+                except Exception as e:
+                    self.log_signal.emit("Error moving saved file: {}".format(str(e)))
+            else:
+                self.log_signal.emit("Failed to save Bloc-notes file")
+        else:
+            started = time.perf_counter()
+            if self.saver.save_file(file_path, app_name):
+                if self.adaptive.is_adaptive(app_name):
+                    seconds = time.perf_counter() - started
+                    try:
+                        self.adaptive.observe_save(file_path, seconds, os.path.getsize(file_path))
+                    except OSError:
+                        pass  # deleted or renamed since it was saved
+                self.log_signal.emit("Successfully saved file {} for {}".format(file_path, app_name))
+            else:
+                self.log_signal.emit("Failed to save file {} for {}".format(file_path, app_name))
 
     def run(self):
+        self.metrics_exporter.start()
+        self.save_pipeline.start()
+        if self.replicator is not None:
+            self.replicator.start()
         self.observer.start()
         try:
             self.start_watching()
         except KeyboardInterrupt:
             self.log_signal.emit("Watcher stopped by user")
-            self.observer.stop()
+        self.observer.stop()
         self.observer.join()
+        self.retention.stop()
+        self.save_pipeline.stop(drain=True)
+        if self.replicator is not None:
+            self.replicator.stop()
+            self.log_signal.emit("Replication: {}".format(self.replicator.stats()))
+        self.saver.close()
+        self.metrics_exporter.stop()
+        self.log_signal.emit("Fingerprint cache: {}".format(self.saver.fingerprints.stats()))
+        self.log_signal.emit("Open files: {}".format(self.open_files.stats()))
 
 if __name__ == "__main__":
-    watcher = Watcher("C:/AutoSavePro/Saves")
+    watcher = Watcher(DEFAULT_SAVE_DIRECTORY)
     watcher.add_application("notepad.exe", [".txt"])
     watcher.run()
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, QComboBox, QLabel, QPushButton,
+                             QPlainTextEdit, QSplitter, QAbstractItemView, QHeaderView)
+from PyQt5.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from autosave.core.history import HistoryPager, HISTORY_PAGE_SIZE, previous_version, diff_snapshots, preview_snapshot
+
+COLUMNS = ("Date", "Fichier", "Taille", "Stockage")
+ROW_HEIGHT = 22
+ALL_FILES = "Tous les fichiers"
+DIFF_COLORS = {"+": "#60C060", "-": "#E06060", "@": "#60A0E0"}
+
+
+def format_size(size):
+    if size is None:
+        return ""
+    for unit in ("o", "Ko", "Mo"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+
+class _TaskSignals(QObject):
+    # (token, result, error); emitted from a pool thread, delivered on the GUI thread
+    finished = pyqtSignal(object, object, object)
+
+
+class _Task(QRunnable):
+    def __init__(self, token, function, signals):
+        super().__init__()
+        self.token = token
+        self.function = function
+        self.signals = signals
+
+    def run(self):
+        try:
+            result, error = self.function(), None
+        except Exception as e:
+            result, error = None, e
+        self.signals.finished.emit(self.token, result, error)
+
+
+class HistoryModel(QAbstractTableModel):
+    # Snapshot metadata of one app (or one file), newest first. Rows are fetched a page at
+    # a time on a pool thread whenever the view scrolls near the end of what is loaded, so
+    # opening a history of 100k versions only ever reads the pages scrolled through.
+    total_changed = pyqtSignal(int)
+
+    def __init__(self, saver, page_size=HISTORY_PAGE_SIZE, pool=None, parent=None):
+        super().__init__(parent)
+        self.saver = saver
+        self.page_size = page_size
+        self.pool = pool or QThreadPool.globalInstance()
+        self._rows = []
+        self._pager = None
+        self._loading = False
+        # Bumped on every filter change: pages still in flight for the old one are dropped
+        self._generation = 0
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._page_loaded)
+
+    def set_filter(self, app, file_name=None):
+        self.beginResetModel()
+        self._rows = []
+        self._generation += 1
+        self._loading = False
+        self._pager = HistoryPager(self.saver.catalog, app, file_name, self.page_size) if app else None
+        self.endResetModel()
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def row_at(self, row):
+        return self._rows[row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["timestamp"]))
+            if column == 1:
+                return row["file_name"]
+            if column == 2:
+                return format_size(row["size"])
+            return row["storage"]
+        if role == Qt.TextAlignmentRole and column == 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ToolTipRole:
+            return row["original_path"] or row["save_path"]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._pager is not None and not self._pager.exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        pager, first = self._pager, not self._rows
+
+        def load():
+            rows = pager.next_page()
+            return rows, pager.total() if first else None
+
+        self.pool.start(_Task(self._generation, load, self._signals))
+
+    def _page_loaded(self, generation, result, error):
+        if generation != self._generation:
+            return
+        self._loading = False
+        if error is not None:
+            logging.error(f"Error loading snapshot history: {str(error)}")
+            return
+        rows, total = result
+        if total is not None:
+            self.total_changed.emit(total)
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+
+class DiffHighlighter(QSyntaxHighlighter):
+    def highlightBlock(self, text):
+        color = DIFF_COLORS.get(text[:1])
+        if color is not None:
+            text_format = QTextCharFormat()
+            text_format.setForeground(QColor(color))
+            self.setFormat(0, len(text), text_format)
+
+
+class HistoryView(QWidget):
+    # Version history of the saved files. Selecting a snapshot shows what changed since
+    # the previous version of the same file, selecting two compares them. Diffs are built
+    # on a pool thread once the selection has settled, the newest request winning.
+    def __init__(self, saver, diff_delay_ms=150, parent=None):
+        super().__init__(parent)
+        self.saver = saver
+        self.model = HistoryModel(saver, parent=self)
+        # Diffs get their own threads so that a slow one never holds up the next page
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self._diff_generation = 0
+        self._diff_signals = _TaskSignals()
+        self._diff_signals.finished.connect(self._diff_ready)
+        # Arrowing through the list only diffs the row it stops on
+        self.diff_timer = QTimer(self)
+        self.diff_timer.setSingleShot(True)
+        self.diff_timer.setInterval(diff_delay_ms)
+        self.diff_timer.timeout.connect(self.show_diff)
+
+        self.app_combo = QComboBox()
+        self.app_combo.currentTextChanged.connect(self._app_changed)
+        self.file_combo = QComboBox()
+        self.file_combo.currentTextChanged.connect(lambda _: self._apply_filter())
+        self.refresh_button = QPushButton("Actualiser")
+        self.refresh_button.clicked.connect(self.refresh)
+        self.count_label = QLabel("")
+        self.model.total_changed.connect(lambda total: self.count_label.setText(f"{total} versions"))
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        # Fixed row height: no size hint is asked per row, only the visible rows are laid out
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 160)
+        self.table.setColumnWidth(1, 240)
+        self.table.selectionModel().selectionChanged.connect(lambda *_: self.diff_timer.start())
+        self.table.setStyleSheet("""
+            QTableView {
+                background-color: #1E1E1E;
+                color: #CCCCCC;
+                border: none;
+                selection-background-color: #4A4A4A;
+            }
+        """)
+
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.diff_view.setStyleSheet("""
+            QPlainTextEdit {
+                background-color: #1E1E1E;
+                color: #CCCCCC;
+                border: none;
+                font-family: Consolas, Monaco, monospace;
+                font-size: 12px;
+            }
+        """)
+        self.highlighter = DiffHighlighter(self.diff_view.document())
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel("Application :"))
+        header.addWidget(self.app_combo)
+        header.addWidget(QLabel("Fichier :"))
+        header.addWidget(self.file_combo, 1)
+        header.addWidget(self.refresh_button)
+        header.addWidget(self.count_label)
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.diff_view)
+        layout = QVBoxLayout(self)
+        layout.addLayout(header)
+        layout.addWidget(splitter)
+
+        self.refresh()
+
+    def refresh(self):
+        # Reloads the app list and the history, keeping the current selection when possible
+        current = self.app_combo.currentText()
+        apps = self.saver.catalog.apps()
+        self.app_combo.blockSignals(True)
+        self.app_combo.clear()
+        self.app_combo.addItems(apps)
+        if current in apps:
+            self.app_combo.setCurrentText(current)
+        self.app_combo.blockSignals(False)
+        self._app_changed(self.app_combo.currentText())
+
+    def _app_changed(self, app):
+        current = self.file_combo.currentText()
+        files = self.saver.catalog.files(app) if app else []
+        self.file_combo.blockSignals(True)
+        self.file_combo.clear()
+        self.file_combo.addItem(ALL_FILES)
+        self.file_combo.addItems(files)
+        if current in files:
+            self.file_combo.setCurrentText(current)
+        self.file_combo.blockSignals(False)
+        self._apply_filter()
+
+    def _apply_filter(self):
+        file_name = self.file_combo.currentText()
+        self.count_label.setText("")
+        self.diff_timer.stop()
+        self._diff_generation += 1
+        self.diff_view.clear()
+        self.model.set_filter(self.app_combo.currentText() or None, None if file_name == ALL_FILES else file_name)
+
+    def show_diff(self):
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        self._diff_generation += 1
+        if not rows:
+            self.diff_view.clear()
+            return
+        saver = self.saver
+        newer = self.model.row_at(rows[0])
+        older = self.model.row_at(rows[-1]) if len(rows) > 1 else None
+
+        def build():
+            base = older or previous_version(saver.catalog, newer)
+            if base is None:
+                return preview_snapshot(saver, newer["save_path"])
+            return diff_snapshots(saver, base["save_path"], newer["save_path"]) or ["Aucune différence"]
+
+        self.diff_view.setPlainText("Chargement...")
+        self.pool.start(_Task(self._diff_generation, build, self._diff_signals))
+
+    def _diff_ready(self, generation, lines, error):
+        if generation != self._diff_generation:
+            return
+        if error is not None:
+            logging.error(f"Error comparing snapshots: {str(error)}")
+            self.diff_view.setPlainText(f"Erreur : {str(error)}")
+            return
+        self.diff_view.setPlainText("\n".join(lines))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+from collections import deque
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QListView, QComboBox, QLabel, QAbstractItemView
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QTimer
+
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+LEVEL_COLORS = {
+    logging.DEBUG: "#888888",
+    logging.INFO: "#CCCCCC",
+    logging.WARNING: "#E0B050",
+    logging.ERROR: "#E06060",
+}
+
+
+def guess_level(message):
+    # Watcher messages are plain strings; failures are recognised by their wording
+    lowered = message.lower()
+    if "error" in lowered or "failed" in lowered:
+        return logging.ERROR
+    if "unable" in lowered or "skipped" in lowered or "not found" in lowered:
+        return logging.WARNING
+    return logging.INFO
+
+
+class LogBuffer:
+    # Filled from any thread (watcher loop, save workers, logging), drained by the GUI
+    # timer. Bounded: under a flood the oldest pending messages are dropped and counted.
+    def __init__(self, max_pending=10000):
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def append(self, message, level=None):
+        entry = (time.time(), guess_level(message) if level is None else level, message)
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(entry)
+
+    def drain(self):
+        with self._lock:
+            entries = list(self._pending)
+            self._pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        return entries, dropped
+
+
+class BufferLogHandler(logging.Handler):
+    # Sends logging records (warnings and errors by default) to the log view
+    def __init__(self, buffer, level=logging.WARNING):
+        super().__init__(level)
+        self.buffer = buffer
+
+    def emit(self, record):
+        try:
+            self.buffer.append(record.getMessage(), record.levelno)
+        except Exception:
+            self.handleError(record)
+
+
+class LogModel(QAbstractListModel):
+    # Keeps the last `capacity` messages; older rows are removed as new batches arrive
+    def __init__(self, capacity=5000, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._entries = deque()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def level_at(self, row):
+        return self._entries[row][1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        stamp, level, message = self._entries[index.row()]
+        if role == Qt.DisplayRole:
+            # Formatted on demand, only for the rows actually on screen
+            return "{} {:<7} {}".format(time.strftime("%H:%M:%S", time.localtime(stamp)),
+                                        logging.getLevelName(level), message)
+        if role == Qt.ForegroundRole:
+            return QColor(LEVEL_COLORS.get(level, "#CCCCCC"))
+        return None
+
+    def append_batch(self, entries):
+        if not entries:
+            return
+        entries = entries[-self.capacity:]
+        overflow = len(self._entries) + len(entries) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._entries.popleft()
+            self.endRemoveRows()
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._entries.extend(entries)
+        self.endInsertRows()
+
+
+class LevelFilterModel(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.min_level = logging.INFO
+
+    def set_min_level(self, level):
+        self.min_level = level
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.sourceModel().level_at(source_row) >= self.min_level
+
+
+class LogView(QWidget):
+    # Log panel of the main window. append() is cheap and thread-safe; rows reach the
+    # model in one batch per flush_interval_ms, and the list view only lays out the
+    # rows that are visible.
+    def __init__(self, capacity=5000, flush_interval_ms=200, parent=None):
+        super().__init__(parent)
+        self.buffer = LogBuffer()
+        self.model = LogModel(capacity, self)
+        self.proxy = LevelFilterModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.dropped_total = 0
+
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(list(LEVELS))
+        self.level_combo.setCurrentText("INFO")
+        self.level_combo.currentTextChanged.connect(lambda name: self.proxy.set_min_level(LEVELS[name]))
+        self.status_label = QLabel("")
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setStyleSheet("""
+            QListView {
+                background-color: #1E1E1E;
+                color: #CCCCCC;
+                border: none;
+                font-family: Consolas, Monaco, monospace;
+                font-size: 12px;
+            }
+        """)
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel("Niveau :"))
+        header.addWidget(self.level_combo)
+        header.addStretch()
+        header.addWidget(self.status_label)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(header)
+        layout.addWidget(self.view)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(flush_interval_ms)
+
+    def append(self, message, level=None):
+        self.buffer.append(message, level)
+
+    def flush(self):
+        entries, dropped = self.buffer.drain()
+        if dropped:
+            self.dropped_total += dropped
+            self.status_label.setText("{} messages ignorés".format(self.dropped_total))
+        if not entries:
+            return
+        # Follow new messages only if the user has not scrolled up to read older ones
+        scroll_bar = self.view.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 2
+        self.model.append_batch(entries)
+        if at_bottom:
+            self.view.scrollToBottom()
@@ -2,21 +2,21 @@
 
 import sys
 import os
+import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, 
                              QVBoxLayout, QHBoxLayout, QWidget, QListWidget, 
-                             QListWidgetItem, QComboBox, QFileDialog, QFrame,
-                             QTextEdit)
+                             QListWidgetItem, QComboBox, QFileDialog, QFrame)
 from PyQt5.QtGui import QIcon, QPixmap, QFont, QPainter, QColor, QBrush
 from PyQt5.QtCore import Qt, QSize, QRectF, pyqtSignal, QThread
 from autosave.core.watcher import Watcher
+from autosave.core.saver import DEFAULT_SAVE_DIRECTORY
+from autosave.gui.log_view import LogView, BufferLogHandler
+from autosave.gui.history_view import HistoryView
 
 class WatcherThread(QThread):
-    log_signal = pyqtSignal(str)
-
     def __init__(self, base_save_directory):
         super().__init__()
         self.watcher = Watcher(base_save_directory)
-        self.watcher.log_signal.connect(self.log_signal.emit)
 
     def run(self):
         self.watcher.run()
@@ -70,7 +70,7 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(logo_label, alignment=Qt.AlignCenter)
 
         # Menu buttons
-        menu_buttons = ["Dashboard", "Applications", "Settings", "About"]
+        menu_buttons = ["Dashboard", "Applications", "History", "Settings", "About"]
         for button_text in menu_buttons:
             button = QPushButton(button_text)
             button.setStyleSheet("""
@@ -85,6 +85,8 @@ class MainWindow(QMainWindow):
                     background-color: #3A3A3A;
                 }
             """)
+            if button_text == "History":
+                button.clicked.connect(self.show_history)
             left_layout.addWidget(button)
 
         left_layout.addStretch()
@@ -137,19 +139,10 @@ class MainWindow(QMainWindow):
         self.add_app_button.clicked.connect(self.add_new_application)
         right_layout.addWidget(self.add_app_button)
 
-        # Log display
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
-        self.log_display.setStyleSheet("""
-            QTextEdit {
-                background-color: #1E1E1E;
-                color: #CCCCCC;
-                border: none;
-                font-family: Consolas, Monaco, monospace;
-                font-size: 12px;
-            }
-        """)
-        right_layout.addWidget(self.log_display)
+        # Log display: bounded, filtered by level, refreshed in batches
+        self.log_view = LogView()
+        right_layout.addWidget(self.log_view)
+        logging.getLogger().addHandler(BufferLogHandler(self.log_view.buffer))
 
         main_layout.addWidget(right_panel, 1)  # 1 is the stretch factor
 
@@ -159,9 +152,24 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
         # Initialize and start the watcher thread
-        self.watcher_thread = WatcherThread("C:/AutoSavePro/Saves")
-        self.watcher_thread.log_signal.connect(self.update_log)
+        self.watcher_thread = WatcherThread(DEFAULT_SAVE_DIRECTORY)
+        # Called directly on the watcher's threads: queuing one GUI event per message is
+        # what used to saturate the UI, the buffer is flushed by the log view's timer
+        self.watcher_thread.watcher.log_signal.connect(self.log_view.append)
         self.watcher_thread.start()
+        self.history_view = None
+
+    def show_history(self):
+        # Separate window, built on first use: it reads the watcher's catalog and snapshots
+        if self.history_view is None:
+            self.history_view = HistoryView(self.watcher_thread.watcher.saver)
+            self.history_view.setWindowTitle("AutoSavePro - Historique")
+            self.history_view.setStyleSheet("background-color: #2C2C2C; color: white;")
+            self.history_view.resize(1000, 700)
+        else:
+            self.history_view.refresh()
+        self.history_view.show()
+        self.history_view.raise_()
 
     def add_app_item(self, app_name, icon_name):
         item = QListWidgetItem(self.app_list)
@@ -182,7 +190,7 @@ class MainWindow(QMainWindow):
         item_layout.addStretch()
 
         freq_combo = QComboBox()
-        freq_combo.addItems(["05min", "10min", "15min", "1h"])
+        freq_combo.addItems(["05min", "10min", "15min", "1h", "Auto"])
         freq_combo.setStyleSheet("""
             QComboBox {
                 background-color: #3A3A3A;
@@ -228,10 +236,14 @@ class MainWindow(QMainWindow):
                 self.update_log(f"Error adding application {app_name}: {str(e)}")       
 
     def update_log(self, message):
-        self.log_display.append(message)
-        self.log_display.verticalScrollBar().setValue(self.log_display.verticalScrollBar().maximum())
+        self.log_view.append(message)
 
     def change_save_frequency(self, app_name, frequency):
+        if frequency == "Auto":
+            # Chaque fichier est sauvegardé selon son propre rythme de modification
+            self.watcher_thread.watcher.set_adaptive_frequency(app_name)
+            self.update_log("Changed save frequency for {} to adaptive".format(app_name))
+            return
         # Convertir la fréquence en secondes
         freq_map = {"05min": 300, "10min": 600, "15min": 900, "1h": 3600}
         seconds = freq_map.get(frequency, 300)  # default to 5 minutes
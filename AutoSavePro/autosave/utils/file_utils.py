@@ -0,0 +1,7 @@
+import os
+
+
+def normalize_path(path):
+    # Canonical form used as a lookup key: symlinks resolved, case folded where the
+    # filesystem is case-insensitive (os.path.normcase is a no-op on POSIX)
+    return os.path.normcase(os.path.realpath(path))
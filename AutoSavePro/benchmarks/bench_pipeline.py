@@ -0,0 +1,272 @@
+# Benchmark of the watch -> save pipeline on synthetic workloads (Linux, headless).
+#
+#   cd AutoSavePro && python -m benchmarks.bench_pipeline --apps 4 --files 8 --file-size 1M \
+#       --write-rate 2 --duration 30 --output run.json [--compare previous.json]
+#
+# Each fake "app" is a Python interpreter started through a symlink named benchappNN, so
+# it shows up under that name in the process table while holding its files open. The
+# harness rewrites blocks of those files at the requested rate and measures, through the
+# real Watcher/ApplicationWatcher/Saver, how long it takes for each write to be in a snapshot.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from autosave.core.watcher import Watcher
+from autosave.utils.file_utils import normalize_path
+
+# Keeps every file open until stdin is closed
+HOLDER = "import sys\nfiles = [open(path, 'rb') for path in sys.argv[1:]]\nsys.stdin.read()\n"
+EXTENSION = ".dat"
+METRICS = ("tick_cpu_ms_p95", "latency_p50_s", "latency_p95_s", "latency_p99_s",
+           "throughput_mb_s", "peak_rss_mb")
+
+
+def parse_size(value):
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper()
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def busy_seconds(windows):
+    # Length of the union of (start, end) windows: time during which a save was running
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(windows):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+class Workload:
+    def __init__(self, root, apps, files, sizes, write_rate, write_size, seed):
+        self.root = root
+        self.apps = apps
+        self.write_rate = write_rate
+        self.write_size = write_size
+        self.random = random.Random(seed)
+        self.processes = []
+        self.files = {}  # app name -> [file paths]
+        self._lock = threading.Lock()
+        self._pending_writes = {}  # file path -> times of writes not yet in a snapshot
+        self.writes = 0
+        self._stopped = threading.Event()
+        bin_dir = os.path.join(root, "bin")
+        data_dir = os.path.join(root, "data")
+        os.makedirs(bin_dir)
+        os.makedirs(data_dir)
+        for app_index in range(apps):
+            app_name = f"benchapp{app_index:02d}"
+            paths = []
+            for file_index in range(files):
+                path = os.path.realpath(os.path.join(data_dir, f"{app_name}_{file_index:03d}{EXTENSION}"))
+                size = sizes[(app_index * files + file_index) % len(sizes)]
+                with open(path, 'wb') as dst:
+                    dst.write(self.random.randbytes(size))
+                paths.append(path)
+            self.files[app_name] = paths
+            executable = os.path.join(bin_dir, app_name)
+            os.symlink(sys.executable, executable)
+            self.processes.append(subprocess.Popen([executable, "-c", HOLDER] + paths, stdin=subprocess.PIPE))
+
+    def all_files(self):
+        return [path for paths in self.files.values() for path in paths]
+
+    def run_writer(self):
+        # Every file is rewritten write_rate times per second, at random offsets
+        period = 1.0 / self.write_rate
+        paths = self.all_files()
+        next_write = {path: time.monotonic() + self.random.random() * period for path in paths}
+        while not self._stopped.is_set():
+            path = min(next_write, key=next_write.get)
+            delay = next_write[path] - time.monotonic()
+            if delay > 0 and self._stopped.wait(delay):
+                break
+            size = os.path.getsize(path)
+            with open(path, 'r+b') as dst:
+                dst.seek(self.random.randrange(max(1, size - self.write_size)))
+                dst.write(self.random.randbytes(min(self.write_size, size)))
+            with self._lock:
+                self._pending_writes.setdefault(normalize_path(path), []).append(time.monotonic())
+                self.writes += 1
+            next_write[path] += period
+
+    def take_pending(self, file_path):
+        with self._lock:
+            return self._pending_writes.pop(normalize_path(file_path), [])
+
+    def stop_writing(self):
+        self._stopped.set()
+
+    def close(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.stdin.close()
+                process.wait(timeout=10)
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="autosave-bench-")
+    sizes = [parse_size(size) for size in args.file_size.split(",")]
+    workload = None
+    try:
+        workload = Workload(root, args.apps, args.files, sizes, args.write_rate, parse_size(args.write_size),
+                            args.seed)
+        watcher = Watcher(os.path.join(root, "saves"), quiet_period=args.quiet_period,
+                          process_check_interval=args.process_check_interval, save_workers=args.save_workers)
+        watcher.saver.storage_mode = args.storage_mode
+        for app_name in workload.files:
+            watcher.add_application(app_name, [EXTENSION])
+
+        ticks = []
+        check_applications = watcher.check_applications
+
+        def timed_check():
+            started = time.thread_time()
+            check_applications()
+            ticks.append(time.thread_time() - started)
+        watcher.check_applications = timed_check
+
+        latencies = []
+        save_windows = []
+        save_file = watcher.saver.save_file
+
+        def timed_save(file_path, app_name):
+            # Writes seen before the save started are covered by this snapshot
+            writes = workload.take_pending(file_path)
+            started = time.monotonic()
+            result = save_file(file_path, app_name)
+            finished = time.monotonic()
+            save_windows.append((started, finished))
+            if result:
+                latencies.extend(finished - written for written in writes)
+            return result
+        watcher.saver.save_file = timed_save
+
+        watcher_thread = threading.Thread(target=watcher.run, name="bench-watcher")
+        writer_thread = threading.Thread(target=workload.run_writer, name="bench-writer")
+        started = time.monotonic()
+        cpu_started = time.process_time()
+        watcher_thread.start()
+        # Let the first process check discover the open files before writing
+        time.sleep(args.process_check_interval + 1)
+        writer_thread.start()
+        time.sleep(args.duration)
+        workload.stop_writing()
+        writer_thread.join()
+        # The apps keep running until the last writes have settled and been saved
+        time.sleep(args.quiet_period + 1)
+        watcher.stop()
+        watcher_thread.join()
+        elapsed = time.monotonic() - started
+
+        saver = watcher.saver
+        busy = busy_seconds(save_windows)
+        results = {
+            "writes": workload.writes,
+            "snapshots": len(save_windows),
+            "ticks": len(ticks),
+            "tick_cpu_ms_p50": percentile(ticks, 0.50) * 1000,
+            "tick_cpu_ms_p95": percentile(ticks, 0.95) * 1000,
+            "tick_cpu_ms_max": max(ticks, default=0) * 1000,
+            "latency_samples": len(latencies),
+            "latency_p50_s": percentile(latencies, 0.50),
+            "latency_p95_s": percentile(latencies, 0.95),
+            "latency_p99_s": percentile(latencies, 0.99),
+            "latency_max_s": max(latencies, default=0),
+            "logical_bytes": saver.total_logical_bytes,
+            "bytes_written": saver.total_bytes_written,
+            "throughput_mb_s": saver.total_logical_bytes / busy / 1024 ** 2 if busy else 0.0,
+            "process_cpu_s": time.process_time() - cpu_started,
+            "wall_s": elapsed,
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "events_received": watcher.coalescer.events_received,
+            "events_coalesced": watcher.coalescer.events_coalesced,
+            "pipeline": watcher.save_pipeline.stats(),
+        }
+        return results
+    finally:
+        if workload is not None:
+            workload.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(results, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as src:
+        previous = json.load(src)["results"]
+    for metric in METRICS:
+        before, after = previous.get(metric), results.get(metric)
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        print(f"{metric:<18} {before:>12.4f} -> {after:>12.4f}  ({change})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AutoSavePro watch -> save pipeline")
+    parser.add_argument("--apps", type=int, default=2, help="Number of fake applications")
+    parser.add_argument("--files", type=int, default=4, help="Files held open by each application")
+    parser.add_argument("--file-size", default="256K", help="File sizes, comma separated (e.g. 64K,4M)")
+    parser.add_argument("--write-rate", type=float, default=0.25,
+                        help="Writes per second to each file; above 1/quiet-period writes coalesce")
+    parser.add_argument("--write-size", default="4K", help="Bytes rewritten by each write")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of writing")
+    parser.add_argument("--storage-mode", default="copy", choices=("copy", "chunked", "delta"))
+    parser.add_argument("--quiet-period", type=float, default=2.0)
+    parser.add_argument("--process-check-interval", type=float, default=2.0)
+    parser.add_argument("--save-workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Previous JSON result to compare against")
+    args = parser.parse_args(argv)
+
+    if not sys.platform.startswith("linux"):
+        parser.error("the benchmark harness only runs on Linux")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = run(args)
+    report = {
+        "config": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as dst:
+            json.dump(report, dst, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,19 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from autosave.gui.main_window import MainWindow
-from PyQt5.QtWidgets import QApplication
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-
 def main():
+    # Headless mode: no Qt is imported at all, see autosave/cli.py
+    if len(sys.argv) > 1 and sys.argv[1] == "--headless":
+        from autosave.cli import main as cli_main
+        return cli_main(sys.argv[2:])
+
+    from autosave.gui.main_window import MainWindow
+    from PyQt5.QtWidgets import QApplication
+
+    # Set up logging
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
     logging.info("Starting AutoSavePro application")
     
     app = QApplication(sys.argv)
@@ -17,13 +22,11 @@ def main():
     # Créer la fenêtre principale
     mainWin = MainWindow()
     
-    # Créer et configurer le watcher
-    base_save_directory = "C:/AutoSavePro/Saves"
+    # Créer et configurer le watcher (sauvegardes dans DEFAULT_SAVE_DIRECTORY)
     watcher = mainWin.watcher_thread.watcher
     watcher.add_application("notepad.exe", [".txt"])
     
-    # Connecter le watcher à la fenêtre principale
-    watcher.log_signal.connect(mainWin.update_log)
+    # Le watcher est déjà relié au journal de la fenêtre principale (MainWindow)
     
     # Afficher la fenêtre principale
     mainWin.show()
@@ -36,4 +39,4 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
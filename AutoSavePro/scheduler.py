@@ -0,0 +1,129 @@
+import time
+import heapq
+import random
+import zlib
+import logging
+import threading
+
+
+class _Task:
+    def __init__(self, key, interval, nominal):
+        self.key = key
+        self.interval = interval
+        self.nominal = nominal  # deadline before jitter, so jitter never accumulates
+        self.deadline = nominal
+        self.last_run = None
+        self.generation = None
+
+
+class DeadlineScheduler:
+    # Min-heap of recurring deadlines keyed by anything hashable (an app, a file...).
+    # The owner sleeps until next_deadline() and runs whatever pop_due() returns.
+    # A task's first run is spread over its interval by a stable phase derived from its
+    # key, and every run is shifted by up to +/- jitter * interval, so many tasks with the
+    # same interval do not all fire in the same second. Rescheduled or cancelled tasks
+    # leave stale heap entries behind; they are skipped when they surface.
+    def __init__(self, jitter=0.05, clock=time.monotonic, seed=None):
+        self.jitter = jitter
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._tasks = {}
+        self._heap = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, key, interval, first_delay=None):
+        # first_delay=None spreads the first run over [0, interval)
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        with self._lock:
+            now = self.clock()
+            if first_delay is None:
+                first_delay = self._phase(key) * interval
+            task = _Task(key, interval, now + first_delay)
+            self._tasks[key] = task
+            self._push(task, task.nominal)
+
+    def reschedule(self, key, interval):
+        # Applies a new interval right away, counted from the last run (or from now if it
+        # never ran); a task that is already overdue under the new interval runs at once
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                return False
+            now = self.clock()
+            task.interval = interval
+            task.nominal = max(now, (task.last_run if task.last_run is not None else now) + interval)
+            self._push(task, task.nominal)
+            return True
+
+    def cancel(self, key):
+        with self._lock:
+            return self._tasks.pop(key, None) is not None
+
+    def next_deadline(self):
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        # Returns the keys whose deadline has passed, earliest first, and re-arms them
+        due = []
+        with self._lock:
+            now = self.clock() if now is None else now
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, key, _ = heapq.heappop(self._heap)
+                task = self._tasks[key]
+                task.last_run = now
+                task.nominal += task.interval
+                if task.nominal <= now:
+                    # Missed whole periods (suspend, long stall): do not replay them
+                    task.nominal = now + task.interval
+                self._push(task, task.nominal + self._random.uniform(-self.jitter, self.jitter) * task.interval)
+                due.append(key)
+            if len(self._heap) > 2 * len(self._tasks) + 64:
+                self._compact()
+        if due:
+            logging.debug(f"Scheduler: {len(due)} tasks due")
+        return due
+
+    def interval(self, key):
+        with self._lock:
+            task = self._tasks.get(key)
+            return task.interval if task else None
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._tasks
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def _push(self, task, deadline):
+        # The counter is unique across tasks, so a heap entry of a cancelled task never
+        # matches a new task scheduled under the same key
+        self._counter += 1
+        task.generation = self._counter
+        task.deadline = deadline
+        heapq.heappush(self._heap, (deadline, self._counter, task.key, task.generation))
+
+    def _drop_stale(self):
+        while self._heap:
+            _, _, key, generation = self._heap[0]
+            task = self._tasks.get(key)
+            if task is not None and task.generation == generation:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap
+                      if entry[2] in self._tasks and self._tasks[entry[2]].generation == entry[3]]
+        heapq.heapify(self._heap)
+
+    def _phase(self, key):
+        # Stable in [0, 1) for a key, so restarts keep the same spread
+        return zlib.crc32(repr(key).encode('utf-8')) / 2 ** 32
@@ -0,0 +1,52 @@
+import unittest
+from unittest import mock
+from autosave.core.adaptive import AdaptiveFrequency
+
+MB = 1024 * 1024
+
+
+class AdaptiveFrequencyTest(unittest.TestCase):
+    def setUp(self):
+        self.frequency = AdaptiveFrequency(io_budget_mb_s=1, rebalance_interval=1.0)
+        self.frequency.set_bounds("app", 1, 3600)
+
+    def edit(self, file_path, size, times):
+        for now in times:
+            self.frequency.observe_change("app", file_path, size, now)
+
+    def test_interval_follows_the_change_rate(self):
+        self.edit("busy.txt", 1000, (0, 20, 40))
+        self.edit("idle.txt", 1000, (0, 5))
+        self.edit("new.txt", 1000, (40,))
+        self.assertAlmostEqual(self.frequency.interval("busy.txt", now=40), 20)
+        # Time without changes counts: an idle file drifts towards the max
+        self.assertAlmostEqual(self.frequency.interval("idle.txt", now=40), 35)
+        self.assertEqual(self.frequency.interval("idle.txt", now=10000), 3600)
+        self.assertEqual(self.frequency.interval("new.txt", now=40), 3600)
+
+    def test_budget_is_shared_fairly(self):
+        # Every file changes every 10 s; the two big ones would need 1 MB/s each
+        for file_path, size in (("small.txt", 10 * 1024), ("big1.psd", 10 * MB), ("big2.psd", 10 * MB)):
+            self.edit(file_path, size, (0, 10, 20))
+        self.assertAlmostEqual(self.frequency.interval("small.txt", now=20), 10)
+        # The small file keeps its rate, the rest of the budget is split between the big ones
+        remaining = MB - 1024
+        self.assertAlmostEqual(self.frequency.interval("big1.psd", now=20), 10 * MB / (remaining / 2))
+        self.assertAlmostEqual(self.frequency.interval("big2.psd", now=20), 10 * MB / (remaining / 2))
+
+    def test_changes_do_not_force_a_rebalance(self):
+        self.edit("other.txt", 1000, (0,))
+        with mock.patch.object(self.frequency, "_rebalance", wraps=self.frequency._rebalance) as rebalance:
+            for step in range(100):
+                now = step * 0.05
+                self.frequency.observe_change("app", "busy.txt", 1100 + step, now)
+                self.frequency.interval("busy.txt", now)
+            # The first change of a new file, then once per rebalance_interval
+            self.assertEqual(rebalance.call_count, 5)
+            self.frequency.observe_change("app", "busy.txt", 5000, 5.0)
+            self.frequency.interval("busy.txt", 5.0)
+            self.assertEqual(rebalance.call_count, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks import bench_pipeline
+
+
+class HelpersTest(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual([bench_pipeline.parse_size(value) for value in ("512", "4k", "1.5M", " 1G ")],
+                         [512, 4096, 1536 * 1024, 1024 ** 3])
+
+    def test_busy_seconds_counts_overlaps_once(self):
+        self.assertEqual(bench_pipeline.busy_seconds([(0, 2), (1, 3), (5, 6), (5.5, 5.7)]), 4)
+        self.assertEqual(bench_pipeline.busy_seconds([]), 0)
+
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(bench_pipeline.percentile(values, 0.5), 51)
+        self.assertEqual(bench_pipeline.percentile(values, 0.99), 100)
+        self.assertEqual(bench_pipeline.percentile([], 0.5), 0.0)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "the benchmark harness only runs on Linux")
+class BenchmarkRunTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_short_run_reports_and_compares(self):
+        output = os.path.join(self.root, "run.json")
+        argv = ["--apps", "1", "--files", "2", "--file-size", "16K", "--write-rate", "2", "--duration", "1",
+                "--quiet-period", "0.2", "--process-check-interval", "0.5", "--output", output]
+        with mock.patch("sys.stdout", io.StringIO()):
+            self.assertEqual(bench_pipeline.main(argv), 0)
+        with open(output, 'r', encoding='utf-8') as src:
+            report = json.load(src)
+        results = report["results"]
+        self.assertGreater(results["writes"], 0)
+        self.assertGreater(results["snapshots"], 0)
+        self.assertGreater(results["latency_samples"], 0)
+        self.assertLessEqual(results["latency_p50_s"], results["latency_max_s"])
+        self.assertEqual(report["config"]["storage_mode"], "copy")
+
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            bench_pipeline.compare(results, output)
+        self.assertIn("latency_p50_s", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
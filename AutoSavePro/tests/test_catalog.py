@@ -0,0 +1,79 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import unittest
+from autosave.core.catalog import SnapshotCatalog, CATALOG_NAME, META_SUFFIX, write_snapshot_meta
+
+
+class SnapshotCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.catalog = SnapshotCatalog(os.path.join(self.root, CATALOG_NAME))
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.root)
+
+    def add(self, name, timestamp, app="editor.exe", file_name="notes.txt", original_path="/docs/notes.txt"):
+        return self.catalog.add(os.path.join(self.root, app, name), app, file_name, original_path,
+                                timestamp, 10, None, "copy")
+
+    def test_queries_are_newest_first(self):
+        for stamp in (1, 3, 2):
+            self.add(f"notes_{stamp}.txt", stamp)
+        self.add("todo_1.txt", 5, file_name="todo.txt", original_path="/docs/todo.txt")
+        self.assertEqual([row["timestamp"] for row in self.catalog.find("editor.exe", "notes.txt")], [3, 2, 1])
+        self.assertEqual([row["timestamp"] for row in self.catalog.find("editor.exe", "notes.txt", 2, 3)], [3, 2])
+        self.assertEqual(self.catalog.latest("editor.exe", "/docs/notes.txt")["timestamp"], 3)
+        self.assertEqual([row["file_name"] for row in self.catalog.latest_per_file("editor.exe", end=4)],
+                         ["notes.txt"])
+        self.assertEqual(self.catalog.count("editor.exe"), 4)
+        self.assertEqual(self.catalog.count("editor.exe", "notes.txt"), 3)
+        self.assertEqual(self.catalog.files("editor.exe"), ["notes.txt", "todo.txt"])
+
+    def test_a_save_path_is_never_reused(self):
+        self.add("notes_1.txt", 1)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.add("notes_1.txt", 2)
+
+    def test_pages_seek_past_the_previous_one(self):
+        for stamp in range(10):
+            self.add(f"notes_{stamp}.txt", stamp // 2)
+        seen = []
+        before = None
+        while True:
+            rows = self.catalog.page("editor.exe", "notes.txt", before, limit=3)
+            if not rows:
+                break
+            seen.extend(row["id"] for row in rows)
+            before = (rows[-1]["timestamp"], rows[-1]["id"])
+        self.assertEqual(seen, list(range(10, 0, -1)))
+
+    def test_rebuild_reads_the_snapshots_on_disk(self):
+        app_dir = os.path.join(self.root, "editor.exe")
+        os.makedirs(app_dir)
+        content = b"some notes"
+        save_path = os.path.join(app_dir, "notes_20240501_120000_000001.txt")
+        with open(save_path, 'wb') as dst:
+            dst.write(content)
+        write_snapshot_meta(save_path + META_SUFFIX, "/docs/notes.txt", 1714564800.0)
+        # Left behind by an interrupted save, and a file that is not a snapshot
+        for name in ("notes_20240501_120001.txt.tmp-1234", "readme.txt"):
+            with open(os.path.join(app_dir, name), 'wb') as dst:
+                dst.write(b"x")
+        self.add("gone_20240101_000000.txt", 1)
+
+        self.assertEqual(self.catalog.rebuild_from_disk(self.root), 1)
+        row = self.catalog.get(save_path)
+        self.assertEqual((row["file_name"], row["original_path"], row["timestamp"], row["size"], row["storage"]),
+                         ("notes.txt", "/docs/notes.txt", 1714564800.0, len(content), "copy"))
+        self.assertEqual(row["hash"], hashlib.sha256(content).hexdigest())
+
+        self.catalog.rebuild_from_disk(self.root, compute_hashes=False)
+        self.assertIsNone(self.catalog.get(save_path)["hash"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import io
+import random
+import shutil
+import hashlib
+import tempfile
+import unittest
+from autosave.core.chunk_store import ChunkStore, content_chunks
+
+
+class ContentChunksTest(unittest.TestCase):
+    def test_chunks_cover_the_file_within_bounds(self):
+        content = random.Random(1).randbytes(1024 * 1024)
+        chunks = list(content_chunks(io.BytesIO(content), 4096, 16384, 65536))
+        self.assertEqual(b"".join(chunks), content)
+        self.assertTrue(all(4096 < len(chunk) <= 65536 for chunk in chunks[:-1]))
+        self.assertGreater(len(chunks), 8)
+
+    def test_cut_points_resynchronize_after_an_insertion(self):
+        content = random.Random(2).randbytes(1024 * 1024)
+        edited = content[:100000] + b"inserted" + content[100000:]
+        before = set(content_chunks(io.BytesIO(content), 4096, 16384, 65536))
+        after = list(content_chunks(io.BytesIO(edited), 4096, 16384, 65536))
+        changed = [chunk for chunk in after if chunk not in before]
+        self.assertLessEqual(len(changed), 2)
+        self.assertLess(sum(len(chunk) for chunk in changed), 3 * 65536)
+
+
+class ChunkStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ChunkStore(os.path.join(self.root, "chunks"), 4096, 16384, 65536)
+        self.random = random.Random(3)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as dst:
+            dst.write(content)
+        return path
+
+    def save(self, name, content):
+        manifest, bytes_written = self.store.put_file(self.write(name, content))
+        manifest_path = os.path.join(self.root, name + ".manifest")
+        self.store.write_manifest(manifest, manifest_path)
+        return manifest_path, bytes_written
+
+    def test_insertion_stores_only_the_changed_chunks(self):
+        content = self.random.randbytes(1024 * 1024)
+        first, written = self.save("v1", content)
+        self.assertEqual(written, len(content))
+        edited = content[:500000] + b"a few more bytes" + content[500000:]
+        second, written = self.save("v2", edited)
+        self.assertLess(written, 3 * 65536)
+
+        manifest = self.store.read_manifest(second)
+        self.assertEqual(manifest["size"], len(edited))
+        self.assertEqual(manifest["sha256"], hashlib.sha256(edited).hexdigest())
+        restored = os.path.join(self.root, "restored")
+        self.store.restore(manifest, restored)
+        with open(restored, 'rb') as src:
+            self.assertEqual(src.read(), edited)
+
+    def test_gc_keeps_only_chunks_of_live_manifests(self):
+        first, _ = self.save("v1", self.random.randbytes(200000))
+        second, _ = self.save("v2", self.random.randbytes(200000))
+        live = {digest for digest, _ in self.store.read_manifest(second)["chunks"]}
+        self.assertGreater(self.store.gc(lambda: [second]), 0)
+        for digest, _ in self.store.read_manifest(first)["chunks"]:
+            self.assertEqual(self.store.has_chunk(digest), digest in live)
+        self.assertTrue(all(self.store.has_chunk(digest) for digest in live))
+
+    def test_gc_keeps_everything_when_a_manifest_is_unreadable(self):
+        first, _ = self.save("v1", self.random.randbytes(200000))
+        broken = self.write("broken.manifest", b"{")
+        self.assertEqual(self.store.gc(lambda: [broken]), 0)
+        self.assertTrue(all(self.store.has_chunk(digest) for digest, _ in self.store.read_manifest(first)["chunks"]))
+
+    def test_staged_chunks_wait_for_their_commit(self):
+        staged = {}
+        manifest, _ = self.store.put_file(self.write("v1", self.random.randbytes(100000)), staged)
+        self.assertEqual(sorted(staged), sorted({self.store.chunk_path(d) for d, _ in manifest["chunks"]}))
+        self.assertFalse(any(self.store.has_chunk(digest) for digest, _ in manifest["chunks"]))
+        for path, tmp_path in staged.items():
+            os.replace(tmp_path, path)
+        self.assertTrue(all(self.store.has_chunk(digest) for digest, _ in manifest["chunks"]))
+
+    def test_truncated_chunk_is_detected_on_restore(self):
+        manifest_path, _ = self.save("v1", self.random.randbytes(100000))
+        manifest = self.store.read_manifest(manifest_path)
+        with open(self.store.chunk_path(manifest["chunks"][0][0]), 'r+b') as dst:
+            dst.truncate(10)
+        with self.assertRaises(IOError):
+            self.store.restore(manifest, os.path.join(self.root, "restored"))
+
+
+if __name__ == "__main__":
+    unittest.main()
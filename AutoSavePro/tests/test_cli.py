@@ -0,0 +1,107 @@
+import io
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+from autosave import cli
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ArgumentsTest(unittest.TestCase):
+    def test_parse_app(self):
+        self.assertEqual(cli.parse_app("notepad.exe=.txt,log"), ("notepad.exe", [".txt", ".log"]))
+        for value in ("notepad.exe", "=.txt", "notepad.exe="):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                cli.parse_app(value)
+
+    def test_parse_frequency(self):
+        self.assertEqual(cli.parse_frequency("auto"), "auto")
+        self.assertEqual(cli.parse_frequency("60"), 60)
+        for value in ("0", "soon"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                cli.parse_frequency(value)
+
+    def test_a_command_is_required(self):
+        with mock.patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+            cli.main([])
+
+
+class StartupTest(unittest.TestCase):
+    def test_cli_import_stays_light(self):
+        code = "import sys, autosave.cli; print(sorted(m for m in sys.modules if m.startswith(('autosave.core', 'PyQt5'))))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=PROJECT_DIR,
+                                check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_check_startup_finds_no_forbidden_module(self):
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            self.assertEqual(cli.main(["check-startup", "--budget-ms", "100000", "--top", "3"]), 0)
+        self.assertIn("import autosave.core.watcher:", stdout.getvalue())
+
+    def test_check_startup_reports_a_failed_import(self):
+        with mock.patch("sys.stderr", io.StringIO()) as stderr:
+            self.assertEqual(cli.main(["check-startup", "--module", "autosave.no_such_module"]), 2)
+        self.assertIn("ModuleNotFoundError", stderr.getvalue())
+
+
+class CommandsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.save_dir = os.path.join(self.root, "saves")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_restore_into_a_target_directory(self):
+        from autosave.core.saver import Saver
+        file_path = os.path.join(self.root, "notes.txt")
+        with open(file_path, 'w') as dst:
+            dst.write("some notes")
+        saver = Saver(self.save_dir, sync_mode="none")
+        try:
+            saver.save_file(file_path, "app")
+        finally:
+            saver.close()
+        target_dir = os.path.join(self.root, "restored")
+        os.makedirs(target_dir)
+        argv = ["restore", "--save-dir", self.save_dir, "--app", "app", "--at", str(time.time()),
+                "--target-dir", target_dir]
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            self.assertEqual(cli.main(argv), 0)
+        self.assertTrue(stdout.getvalue().startswith("restored"))
+        with open(os.path.join(target_dir, "notes.txt")) as src:
+            self.assertEqual(src.read(), "some notes")
+
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            self.assertEqual(cli.main(argv[:-4] + ["--at", "1000"]), 0)
+        self.assertTrue(stdout.getvalue().startswith("No snapshot of app"))
+
+    @unittest.skipIf(sys.platform == "win32", "needs SIGTERM")
+    def test_run_stops_cleanly_on_sigterm(self):
+        process = subprocess.Popen([sys.executable, "-m", "autosave.cli", "run", "--save-dir", self.save_dir,
+                                    "--app", "editor.exe=.txt", "--frequency", "auto"],
+                                   cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            deadline = time.monotonic() + 10
+            while not os.path.isdir(self.save_dir) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)
+            process.send_signal(signal.SIGTERM)
+            _, stderr = process.communicate(timeout=10)
+        finally:
+            if process.poll() is None:
+                process.kill()
+        self.assertEqual(process.returncode, 0, stderr)
+        self.assertIn("Stopping AutoSavePro", stderr)
+        self.assertNotIn("Traceback", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
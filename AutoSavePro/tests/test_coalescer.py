@@ -0,0 +1,31 @@
+import unittest
+from autosave.core.coalescer import ChangeCoalescer
+
+
+class ChangeCoalescerTest(unittest.TestCase):
+    def setUp(self):
+        self.coalescer = ChangeCoalescer(quiet_period=2.0)
+
+    def test_burst_becomes_one_change_after_the_quiet_period(self):
+        for now in (0.0, 0.5, 1.0, 1.5):
+            self.coalescer.touch("a.txt", now)
+        self.assertEqual(self.coalescer.next_deadline(), 3.5)
+        self.assertEqual(self.coalescer.pop_due(3.0), [])
+        self.assertEqual(self.coalescer.pop_due(3.5), ["a.txt"])
+        self.assertEqual(self.coalescer.pop_due(10.0), [])
+        self.assertEqual((self.coalescer.events_received, self.coalescer.events_coalesced), (4, 3))
+
+    def test_paths_are_due_independently(self):
+        self.coalescer.touch("a.txt", 0.0)
+        self.coalescer.touch("b.txt", 1.0)
+        self.assertEqual(self.coalescer.pending_count(), 2)
+        self.assertEqual(self.coalescer.next_deadline(), 2.0)
+        self.assertEqual(self.coalescer.pop_due(2.0), ["a.txt"])
+        self.assertEqual(self.coalescer.next_deadline(), 3.0)
+        self.coalescer.discard("b.txt")
+        self.assertIsNone(self.coalescer.next_deadline())
+        self.assertEqual(self.coalescer.pop_due(10.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
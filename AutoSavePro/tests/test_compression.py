@@ -0,0 +1,63 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from autosave.core import compression
+from autosave.core.compression import CompressionPolicy
+
+
+class CompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = b"a line of a very repetitive document\n" * 20000
+        self.src_path = self.write("notes.txt", self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as dst:
+            dst.write(content)
+        return path
+
+    def test_every_codec_round_trips(self):
+        for codec, (suffix, _, _, _) in compression.CODECS.items():
+            save_path = os.path.join(self.root, "snapshot" + suffix)
+            file_hash = compression.compress_file(self.src_path, save_path, codec, 1)
+            self.assertEqual(file_hash, hashlib.sha256(self.content).hexdigest())
+            self.assertLess(os.path.getsize(save_path), len(self.content) // 10)
+            self.assertEqual(compression.codec_for_suffix(save_path), codec)
+            restored = os.path.join(self.root, "restored")
+            compression.decompress_file(save_path, restored)
+            with open(restored, 'rb') as src:
+                self.assertEqual(src.read(), self.content)
+
+    def test_already_compressed_files_are_detected(self):
+        self.assertTrue(compression.is_already_compressed(os.path.join(self.root, "photo.JPG")))
+        self.assertTrue(compression.is_already_compressed(self.write("image.bin", b"\x89PNG\r\n\x1a\n0000")))
+        self.assertTrue(compression.is_already_compressed(self.write("clip.bin", b"RIFF\0\0\0\0AVI LIST")))
+        self.assertFalse(compression.is_already_compressed(self.src_path))
+
+
+class CompressionPolicyTest(unittest.TestCase):
+    def test_extension_rules_win_over_app_rules(self):
+        policy = CompressionPolicy()
+        policy.set("lzma")
+        policy.set("bz2", 5, app_name="gimp")
+        policy.set("zlib", extension=".XCF")
+        policy.set(None, extension=".log")
+        self.assertEqual(policy.resolve("gimp", "/images/a.xcf"), ("zlib", 6))
+        self.assertEqual(policy.resolve("gimp", "/images/a.txt"), ("bz2", 5))
+        self.assertEqual(policy.resolve("word", "/docs/a.txt"), ("lzma", 6))
+        self.assertIsNone(policy.resolve("word", "/docs/a.log"))
+        self.assertIsNone(policy.resolve("word", "/docs/a.zip"))
+
+    def test_unknown_codec_is_rejected(self):
+        with self.assertRaises(ValueError):
+            CompressionPolicy().set("zstd")
+
+
+if __name__ == "__main__":
+    unittest.main()
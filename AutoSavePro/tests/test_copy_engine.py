@@ -0,0 +1,61 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+from autosave.core import copy_engine
+from autosave.core.copy_engine import CopyEngine
+
+
+def fake_clone(src, dst, size, want_hash):
+    # Stands in for FICLONE where the filesystem has no reflinks: the data lands, no hash
+    shutil.copyfileobj(src, dst)
+    return None
+
+
+class CopyEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.urandom(3 * 1024 * 1024 + 17)
+        self.src_path = os.path.join(self.root, "source.bin")
+        with open(self.src_path, 'wb') as dst:
+            dst.write(self.content)
+        self.expected_hash = hashlib.sha256(self.content).hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def copy(self, engine, **kwargs):
+        dst_path = os.path.join(self.root, "copy.bin")
+        result = engine.copy(self.src_path, dst_path, **kwargs)
+        with open(dst_path, 'rb') as src:
+            self.assertEqual(src.read(), self.content)
+        return result
+
+    def test_every_strategy_copies_and_hashes(self):
+        for name in CopyEngine().strategies:
+            result = self.copy(CopyEngine(strategies=(name,)), want_hash=True)
+            # Unsupported on this filesystem falls back to the chunked loop
+            self.assertIn(result.strategy, (name, "chunked"))
+            self.assertEqual(result.sha256, self.expected_hash)
+            self.assertEqual(result.bytes_copied, len(self.content))
+
+    def test_clone_is_not_read_back_unless_asked(self):
+        engine = CopyEngine(strategies=("chunked",))
+        engine.strategies.insert(0, "reflink")
+        engine.stats["reflink"] = {"count": 0, "bytes": 0, "seconds": 0.0}
+        with mock.patch.object(engine, "_copy_reflink", fake_clone), \
+                mock.patch.object(copy_engine, "_sha256_of", wraps=copy_engine._sha256_of) as sha256_of:
+            result = self.copy(engine, want_hash=True, hash_clones=False)
+            self.assertEqual(result.strategy, "reflink")
+            self.assertIsNone(result.sha256)
+            sha256_of.assert_not_called()
+
+            result = self.copy(engine, want_hash=True)
+            self.assertEqual(result.sha256, self.expected_hash)
+            sha256_of.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from autosave.core import delta
+
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.random = random.Random(7)
+        self.base = self.random.randbytes(2 * 1024 * 1024)
+        self.base_path = self.write("base", self.base)
+        self.signature = delta.Signature.from_file(self.base_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as dst:
+            dst.write(content)
+        return path
+
+    def round_trip(self, content, **kwargs):
+        target = self.write("target", content)
+        delta_path = os.path.join(self.root, "target.delta")
+        stats = delta.write_delta(self.signature, target, delta_path, {"base": "base"}, **kwargs)
+        if stats is not None:
+            restored = os.path.join(self.root, "restored")
+            delta.apply_delta(self.base_path, delta_path, restored)
+            with open(restored, 'rb') as src:
+                self.assertEqual(src.read(), content)
+        return stats
+
+    def test_shifted_content_is_copied_from_the_base(self):
+        content = self.base[:300000] + b"a few inserted bytes" + self.base[300000:1500000] + self.base[1600000:]
+        stats = self.round_trip(content)
+        self.assertEqual(stats["size"], len(content))
+        self.assertLess(stats["literal_bytes"], 256 * 1024)
+        self.assertGreater(stats["copied_bytes"], len(content) - 256 * 1024)
+
+    def test_gives_up_past_the_literal_budget(self):
+        stats = self.round_trip(self.random.randbytes(len(self.base)), max_literal_bytes=len(self.base) // 2)
+        self.assertIsNone(stats)
+        self.assertEqual(sorted(os.listdir(self.root)), ["base", "target"])
+
+    def test_signature_round_trip(self):
+        sig_path = os.path.join(self.root, "base.sig")
+        signature_bytes, file_hash = delta.write_signature(self.base_path, sig_path)
+        self.assertEqual(signature_bytes, os.path.getsize(sig_path))
+        loaded = delta.Signature.load(sig_path)
+        self.assertEqual(loaded.block_sizes, self.signature.block_sizes)
+        self.assertEqual(loaded.strong, self.signature.strong)
+        self.assertEqual(loaded.size, len(self.base))
+
+    def test_old_signature_format_is_rejected(self):
+        sig_path = self.write("old.sig", b"ASPSIG1\n" + bytes(8))
+        with self.assertRaises(ValueError):
+            delta.Signature.load(sig_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+from autosave.core.fingerprint import FingerprintCache
+
+
+class FingerprintCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.root, "fingerprints.json")
+        self.cache = FingerprintCache(self.cache_path)
+        self.file_path = os.path.join(self.root, "notes.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, content, age=60):
+        with open(self.file_path, 'w') as dst:
+            dst.write(content)
+        # Old enough not to be racy unless asked otherwise
+        mtime = time.time() - age
+        os.utime(self.file_path, (mtime, mtime))
+        return os.stat(self.file_path)
+
+    def record(self, content, age=60):
+        st = self.write(content, age)
+        self.cache.record(self.file_path, st, hashlib.sha256(content.encode()).hexdigest())
+        return st
+
+    def test_unchanged_stat_skips_the_hash(self):
+        self.record("some notes")
+        self.assertTrue(self.cache.is_unchanged(self.file_path))
+        self.assertEqual((self.cache.stat_hits, self.cache.hash_hits), (1, 0))
+
+    def test_touched_file_is_confirmed_by_its_hash(self):
+        self.record("some notes")
+        self.write("some notes", age=30)
+        self.assertTrue(self.cache.is_unchanged(self.file_path))
+        self.assertEqual(self.cache.hash_hits, 1)
+        # The new stat is trusted from now on
+        self.assertTrue(self.cache.is_unchanged(self.file_path))
+        self.assertEqual(self.cache.stat_hits, 1)
+
+    def test_racy_entry_is_hashed(self):
+        recorded = self.record("some notes", age=0)
+        # Rewritten within the same mtime tick: the stat alone cannot tell
+        self.write("more notes", age=0)
+        os.utime(self.file_path, ns=(recorded.st_atime_ns, recorded.st_mtime_ns))
+        self.assertFalse(self.cache.is_unchanged(self.file_path))
+
+    def test_changes_are_detected(self):
+        self.record("some notes")
+        self.write("other notes")
+        self.assertFalse(self.cache.is_unchanged(self.file_path))
+        os.remove(self.file_path)
+        self.assertFalse(self.cache.is_unchanged(self.file_path))
+        self.assertFalse(self.cache.is_unchanged(os.path.join(self.root, "unknown.txt")))
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_hash_of_a_changed_file_is_handed_to_the_save(self):
+        self.record("some notes")
+        st = self.write("same size!", age=30)
+        self.assertFalse(self.cache.is_unchanged(self.file_path))
+        self.assertEqual(self.cache.computed_hash(self.file_path, st), hashlib.sha256(b"same size!").hexdigest())
+        # Only once, and only for the same stat
+        self.assertIsNone(self.cache.computed_hash(self.file_path, st))
+        self.assertFalse(self.cache.is_unchanged(self.file_path))
+        self.assertIsNone(self.cache.computed_hash(self.file_path, self.write("same size?", age=20)))
+
+    def test_entries_survive_a_restart(self):
+        self.record("some notes")
+        self.cache.flush()
+        self.assertTrue(FingerprintCache(self.cache_path).is_unchanged(self.file_path))
+        self.cache.forget(self.file_path)
+        self.cache.flush()
+        self.assertFalse(FingerprintCache(self.cache_path).is_unchanged(self.file_path))
+
+    def test_unreadable_cache_is_ignored(self):
+        with open(self.cache_path, 'w') as dst:
+            dst.write("{")
+        self.assertEqual(FingerprintCache(self.cache_path).stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from autosave.apps.gimp import GIMPSession, GIMPHandler, autosave_gimp, scheme_string, parse_scheme_strings
+
+# Stands in for `gimp -i -b -`: answers the framed commands GIMPSession sends, with a few
+# expressions that misbehave on purpose
+STUB_INTERPRETER = r'''
+import re
+import sys
+import time
+
+FRAME = re.compile(r'^\(begin \(display "\\n@@autosave-begin (\d+)\\n"\) \(catch .*?\(write \(begin (.*)\)\) '
+                   r'\(display "\\n@@autosave-end \d+\\n"\)\)\)$')
+ADDITION = re.compile(r'^\(\+ (-?\d+) (-?\d+)\)$')
+for line in sys.stdin:
+    line = line.strip()
+    if line == "(gimp-quit 0)":
+        sys.exit(0)
+    match = FRAME.match(line)
+    if match is None:
+        print("batch command experienced an execution error", file=sys.stderr, flush=True)
+        continue
+    command_id, expression = match.groups()
+    print(f"\n@@autosave-begin {command_id}")
+    if expression == "(crash)":
+        sys.exit(3)
+    if expression == "(hang)":
+        time.sleep(60)
+    if expression == "(fail)":
+        print(f"\n@@autosave-error {command_id}", flush=True)
+        continue
+    if "gimp-image-list" in expression:
+        result = '("C:\\\\images\\\\a.xcf" "/tmp/notes.txt" "/tmp/b \\"2\\".png")'
+    elif "gimp-file-save" in expression:
+        result = "#t"
+    else:
+        result = str(sum(int(term) for term in ADDITION.match(expression).groups()))
+    print(result)
+    print(f"\n@@autosave-end {command_id}", flush=True)
+'''
+
+
+class GIMPSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.stub_path = os.path.join(self.root, "gimp_stub.py")
+        with open(self.stub_path, 'w') as dst:
+            dst.write(STUB_INTERPRETER)
+        self.sessions = []
+
+    def tearDown(self):
+        for session in self.sessions:
+            session.close(timeout=5)
+        shutil.rmtree(self.root)
+
+    def session(self, **kwargs):
+        session = GIMPSession([sys.executable, self.stub_path], start_timeout=10, command_timeout=10, **kwargs)
+        self.sessions.append(session)
+        return session
+
+    def test_one_process_serves_every_command(self):
+        session = self.session()
+        self.assertEqual(session.execute("(+ 2 3)"), "5")
+        results = session.pipeline([f"(+ {number} 1)" for number in range(20)])
+        self.assertEqual(results, [(str(number + 1), None) for number in range(20)])
+        self.assertEqual(session.starts, 1)
+
+    def test_script_fu_error_fails_only_its_command(self):
+        session = self.session()
+        results = session.pipeline(["(+ 1 1)", "(fail)", "(+ 2 2)"])
+        self.assertEqual([result for result, _ in results], ["2", None, "4"])
+        self.assertIsInstance(results[1][1], RuntimeError)
+        self.assertEqual(session.starts, 1)
+
+    def test_crashed_process_is_restarted(self):
+        session = self.session()
+        with self.assertRaisesRegex(RuntimeError, "exited with code 3"):
+            session.execute("(crash)")
+        self.assertEqual(session.execute("(+ 1 1)"), "2")
+        self.assertEqual(session.starts, 2)
+
+    def test_hung_process_is_killed(self):
+        session = self.session()
+        session.start()
+        process = session.process
+        with self.assertRaises(TimeoutError):
+            session.execute("(hang)", timeout=0.5)
+        self.assertIsNotNone(process.poll())
+        self.assertEqual(session.execute("(+ 1 1)"), "2")
+        self.assertEqual(session.starts, 2)
+
+    def test_restarts_are_bounded(self):
+        session = self.session(max_restarts=2)
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                session.execute("(crash)")
+        with self.assertRaisesRegex(RuntimeError, "not available"):
+            session.execute("(+ 1 1)")
+        self.assertEqual(session.starts, 3)
+
+    def test_close_quits_the_interpreter(self):
+        session = self.session()
+        session.start()
+        process = session.process
+        session.close()
+        self.assertEqual(process.returncode, 0)
+        self.assertFalse(session.is_running())
+
+    def test_handler_lists_and_saves_documents(self):
+        handler = GIMPHandler(self.session())
+        self.assertTrue(handler.connect())
+        self.assertEqual(handler.get_open_files(), ["C:\\images\\a.xcf", '/tmp/b "2".png'])
+        self.assertEqual(handler.save_documents([("a.xcf", "saved_a.xcf"), ("b.png", "saved_b.png")]), [True, True])
+        autosave_gimp(self.root, handler)
+        # A handler passed in keeps its warm session
+        self.assertTrue(handler.session.is_running())
+        self.assertEqual(handler.session.starts, 1)
+
+
+class SchemeStringTest(unittest.TestCase):
+    def test_round_trip(self):
+        for value in ("C:\\Users\\me\\image.xcf", 'a "quoted" name', "plain"):
+            self.assertEqual(parse_scheme_strings(scheme_string(value)), [value])
+
+
+if __name__ == "__main__":
+    unittest.main()
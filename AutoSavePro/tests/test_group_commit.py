@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from autosave.core.group_commit import GroupCommitter, temp_path
+
+
+class GroupCommitterTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.committers = []
+
+    def tearDown(self):
+        for committer in self.committers:
+            committer.stop()
+        shutil.rmtree(self.root)
+
+    def committer(self, sync_mode, **kwargs):
+        committer = GroupCommitter(sync_mode, **kwargs)
+        self.committers.append(committer)
+        return committer
+
+    def stage(self, name, content="data"):
+        final_path = os.path.join(self.root, name)
+        with open(temp_path(final_path), 'w') as dst:
+            dst.write(content)
+        return temp_path(final_path), final_path
+
+    def test_every_mode_commits(self):
+        for sync_mode in ("group", "always", "none"):
+            staged = self.stage(f"{sync_mode}.txt", sync_mode)
+            self.committer(sync_mode).commit([staged])
+            self.assertFalse(os.path.exists(staged[0]))
+            with open(staged[1]) as src:
+                self.assertEqual(src.read(), sync_mode)
+
+    def test_concurrent_commits_share_a_batch(self):
+        committer = self.committer("group", max_delay=0.5)
+        staged = [self.stage(f"file{index}.txt") for index in range(8)]
+        threads = [threading.Thread(target=committer.commit, args=([pair],)) for pair in staged]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertTrue(all(os.path.exists(final_path) for _, final_path in staged))
+        stats = committer.stats()
+        self.assertEqual(stats["files"], 8)
+        self.assertLess(stats["batches"], 8)
+        self.assertGreater(stats["largest_batch"], 1)
+
+    def test_failed_dependency_keeps_the_snapshot_hidden(self):
+        committer = self.committer("group", max_delay=0.2)
+        chunk = (os.path.join(self.root, "missing.tmp"), os.path.join(self.root, "chunk"))
+        manifest = self.stage("notes.manifest")
+        other = self.stage("other.txt")
+        failure = []
+
+        def commit_broken():
+            try:
+                committer.commit([manifest], depends=[chunk])
+            except OSError as e:
+                failure.append(e)
+
+        thread = threading.Thread(target=commit_broken)
+        thread.start()
+        committer.commit([other])
+        thread.join(5)
+        self.assertEqual(len(failure), 1)
+        self.assertFalse(os.path.exists(manifest[1]))
+        self.assertFalse(os.path.exists(manifest[0]))
+        self.assertTrue(os.path.exists(other[1]))
+
+    def test_stopped_committer_refuses_commits(self):
+        committer = self.committer("group")
+        committer.commit([self.stage("first.txt")])
+        committer.stop()
+        with self.assertRaises(RuntimeError):
+            committer.commit([self.stage("second.txt")])
+
+    def test_unknown_sync_mode(self):
+        with self.assertRaises(ValueError):
+            GroupCommitter("sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
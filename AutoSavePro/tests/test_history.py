@@ -0,0 +1,115 @@
+import os
+import random
+import shutil
+import difflib
+import tempfile
+import unittest
+from autosave.core import history
+from autosave.core.history import HistoryPager, diff_buffers, diff_snapshots, preview_snapshot, previous_version
+from autosave.core.saver import Saver
+
+
+def document(lines):
+    return "".join(f"{line}\n" for line in lines).encode()
+
+
+class DiffBuffersTest(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(5)
+        self.lines = [f"line {number} " + "x" * self.random.randrange(40) for number in range(2000)]
+
+    def assertSameAsDifflib(self, old_lines, new_lines):
+        expected = list(difflib.unified_diff(old_lines, new_lines, "old", "new", n=3, lineterm=""))
+        self.assertEqual(diff_buffers(document(old_lines), document(new_lines)), expected)
+
+    def test_matches_difflib(self):
+        for _ in range(30):
+            new_lines = list(self.lines)
+            for _ in range(self.random.randrange(1, 5)):
+                position = self.random.randrange(len(new_lines))
+                edit = self.random.choice(("change", "insert", "delete"))
+                if edit == "change":
+                    new_lines[position] = "changed"
+                elif edit == "insert":
+                    new_lines[position:position] = ["inserted"] * self.random.randrange(1, 4)
+                else:
+                    del new_lines[position:position + self.random.randrange(1, 4)]
+            self.assertSameAsDifflib(self.lines, new_lines)
+
+    def test_edits_at_both_ends(self):
+        self.assertSameAsDifflib(self.lines, ["new first line"] + self.lines[1:])
+        self.assertSameAsDifflib(self.lines, self.lines[:-2])
+        self.assertSameAsDifflib(self.lines[:5], self.lines[:5] + ["appended"])
+        self.assertSameAsDifflib([], ["only line"])
+
+    def test_identical_binary_and_large_changes(self):
+        self.assertEqual(diff_buffers(document(self.lines), document(self.lines)), [])
+        self.assertEqual(diff_buffers(b"\0\1\2", b"\0\1\3"),
+                         ["--- old", "+++ new", "Binary files differ (3 -> 3 bytes)"])
+        rewritten = diff_buffers(document(self.lines), document(line + "!" for line in self.lines), max_bytes=1000)
+        self.assertTrue(rewritten[-1].startswith("Changes too large to show"))
+
+    def test_output_is_truncated(self):
+        changed = [line if number % 10 else "changed" for number, line in enumerate(self.lines)]
+        lines = diff_buffers(document(self.lines), document(changed), max_lines=50)
+        self.assertEqual(len(lines), 51)
+        self.assertEqual(lines[-1], "... diff truncated after 50 lines")
+
+    def test_memory_mapped_buffers(self):
+        root = tempfile.mkdtemp()
+        try:
+            paths = []
+            for name, lines in (("old", self.lines), ("new", self.lines[:100] + ["edit"] + self.lines[101:])):
+                paths.append(os.path.join(root, name))
+                with open(paths[-1], 'wb') as dst:
+                    dst.write(document(lines))
+            with history._mapped(paths[0]) as old, history._mapped(paths[1]) as new:
+                self.assertEqual(diff_buffers(old, new)[2], "@@ -98,7 +98,7 @@")
+        finally:
+            shutil.rmtree(root)
+
+
+class SnapshotHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), "chunked", sync_mode="none")
+        self.file_path = os.path.join(self.root, "notes.txt")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def save(self, lines, file_path=None):
+        with open(file_path or self.file_path, 'wb') as dst:
+            dst.write(document(lines))
+        return self.saver.save_file(file_path or self.file_path, "app")
+
+    def test_pages_do_not_shift_when_snapshots_are_added(self):
+        for version in range(7):
+            self.save([f"version {version}"])
+        pager = HistoryPager(self.saver.catalog, "app", page_size=3)
+        self.assertEqual(pager.total(), 7)
+        first = pager.next_page()
+        self.save(["version 7"])
+        second = pager.next_page()
+        third = pager.next_page()
+        self.assertEqual([len(first), len(second), len(third)], [3, 3, 1])
+        self.assertEqual(len({row["id"] for row in first + second + third}), 7)
+        self.assertTrue(pager.exhausted)
+        self.assertEqual(pager.next_page(), [])
+
+    def test_diff_and_preview_of_snapshots(self):
+        first = self.save(["alpha", "beta"])
+        self.save(["unrelated"], os.path.join(self.root, "other.txt"))
+        second = self.save(["alpha", "gamma"])
+        row = self.saver.catalog.get(second)
+        self.assertEqual(previous_version(self.saver.catalog, row)["save_path"], first)
+        self.assertIsNone(previous_version(self.saver.catalog, self.saver.catalog.get(first)))
+        self.assertEqual(diff_snapshots(self.saver, first, second)[2:],
+                         ["@@ -1,2 +1,2 @@", " alpha", "-beta", "+gamma"])
+        self.assertEqual(preview_snapshot(self.saver, first), ["alpha", "beta"])
+        self.assertEqual(preview_snapshot(self.saver, first, max_bytes=6), ["alpha", "... 5 more bytes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from autosave.core.saver import Saver
+
+try:
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QThreadPool
+    from autosave.gui.history_view import HistoryModel, format_size
+except ImportError:
+    QApplication = None
+
+
+@unittest.skipUnless(QApplication, "PyQt5 is not installed")
+class HistoryModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), sync_mode="none")
+        for number in range(7):
+            name = "notes.txt" if number % 2 else "todo.txt"
+            file_path = os.path.join(self.root, name)
+            with open(file_path, 'w') as dst:
+                dst.write(f"version {number}")
+            self.saver.save_file(file_path, "app")
+        self.pool = QThreadPool()
+        self.model = HistoryModel(self.saver, page_size=3, pool=self.pool)
+        self.totals = []
+        self.model.total_changed.connect(self.totals.append)
+
+    def tearDown(self):
+        self.pool.waitForDone()
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def settle(self):
+        # Pages are loaded on the pool and delivered through the event loop
+        self.pool.waitForDone()
+        self.app.processEvents()
+
+    def test_rows_are_loaded_a_page_at_a_time(self):
+        self.model.set_filter("app")
+        self.settle()
+        self.assertEqual(self.model.rowCount(), 3)
+        self.assertEqual(self.totals, [7])
+        self.assertTrue(self.model.canFetchMore())
+        self.model.fetchMore()
+        self.settle()
+        self.model.fetchMore()
+        self.settle()
+        self.assertEqual(self.model.rowCount(), 7)
+        self.assertFalse(self.model.canFetchMore())
+        timestamps = [self.model.row_at(row)["timestamp"] for row in range(7)]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+        self.assertEqual(self.totals, [7])
+
+    def test_pages_of_a_previous_filter_are_dropped(self):
+        self.model.set_filter("app")
+        self.model.set_filter("app", "notes.txt")
+        self.settle()
+        self.assertEqual({self.model.row_at(row)["file_name"] for row in range(self.model.rowCount())},
+                         {"notes.txt"})
+        self.assertEqual(self.totals, [3])
+
+    def test_format_size(self):
+        self.assertEqual([format_size(size) for size in (None, 12, 2048, 5 * 1024 ** 3)],
+                         ["", "12 o", "2.0 Ko", "5.0 Go"])
+
+
+if __name__ == "__main__":
+    unittest.main()
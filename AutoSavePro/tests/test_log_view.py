@@ -0,0 +1,73 @@
+import os
+import logging
+import unittest
+
+try:
+    from PyQt5.QtWidgets import QApplication
+    from autosave.gui.log_view import LogBuffer, BufferLogHandler, LogModel, LogView, guess_level
+except ImportError:
+    QApplication = None
+
+
+@unittest.skipUnless(QApplication, "PyQt5 is not installed")
+class LogViewTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_levels_are_guessed_from_the_wording(self):
+        self.assertEqual(guess_level("Failed to save file a.txt for gimp"), logging.ERROR)
+        self.assertEqual(guess_level("Save not queued, skipped a.txt"), logging.WARNING)
+        self.assertEqual(guess_level("Now watching: a.txt"), logging.INFO)
+
+    def test_buffer_drops_the_oldest_under_a_flood(self):
+        buffer = LogBuffer(max_pending=3)
+        for number in range(5):
+            buffer.append(f"message {number}")
+        entries, dropped = buffer.drain()
+        self.assertEqual([message for _, _, message in entries], ["message 2", "message 3", "message 4"])
+        self.assertEqual(dropped, 2)
+        self.assertEqual(buffer.drain(), ([], 0))
+
+    def test_logging_records_reach_the_buffer(self):
+        buffer = LogBuffer()
+        logger = logging.getLogger("test_log_view")
+        handler = BufferLogHandler(buffer)
+        logger.addHandler(handler)
+        try:
+            logger.info("not shown")
+            logger.warning("disk %s", "full")
+        finally:
+            logger.removeHandler(handler)
+        entries, _ = buffer.drain()
+        self.assertEqual([(level, message) for _, level, message in entries], [(logging.WARNING, "disk full")])
+
+    def test_model_keeps_the_last_messages(self):
+        model = LogModel(capacity=4)
+        model.append_batch([(0, logging.INFO, f"first {number}") for number in range(3)])
+        model.append_batch([(0, logging.INFO, f"second {number}") for number in range(3)])
+        self.assertEqual(model.rowCount(), 4)
+        self.assertTrue(model.data(model.index(0)).endswith("first 2"))
+        model.append_batch([(0, logging.INFO, f"third {number}") for number in range(6)])
+        self.assertEqual(model.rowCount(), 4)
+        self.assertTrue(model.data(model.index(0)).endswith("third 2"))
+
+    def test_view_flushes_in_batches_and_filters_by_level(self):
+        view = LogView(capacity=100, flush_interval_ms=60000)
+        view.buffer = LogBuffer(max_pending=5)
+        for number in range(7):
+            view.append(f"message {number}", logging.DEBUG if number % 2 else logging.INFO)
+        self.assertEqual(view.model.rowCount(), 0)
+        view.flush()
+        self.assertEqual(view.model.rowCount(), 5)
+        self.assertEqual(view.dropped_total, 2)
+        self.assertIn("2", view.status_label.text())
+        # INFO by default: the DEBUG rows are hidden
+        self.assertEqual(view.proxy.rowCount(), 3)
+        view.level_combo.setCurrentText("DEBUG")
+        self.assertEqual(view.proxy.rowCount(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from autosave.core.metrics import MetricsRegistry, MetricsExporter, PROMETHEUS_CONTENT_TYPE
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_prometheus_text(self):
+        saves = self.registry.counter("saves", "Snapshots written", ("app",))
+        saves.labels('gimp "2"').inc()
+        saves.labels('gimp "2"').inc(2)
+        self.registry.gauge("queue_depth", "Queued saves").set_function(lambda: 7)
+        latency = self.registry.histogram("latency_seconds", "Save latency", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+        self.assertEqual(self.registry.render_prometheus().splitlines(), [
+            "# HELP autosave_latency_seconds Save latency",
+            "# TYPE autosave_latency_seconds histogram",
+            'autosave_latency_seconds_bucket{le="0.1"} 1',
+            'autosave_latency_seconds_bucket{le="1.0"} 2',
+            'autosave_latency_seconds_bucket{le="+Inf"} 3',
+            "autosave_latency_seconds_sum 5.55",
+            "autosave_latency_seconds_count 3",
+            "# HELP autosave_queue_depth Queued saves",
+            "# TYPE autosave_queue_depth gauge",
+            "autosave_queue_depth 7",
+            "# HELP autosave_saves_total Snapshots written",
+            "# TYPE autosave_saves_total counter",
+            'autosave_saves_total{app="gimp \\"2\\""} 3',
+        ])
+
+    def test_metrics_are_created_once(self):
+        self.assertIs(self.registry.counter("saves"), self.registry.counter("saves_total"))
+        with self.assertRaises(ValueError):
+            self.registry.gauge("saves_total")
+        with self.assertRaises(ValueError):
+            self.registry.counter("errors", labelnames=("app",)).labels()
+
+    def test_failing_function_is_left_out(self):
+        self.registry.gauge("broken").set_function(lambda: 1 / 0)
+        self.registry.gauge("fine").set(2)
+        self.assertEqual(self.registry.as_dict(), {"autosave_fine": 2})
+
+    def test_timer(self):
+        tick = self.registry.histogram("tick_seconds")
+        with tick.time():
+            pass
+        self.assertEqual(self.registry.as_dict()["autosave_tick_seconds_count"], 1)
+
+
+class MetricsExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.registry = MetricsRegistry()
+        self.registry.counter("saves").inc(4)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_http_and_dump(self):
+        dump_path = os.path.join(self.root, "metrics.json")
+        exporter = MetricsExporter(self.registry, port=0, dump_path=dump_path, dump_interval=3600)
+        exporter.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics", timeout=5) as response:
+                self.assertEqual(response.headers["Content-Type"], PROMETHEUS_CONTENT_TYPE)
+                self.assertIn("autosave_saves_total 4", response.read().decode('utf-8'))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/other", timeout=5)
+        finally:
+            exporter.stop()
+        with open(dump_path, 'r', encoding='utf-8') as src:
+            self.assertEqual(json.load(src)["metrics"], {"autosave_saves_total": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
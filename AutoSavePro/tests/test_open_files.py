@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+import psutil
+from autosave.core.open_files import ProcFdOpenFiles, PsutilOpenFiles
+
+
+class FakeProcess:
+    def __init__(self, pid, create_time=1.0):
+        self.pid = pid
+        self.info = {"name": f"app{pid}"}
+        self._create_time = create_time
+
+    def create_time(self):
+        return self._create_time
+
+
+class ProcFdOpenFilesTest(unittest.TestCase):
+    # A fake /proc: /proc/<pid>/fd/<n> are symlinks, like the real ones
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.proc_root = os.path.join(self.root, "proc")
+        self.documents = [self.touch(f"doc{number}.txt") for number in range(3)]
+        self.backend = ProcFdOpenFiles(self.proc_root)
+        self.process = FakeProcess(100)
+        self.link(100, 0, "/dev/null")
+        self.link(100, 3, self.documents[0])
+        self.link(100, 4, "socket:[1234]")
+        self.link(100, 5, "pipe:[99]")
+        self.link(100, 6, self.root)
+        self.link(100, 10, self.documents[1])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def touch(self, name):
+        path = os.path.join(self.root, name)
+        open(path, 'w').close()
+        return path
+
+    def link(self, pid, fd, target):
+        fd_dir = os.path.join(self.proc_root, str(pid), "fd")
+        os.makedirs(fd_dir, exist_ok=True)
+        link_path = os.path.join(fd_dir, str(fd))
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        os.symlink(target, link_path)
+
+    def test_only_regular_files_in_fd_order(self):
+        self.assertEqual(self.backend.open_files(self.process), self.documents[:2])
+
+    def test_unchanged_descriptors_are_not_stated_again(self):
+        self.backend.open_files(self.process)
+        stats_done = self.backend.stats()["stats"]
+        self.assertEqual(stats_done, 4)
+        self.assertEqual(self.backend.open_files(self.process), self.documents[:2])
+        self.assertEqual(self.backend.stats()["stats"], stats_done)
+        self.link(100, 3, self.documents[2])
+        self.assertEqual(self.backend.open_files(self.process), [self.documents[2], self.documents[1]])
+        self.assertEqual(self.backend.stats()["stats"], stats_done + 1)
+
+    def test_recycled_pid_starts_over(self):
+        self.backend.open_files(self.process)
+        stats_done = self.backend.stats()["stats"]
+        self.backend.open_files(FakeProcess(100, create_time=2.0))
+        self.assertEqual(self.backend.stats()["stats"], 2 * stats_done)
+
+    def test_exited_processes_are_forgotten(self):
+        self.backend.open_files(self.process)
+        self.assertEqual(self.backend.open_files(FakeProcess(200)), [])
+        self.assertEqual(self.backend.stats()["processes"], 1)
+        self.backend.retain([200, 300])
+        self.assertEqual(self.backend.stats()["processes"], 0)
+
+
+@unittest.skipUnless(ProcFdOpenFiles.available(), "needs /proc")
+class OwnProcessTest(unittest.TestCase):
+    def test_same_files_as_psutil(self):
+        root = tempfile.mkdtemp()
+        handles = [open(os.path.join(root, f"open{number}.txt"), 'w') for number in range(3)]
+        read_end, write_end = os.pipe()
+        try:
+            proc = psutil.Process()
+            proc.info = {"name": proc.name()}
+            expected = {os.path.realpath(handle.name) for handle in handles}
+            listed = ProcFdOpenFiles().open_files(proc)
+            self.assertTrue(expected <= set(listed))
+            self.assertEqual(set(listed), set(PsutilOpenFiles().open_files(proc)))
+        finally:
+            for handle in handles:
+                handle.close()
+            os.close(read_end)
+            os.close(write_end)
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from autosave.core import pack_store
+from autosave.core.pack_store import PackStore, scan_packs
+
+
+class PackStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.packs = os.path.join(self.root, "packs")
+        self.store = self.open()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.root)
+
+    def open(self, pack_size=4096):
+        return PackStore(self.packs, pack_size=pack_size, sync_mode="none")
+
+    def reopen(self, pack_size=4096):
+        self.store.close()
+        self.store = self.open(pack_size)
+
+    def data(self, number, size=1000):
+        return (b"%06d" % number) * (size // 6)
+
+    def test_put_get_delete_survive_a_reopen(self):
+        digest = self.store.put_bytes("app/a.txt", b"first", timestamp=10, meta={"original_path": "/docs/a.txt"})
+        self.assertEqual(digest, hashlib.sha256(b"first").hexdigest())
+        self.store.put_bytes("app/a.txt", b"second")
+        self.store.put_bytes("app/b.txt", b"other")
+        self.assertTrue(self.store.delete("app/b.txt"))
+        self.assertFalse(self.store.delete("app/b.txt"))
+        self.reopen()
+        self.assertEqual(self.store.get("app/a.txt"), b"second")
+        self.assertFalse(self.store.contains("app/b.txt"))
+        with self.assertRaises(KeyError):
+            self.store.get("app/b.txt")
+        self.assertEqual([(key, size) for key, _, size, _, _ in self.store.entries()], [("app/a.txt", 6)])
+
+    def test_index_grows_and_is_rebuilt_from_the_packs(self):
+        for number in range(1500):
+            self.store.put_bytes(f"key{number}", self.data(number, 60), meta={"number": number})
+        self.assertGreater(self.store.stats()["index_capacity"], pack_store.MIN_CAPACITY)
+        self.store.close()
+        os.remove(os.path.join(self.packs, pack_store.INDEX_NAME))
+        self.store = self.open()
+        self.assertEqual(self.store.stats()["snapshots"], 1500)
+        for number in range(0, 1500, 97):
+            self.assertEqual(self.store.get(f"key{number}"), self.data(number, 60))
+
+    def test_unflushed_changes_are_replayed(self):
+        index_path = os.path.join(self.packs, pack_store.INDEX_NAME)
+        self.store.put_bytes("kept", b"kept")
+        self.store.flush()
+        shutil.copy(index_path, index_path + ".flushed")
+        self.store.put_bytes("late", b"late")
+        self.store.delete("kept")
+        # Crash: the index on disk is the one of the last flush, the pack ends with a torn record
+        self.store._close_index()
+        self.store._writer.close()
+        self.store._writer = None
+        os.replace(index_path + ".flushed", index_path)
+        with open(self.store.pack_path(self.store.pack_ids()[-1]), 'ab') as dst:
+            dst.write(b"ASPR\x01torn")
+        self.store = self.open()
+        self.assertEqual(self.store.get("late"), b"late")
+        self.assertFalse(self.store.contains("kept"))
+        self.store.put_bytes("after", b"after")
+        self.assertEqual(sorted(key for key, _, _, _, _ in scan_packs(self.packs)), ["after", "late"])
+
+    def test_compaction_reclaims_dead_packs(self):
+        for number in range(24):
+            self.store.put_bytes(f"key{number}", self.data(number))
+        packs_before = self.store.pack_ids()
+        self.assertGreater(len(packs_before), 4)
+        survivors = {3, 17, 23}
+        for number in range(20):
+            if number not in survivors:
+                self.store.delete(f"key{number}")
+        reclaimed = self.store.compact()
+        self.assertGreater(reclaimed, 0)
+        # The first packs only held deleted snapshots and survivors that moved
+        self.assertTrue(set(packs_before[:3]) - set(self.store.pack_ids()))
+        self.reopen()
+        live = sorted(key for key, _, _, _, _ in self.store.entries())
+        self.assertEqual(live, sorted([f"key{number}" for number in survivors | set(range(20, 24))]))
+        for number in survivors:
+            self.assertEqual(self.store.get(f"key{number}"), self.data(number))
+        self.assertEqual(sorted(key for key, _, _, _, _ in scan_packs(self.packs)), live)
+
+    def test_corrupted_record_is_detected(self):
+        self.store.put_bytes("key", self.data(1))
+        with open(self.store.pack_path(self.store.pack_ids()[-1]), 'r+b') as dst:
+            dst.seek(-10, os.SEEK_END)
+            dst.write(b"xxxxxxxxxx")
+        with self.assertRaises(IOError):
+            self.store.get("key")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import unittest
+import psutil
+from autosave.core.process_snapshot import ProcessSnapshot
+
+
+class CountingBackend:
+    def __init__(self):
+        self.calls = []
+        self.retained = None
+
+    def retain(self, pids):
+        self.retained = set(pids)
+
+    def open_files(self, proc):
+        self.calls.append(proc.pid)
+        return ["/tmp/{}.txt".format(proc.pid)]
+
+
+class ProcessSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.snapshot = ProcessSnapshot(self.backend)
+        self.own_name = psutil.Process().name()
+
+    def test_processes_are_matched_by_name(self):
+        matches = self.snapshot.find(self.own_name.upper())
+        self.assertIn(os.getpid(), [proc.pid for proc in matches])
+        self.assertTrue(self.snapshot.is_running(self.own_name[1:]))
+        self.assertFalse(self.snapshot.is_running("no-such-process.exe"))
+        self.assertIn(os.getpid(), self.backend.retained)
+
+    def test_open_files_are_fetched_once_per_tick(self):
+        proc = [proc for proc in self.snapshot.find(self.own_name) if proc.pid == os.getpid()][0]
+        for _ in range(3):
+            self.assertEqual(self.snapshot.open_files(proc), ["/tmp/{}.txt".format(os.getpid())])
+        self.assertEqual(self.backend.calls, [os.getpid()])
+        ProcessSnapshot(self.backend).open_files(proc)
+        self.assertEqual(self.backend.calls, [os.getpid(), os.getpid()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import errno
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from autosave.core.saver import Saver
+from autosave.core.replication import Replicator
+
+
+class ReplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), "chunked", sync_mode="none")
+        self.replica = os.path.join(self.root, "replica")
+        self.replicator = Replicator(self.saver, [self.replica], sync_mode="none", max_row_attempts=3)
+        self.target = self.replicator.targets[0]
+        self.target.open()
+        self.saves = []
+        for number in range(3):
+            file_path = os.path.join(self.root, f"note{number}.txt")
+            with open(file_path, 'w') as dst:
+                dst.write(f"note number {number}\n" * 100)
+            self.saves.append(self.saver.save_file(file_path, "app"))
+
+    def tearDown(self):
+        self.replicator.stop()
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def replicated(self):
+        return sorted(os.path.relpath(row["save_path"], self.replica) for row in self.target.catalog.find_app("app"))
+
+    def expected(self, saves):
+        return sorted(os.path.relpath(save_path, self.saver.base_save_directory) for save_path in saves)
+
+    def test_cursor_survives_a_reopen(self):
+        self.assertEqual(self.replicator.replicate_batch(self.target), 3)
+        self.assertEqual(self.replicator.replicate_batch(self.target), 0)
+        self.assertEqual(self.replicated(), self.expected(self.saves))
+        last_id = self.target.cursor
+        self.target.close()
+        self.target.open()
+        self.assertEqual(self.target.cursor, last_id)
+        self.assertEqual(self.target.pending(), 0)
+
+    def test_unreadable_snapshot_is_given_up_after_a_few_attempts(self):
+        with open(self.saves[1], 'w') as dst:
+            dst.write("not a manifest")
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.replicator.replicate_batch(self.target)
+            self.assertEqual(self.target.cursor, 0)
+        self.assertEqual(self.replicator.replicate_batch(self.target), 3)
+        self.assertEqual(self.target.pending(), 0)
+        self.assertEqual(self.replicated(), self.expected([self.saves[0], self.saves[2]]))
+        self.assertFalse(os.path.exists(os.path.join(self.replica, self.expected([self.saves[1]])[0])))
+
+        self.target.close()
+        self.target.open()
+        self.assertEqual([row["save_path"] for row in self.target.dead_letters], [self.saves[1]])
+        self.assertEqual(self.replicator.stats()[self.replica]["dead_letters"], 1)
+
+    def test_full_target_never_skips_snapshots(self):
+        full = OSError(errno.ENOSPC, "No space left on device")
+        with mock.patch.object(self.replicator, "_stage_copy", side_effect=full):
+            for _ in range(5):
+                with self.assertRaises(OSError):
+                    self.replicator.replicate_batch(self.target)
+        self.assertEqual(self.target.cursor, 0)
+        self.assertEqual(self.target.dead_letters, [])
+        self.assertEqual(self.replicator.replicate_batch(self.target), 3)
+        self.assertEqual(self.replicated(), self.expected(self.saves))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+from autosave.core.saver import Saver
+from autosave.core.restore import restore_app, resolve_snapshots
+
+
+class PointInTimeRestoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), "copy", sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def save(self, name, content):
+        file_path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as dst:
+            dst.write(content)
+        save_path = self.saver.save_file(file_path, "app")
+        return file_path, self.saver.catalog.get(save_path)["timestamp"]
+
+    def read(self, file_path):
+        with open(file_path, 'r') as src:
+            return src.read()
+
+    def test_files_come_back_as_they_were(self):
+        notes, _ = self.save("notes.txt", "notes v1")
+        todo, at = self.save("todo.txt", "todo v1")
+        self.save("notes.txt", "notes v2")
+        later, _ = self.save("later.txt", "created afterwards")
+
+        items = restore_app(self.saver, "app", at)
+        self.assertEqual([(item.target_path, item.action, item.status) for item in items],
+                         [(notes, "overwrite", "restored"), (todo, "unchanged", "skipped")])
+        self.assertTrue(items[0].verified)
+        self.assertEqual(self.read(notes), "notes v1")
+        self.assertEqual(self.read(todo), "todo v1")
+        self.assertEqual(self.read(later), "created afterwards")
+
+    def test_dry_run_writes_nothing(self):
+        notes, at = self.save("notes.txt", "notes v1")
+        self.save("notes.txt", "notes v2")
+        items = restore_app(self.saver, "app", at, dry_run=True)
+        self.assertEqual([(item.action, item.status) for item in items], [("overwrite", "planned")])
+        self.assertEqual(self.read(notes), "notes v2")
+
+    def test_same_names_in_a_target_directory_keep_the_newest(self):
+        self.save(os.path.join("one", "notes.txt"), "first folder")
+        self.save(os.path.join("two", "notes.txt"), "second folder")
+        _, at = self.save(os.path.join("one", "notes.txt"), "first folder again")
+        target_directory = os.path.join(self.root, "restored")
+        items = resolve_snapshots(self.saver.catalog, "app", at, target_directory)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].target_path, os.path.join(target_directory, "notes.txt"))
+        self.assertEqual(items[0].timestamp, at)
+
+
+if __name__ == "__main__":
+    unittest.main()
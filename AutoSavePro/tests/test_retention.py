@@ -0,0 +1,106 @@
+import os
+import random
+import shutil
+import datetime
+import tempfile
+import unittest
+from autosave.core.saver import Saver
+from autosave.core.retention import RetentionPolicy, RetentionWorker
+
+HALF_HOUR = 1800
+
+
+def history(file_name, first, count, step=HALF_HOUR, size=100):
+    # Catalog-like rows, newest first
+    rows = [{"save_path": f"{file_name}-{index}", "file_name": file_name, "timestamp": first + index * step,
+             "size": size} for index in range(count)]
+    return rows[::-1]
+
+
+class RetentionPolicyTest(unittest.TestCase):
+    def setUp(self):
+        # Two ISO weeks of snapshots every half hour, Monday 2024-01-01 00:05 to Sunday 01-14 23:35
+        self.first = datetime.datetime(2024, 1, 1, 0, 5).timestamp()
+        self.rows = history("notes.txt", self.first, 14 * 48)
+        self.now = self.rows[0]["timestamp"] + 60
+
+    def kept(self, policy, rows):
+        deleted = {row["save_path"] for row in policy.select_deletions(rows, self.now)}
+        return [row for row in rows if row["save_path"] not in deleted]
+
+    def stamps(self, rows):
+        return [datetime.datetime.fromtimestamp(row["timestamp"]).strftime("%m-%d %H:%M") for row in rows]
+
+    def test_grandfather_father_son(self):
+        kept = self.kept(RetentionPolicy(keep_last=3, hourly=24, daily=7, weekly=4), self.rows)
+        hours = [f"01-14 {hour:02d}:35" for hour in range(23, -1, -1)]
+        expected = hours[:1] + ["01-14 23:05"] + hours[1:] + [f"01-{day:02d} 23:35" for day in range(13, 6, -1)]
+        self.assertEqual(self.stamps(kept), expected)
+
+    def test_max_age_keeps_the_newest_snapshot(self):
+        old = history("old.txt", self.first, 3)
+        policy = RetentionPolicy(keep_last=100, hourly=0, daily=0, weekly=0, max_age=2 * 3600)
+        kept = self.kept(policy, self.rows + old)
+        self.assertEqual(self.stamps(kept), ["01-14 23:35", "01-14 23:05", "01-14 22:35", "01-14 22:05",
+                                             "01-01 01:05"])
+
+    def test_total_size_cap(self):
+        notes = history("notes.txt", self.first + HALF_HOUR, 10, size=200)
+        rows = sorted(notes + history("big.psd", self.first, 3, size=1000), key=lambda row: row["timestamp"],
+                      reverse=True)
+        policy = RetentionPolicy(keep_last=100, hourly=0, daily=0, weekly=0, max_total_bytes=1500)
+        kept = self.kept(policy, rows)
+        # Newest of each file first, then the newest others until the cap
+        self.assertEqual([row["save_path"] for row in kept],
+                         [f"notes.txt-{index}" for index in range(9, 2, -1)] + ["big.psd-2"])
+
+
+class RetentionWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.root, "notes.txt")
+        self.content = random.Random(4).randbytes(256 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def save_versions(self, saver, count):
+        saves = []
+        for version in range(count):
+            with open(self.file_path, 'wb') as dst:
+                dst.write(self.content + f"version {version}\n".encode())
+            saves.append(saver.save_file(self.file_path, "app"))
+        return saves
+
+    def test_prunes_in_batches(self):
+        saver = Saver(os.path.join(self.root, "saves"), "copy", sync_mode="none")
+        try:
+            saves = self.save_versions(saver, 10)
+            worker = RetentionWorker(saver, RetentionPolicy(keep_last=2, hourly=0, daily=0, weekly=0),
+                                     batch_size=3, batch_pause=0)
+            self.assertEqual(worker.run_once(), 8)
+            self.assertEqual(sorted(row["save_path"] for row in saver.catalog.find_app("app")), sorted(saves[-2:]))
+            self.assertEqual([os.path.exists(save_path) for save_path in saves], [False] * 8 + [True] * 2)
+            self.assertEqual(worker.run_once(), 0)
+        finally:
+            saver.close()
+
+    def test_delta_bases_outlive_their_deltas(self):
+        saver = Saver(os.path.join(self.root, "saves"), "delta", sync_mode="none")
+        try:
+            saves = self.save_versions(saver, 4)
+            self.assertEqual(saver.catalog.get(saves[-1])["storage"], "delta")
+            worker = RetentionWorker(saver, RetentionPolicy(keep_last=1, hourly=0, daily=0, weekly=0),
+                                     batch_pause=0)
+            worker.run_once()
+            self.assertIn(saves[0], [row["save_path"] for row in saver.catalog.find_app("app")])
+            restored = os.path.join(self.root, "restored.txt")
+            saver.restore_to(saves[-1], restored)
+            with open(restored, 'rb') as src:
+                self.assertEqual(src.read(), self.content + b"version 3\n")
+        finally:
+            saver.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import time
+import threading
+import unittest
+from autosave.core.save_pipeline import SavePipeline
+
+
+class SavePipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.done = []
+        self.pipelines = []
+
+    def tearDown(self):
+        self.gate.set()
+        for pipeline in self.pipelines:
+            pipeline.stop(timeout=5)
+
+    def pipeline(self, policy, block_timeout=5.0):
+        pipeline = SavePipeline(workers=1, max_queue=2, policy=policy, block_timeout=block_timeout)
+        self.pipelines.append(pipeline)
+        pipeline.start()
+        # The single worker is held by a first job until the gate opens
+        pipeline.submit("busy", self.hold)
+        self.assertTrue(self.started.wait(5))
+        return pipeline
+
+    def hold(self):
+        self.started.set()
+        self.gate.wait(5)
+        self.done.append("busy")
+
+    def job(self, name):
+        return lambda: self.done.append(name)
+
+    def finish(self, pipeline):
+        self.gate.set()
+        pipeline.stop(drain=True, timeout=5)
+        return self.done
+
+    def test_newer_submission_replaces_the_queued_one(self):
+        pipeline = self.pipeline("drop_oldest")
+        pipeline.submit("a", self.job("a1"))
+        pipeline.submit("b", self.job("b1"))
+        pipeline.submit("a", self.job("a2"))
+        self.assertEqual(pipeline.queue_depth(), 2)
+        self.assertEqual(self.finish(pipeline), ["busy", "a2", "b1"])
+        self.assertEqual(pipeline.stats()["replaced"], 1)
+
+    def test_drop_oldest(self):
+        pipeline = self.pipeline("drop_oldest")
+        for name in ("a", "b", "c"):
+            self.assertTrue(pipeline.submit(name, self.job(name)))
+        self.assertEqual(self.finish(pipeline), ["busy", "b", "c"])
+        self.assertEqual(pipeline.stats()["dropped"], 1)
+
+    def test_drop_newest(self):
+        pipeline = self.pipeline("drop_newest")
+        results = [pipeline.submit(name, self.job(name)) for name in ("a", "b", "c")]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(self.finish(pipeline), ["busy", "a", "b"])
+
+    def test_block_waits_for_a_free_slot(self):
+        pipeline = self.pipeline("block")
+        pipeline.submit("a", self.job("a"))
+        pipeline.submit("b", self.job("b"))
+        threading.Timer(0.2, self.gate.set).start()
+        started = time.monotonic()
+        self.assertTrue(pipeline.submit("c", self.job("c")))
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        self.assertEqual(self.finish(pipeline), ["busy", "a", "b", "c"])
+
+    def test_block_gives_up_after_its_timeout(self):
+        pipeline = self.pipeline("block", block_timeout=0.1)
+        pipeline.submit("a", self.job("a"))
+        pipeline.submit("b", self.job("b"))
+        self.assertFalse(pipeline.submit("c", self.job("c")))
+        self.assertEqual(self.finish(pipeline), ["busy", "a", "b"])
+
+    def test_submit_after_stop_is_refused(self):
+        pipeline = self.pipeline("drop_oldest")
+        self.finish(pipeline)
+        self.assertFalse(pipeline.submit("late", self.job("late")))
+        self.assertEqual(pipeline.queue_depth(), 0)
+        self.assertEqual(pipeline.stats()["dropped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
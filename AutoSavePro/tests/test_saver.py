@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+from autosave.core import delta, copy_engine
+from autosave.core.catalog import SnapshotCatalog
+from autosave.core.pack_store import PACKS_DIRECTORY
+from autosave.core.saver import Saver
+
+
+class FrozenDateTime(datetime.datetime):
+    # Every save lands in the same second (and microsecond)
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 5, 1, 14, 5, 0)
+
+
+def document(version):
+    lines = [f"line {i} of the document\n" for i in range(20000)]
+    lines[10] = f"edited line, version {version}\n"
+    return "".join(lines).encode('utf-8')
+
+
+class SameSecondDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.root, "work", "report.txt")
+        os.makedirs(os.path.dirname(self.file_path))
+        self.saver = Saver(os.path.join(self.root, "saves"), "delta", sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def test_saves_in_the_same_second_get_their_own_snapshot(self):
+        saves = []
+        with mock.patch("autosave.core.saver.datetime.datetime", FrozenDateTime):
+            for version in range(3):
+                with open(self.file_path, 'wb') as dst:
+                    dst.write(document(version))
+                saves.append(self.saver.save_file(self.file_path, "app"))
+        self.assertEqual(len(set(saves)), 3)
+        self.assertTrue(saves[2].endswith(delta.DELTA_SUFFIX))
+        self.assertEqual(self.saver.catalog.count("app"), 3)
+
+        for version, save_path in enumerate(saves):
+            restored = os.path.join(self.root, f"restored{version}.txt")
+            self.saver.restore_to(save_path, restored)
+            with open(restored, 'rb') as src:
+                self.assertEqual(src.read(), document(version))
+
+    def test_delta_pointing_at_itself_is_rejected(self):
+        for version in range(2):
+            with open(self.file_path, 'wb') as dst:
+                dst.write(document(version))
+            save_path = self.saver.save_file(self.file_path, "app")
+        self.assertTrue(save_path.endswith(delta.DELTA_SUFFIX))
+        # Rewrite the header so that the delta names itself as its base
+        with open(save_path, 'rb') as src:
+            content = src.read()
+        start = len(delta.DELTA_MAGIC) + delta._LEN_STRUCT.size
+        (length,) = delta._LEN_STRUCT.unpack(content[len(delta.DELTA_MAGIC):start])
+        old = content[start:start + length]
+        header = json.loads(old.decode('utf-8'))
+        header["base"] = os.path.basename(save_path)
+        new = json.dumps(header).encode('utf-8')
+        length = delta._LEN_STRUCT.pack(len(new))
+        with open(save_path, 'wb') as dst:
+            dst.write(content[:start - len(length)] + length + new + content[start + len(old):])
+        with self.assertRaises(IOError):
+            self.saver.restore_to(save_path, os.path.join(self.root, "restored.txt"))
+
+
+class DeltaBaseTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saves = os.path.join(self.root, "saves")
+        self.saver = Saver(self.saves, "delta", max_chain_length=2, sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def write(self, file_path, content):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as dst:
+            dst.write(content)
+
+    def assertRestores(self, save_path, content):
+        restored = os.path.join(self.root, "restored")
+        self.saver.restore_to(save_path, restored)
+        with open(restored, 'rb') as src:
+            self.assertEqual(src.read(), content)
+
+    def test_chain_is_bounded(self):
+        file_path = os.path.join(self.root, "work", "report.txt")
+        saves = []
+        for version in range(4):
+            self.write(file_path, document(version))
+            saves.append(self.saver.save_file(file_path, "app"))
+        self.assertEqual([save.endswith(delta.DELTA_SUFFIX) for save in saves], [False, True, True, False])
+        for version, save_path in enumerate(saves):
+            self.assertRestores(save_path, document(version))
+
+    def test_file_with_the_same_name_is_not_a_base(self):
+        first = os.path.join(self.root, "a", "report.txt")
+        second = os.path.join(self.root, "b", "report.txt")
+        self.write(first, document(1))
+        self.saver.save_file(first, "app")
+        self.write(second, document(2))
+        save_path = self.saver.save_file(second, "app")
+        self.assertFalse(save_path.endswith(delta.DELTA_SUFFIX))
+        self.write(second, document(3))
+        save_path = self.saver.save_file(second, "app")
+        self.assertTrue(save_path.endswith(delta.DELTA_SUFFIX))
+        self.assertEqual(delta.read_delta_header(save_path)["original_path"], second)
+        self.assertRestores(save_path, document(3))
+
+    def test_packed_snapshot_is_not_a_base(self):
+        self.saver.close()
+        file_path = os.path.join(self.root, "note.txt")
+        self.write(file_path, b"small note, version 1")
+        self.saver = Saver(self.saves, "packed", sync_mode="none")
+        self.assertTrue(self.saver.save_file(file_path, "app").endswith(".packed"))
+        self.saver.close()
+
+        self.saver = Saver(self.saves, "delta", sync_mode="none")
+        self.write(file_path, b"small note, version 2")
+        save_path = self.saver.save_file(file_path, "app")
+        self.assertIsNotNone(save_path)
+        self.assertEqual(self.saver.storage_of(save_path), "copy")
+        self.assertRestores(save_path, b"small note, version 2")
+
+
+class ClonedCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), "copy", sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def enable_clones(self):
+        def fake_clone(src, dst, size, want_hash):
+            shutil.copyfileobj(src, dst)
+
+        # The filesystem may have turned reflinks down already: forget it
+        engine = self.saver.copy_engine
+        engine._unsupported.clear()
+        if "reflink" not in engine.strategies:
+            engine.strategies.insert(0, "reflink")
+            engine.stats["reflink"] = {"count": 0, "bytes": 0, "seconds": 0.0}
+        return mock.patch.object(engine, "_copy_reflink", fake_clone)
+
+    def write(self, file_path, content, age):
+        with open(file_path, 'wb') as dst:
+            dst.write(content)
+        stamp = time.time() - age
+        os.utime(file_path, (stamp, stamp))
+
+    def test_clone_reuses_the_hash_of_the_fingerprint_check(self):
+        file_path = os.path.join(self.root, "image.psd")
+        self.write(file_path, document(1), 100)
+        self.saver.save_file(file_path, "app")
+        with self.enable_clones(), mock.patch.object(copy_engine, "_sha256_of") as sha256_of:
+            # Rewritten in place with the same size: the fingerprint check has to hash it
+            self.write(file_path, document(2), 50)
+            self.assertFalse(self.saver.is_unchanged(file_path))
+            second = self.saver.save_file(file_path, "app")
+            # Without a fingerprint check just before, a clone is saved without its hash
+            self.write(file_path, document(3), 30)
+            third = self.saver.save_file(file_path, "app")
+            sha256_of.assert_not_called()
+        self.assertEqual(self.saver.catalog.get(second)["hash"], hashlib.sha256(document(2)).hexdigest())
+        self.assertIsNone(self.saver.catalog.get(third)["hash"])
+        self.assertTrue(self.saver.is_unchanged(file_path))
+        self.assertTrue(self.saver.restore_file(third, os.path.join(self.root, "restored.psd")))
+
+
+class DeletedSnapshotsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saver = Saver(os.path.join(self.root, "saves"), "copy", sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def test_file_without_snapshots_is_saved_again(self):
+        paths = []
+        for number in range(2):
+            file_path = os.path.join(self.root, f"note{number}.txt")
+            with open(file_path, 'wb') as dst:
+                dst.write(document(number))
+            self.saver.save_file(file_path, "app")
+            paths.append(file_path)
+        self.assertTrue(all(self.saver.is_unchanged(path) for path in paths))
+
+        self.saver.delete_old_saves("app", "note0.txt", keep_count=0)
+        self.assertFalse(self.saver.is_unchanged(paths[0]))
+        self.assertTrue(self.saver.is_unchanged(paths[1]))
+        self.assertTrue(self.saver.save_file(paths[0], "app"))
+        self.assertEqual(self.saver.catalog.count("app", "note0.txt"), 1)
+
+
+class PackedRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saves = os.path.join(self.root, "saves")
+        self.saver = Saver(self.saves, "packed", sync_mode="none")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def read_packs(self):
+        packs_dir = os.path.join(self.saves, PACKS_DIRECTORY)
+        content = {}
+        for name in sorted(os.listdir(packs_dir)):
+            with open(os.path.join(packs_dir, name), 'rb') as src:
+                content[name] = src.read()
+        return content
+
+    def test_rebuild_leaves_a_live_pack_store_alone(self):
+        saves = []
+        for number in range(5):
+            file_path = os.path.join(self.root, f"note{number}.txt")
+            with open(file_path, 'wb') as dst:
+                dst.write(document(number)[:2000])
+            saves.append(self.saver.save_file(file_path, "app"))
+        store = self.saver.pack_store
+        # A record the writer is still appending
+        with open(store.pack_path(store.pack_ids()[-1]), 'ab') as dst:
+            dst.write(b"ASPR\x01partial")
+        before = self.read_packs()
+
+        catalog = SnapshotCatalog(os.path.join(self.root, "rebuilt.db"))
+        try:
+            catalog.rebuild_from_disk(self.saves)
+            rebuilt = sorted(row["save_path"] for row in catalog.find_app("app"))
+        finally:
+            catalog.close()
+        self.assertEqual(rebuilt, sorted(saves))
+        self.assertEqual(self.read_packs(), before)
+
+
+class CompressedRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.saves = os.path.join(self.root, "saves")
+        self.saver = Saver(self.saves, "copy", sync_mode="none")
+        self.saver.set_compression("zlib", app_name="app")
+
+    def tearDown(self):
+        self.saver.close()
+        shutil.rmtree(self.root)
+
+    def test_rebuild_keeps_the_logical_size(self):
+        file_path = os.path.join(self.root, "notes.txt")
+        with open(file_path, 'wb') as dst:
+            dst.write(b"the same line again\n" * 5000)
+        save_path = self.saver.save_file(file_path, "app")
+        saved = self.saver.catalog.find_app("app")[0]
+        self.assertEqual(saved["storage"], "compressed")
+
+        catalog = SnapshotCatalog(os.path.join(self.root, "rebuilt.db"))
+        try:
+            catalog.rebuild_from_disk(self.saves, compute_hashes=False)
+            rebuilt = catalog.find_app("app")[0]
+        finally:
+            catalog.close()
+        self.assertEqual(rebuilt["save_path"], save_path)
+        self.assertEqual(rebuilt["size"], os.path.getsize(file_path))
+        self.assertEqual(rebuilt["hash"], saved["hash"])
+        self.assertEqual(rebuilt["original_path"], file_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import math
+import unittest
+from scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeadlineSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = DeadlineScheduler(jitter=0, clock=self.clock)
+
+    def run_until(self, end, step=1.0):
+        runs = []
+        while self.clock.now < end:
+            self.clock.now += step
+            runs.extend((self.clock.now, key) for key in self.scheduler.pop_due())
+        return runs
+
+    def test_tasks_run_at_their_own_interval(self):
+        self.scheduler.schedule("fast", 10, first_delay=0)
+        self.scheduler.schedule("slow", 30, first_delay=0)
+        self.assertEqual(self.scheduler.pop_due(), ["fast", "slow"])
+        runs = self.run_until(1060)
+        self.assertEqual([now for now, key in runs if key == "fast"], [1010, 1020, 1030, 1040, 1050, 1060])
+        self.assertEqual([now for now, key in runs if key == "slow"], [1030, 1060])
+        self.assertEqual(self.scheduler.next_deadline(), 1070)
+
+    def test_first_runs_are_spread_and_stable(self):
+        # After a restart a task keeps the same phase
+        restarted = DeadlineScheduler(jitter=0, clock=self.clock)
+        restarted.schedule(("app", 7), 100)
+        for number in range(50):
+            self.scheduler.schedule(("app", number), 100)
+        first_runs = self.run_until(1100)
+        self.assertEqual(len(first_runs), 50)
+        self.assertGreater(len({now for now, _ in first_runs}), 20)
+        first_run = [now for now, key in first_runs if key == ("app", 7)][0]
+        self.assertEqual(first_run, math.ceil(restarted.next_deadline()))
+
+    def test_jitter_does_not_accumulate(self):
+        scheduler = DeadlineScheduler(jitter=0.1, clock=self.clock, seed=3)
+        scheduler.schedule("task", 10, first_delay=0)
+        runs = []
+        for _ in range(2000):
+            self.clock.now += 0.5
+            if scheduler.pop_due():
+                runs.append(self.clock.now)
+        self.assertTrue(all(8.5 <= later - earlier <= 11.5 for earlier, later in zip(runs, runs[1:])))
+        self.assertAlmostEqual(len(runs), 1000 / 10, delta=2)
+
+    def test_reschedule_and_cancel(self):
+        self.scheduler.schedule("task", 60, first_delay=0)
+        self.scheduler.pop_due()
+        self.clock.now += 20
+        self.assertTrue(self.scheduler.reschedule("task", 10))
+        # Already overdue under the new interval: runs at once
+        self.assertEqual(self.scheduler.next_deadline(), self.clock.now)
+        self.assertEqual(self.scheduler.pop_due(), ["task"])
+        self.assertEqual(self.scheduler.interval("task"), 10)
+        self.assertTrue(self.scheduler.cancel("task"))
+        self.assertNotIn("task", self.scheduler)
+        self.assertIsNone(self.scheduler.next_deadline())
+        self.assertFalse(self.scheduler.reschedule("task", 10))
+
+    def test_missed_periods_are_not_replayed(self):
+        self.scheduler.schedule("task", 10, first_delay=0)
+        self.scheduler.pop_due()
+        self.clock.now += 3600
+        self.assertEqual(self.scheduler.pop_due(), ["task"])
+        self.assertEqual(self.scheduler.pop_due(), [])
+        self.assertEqual(self.scheduler.next_deadline(), self.clock.now + 10)
+
+    def test_stale_entries_are_compacted(self):
+        self.scheduler.schedule("task", 10, first_delay=0)
+        for _ in range(500):
+            self.scheduler.reschedule("task", 10)
+        self.clock.now += 10
+        self.scheduler.pop_due()
+        self.assertLess(len(self.scheduler._heap), 70)
+
+    def test_interval_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule("task", 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from autosave.core.watch_registry import WatchRegistry
+
+
+class FakeObserver:
+    def __init__(self, failing=()):
+        self.watches = {}
+        self.failing = set(failing)
+
+    def schedule(self, handler, directory, recursive=False):
+        if directory in self.failing:
+            raise OSError(f"Cannot watch {directory}")
+        watch = object()
+        self.watches[watch] = directory
+        return watch
+
+    def unschedule(self, watch):
+        del self.watches[watch]
+
+
+class WatchRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.observer = FakeObserver(failing=("/gone",))
+        self.registry = WatchRegistry(self.observer, event_handler=None)
+
+    def scheduled(self):
+        return sorted(self.observer.watches.values())
+
+    def test_directory_is_watched_once_while_referenced(self):
+        self.assertTrue(self.registry.add("gimp", "/docs/a.xcf"))
+        self.assertTrue(self.registry.add("gimp", "/docs/b.xcf"))
+        self.assertTrue(self.registry.add("word", "/docs/a.xcf"))
+        self.assertFalse(self.registry.add("gimp", "/docs/a.xcf"))
+        self.assertEqual(self.scheduled(), ["/docs"])
+        self.assertEqual(self.registry.ref_count("/docs"), 3)
+
+        self.assertTrue(self.registry.remove("gimp", "/docs/a.xcf"))
+        self.assertFalse(self.registry.remove("gimp", "/docs/a.xcf"))
+        self.registry.remove("gimp", "/docs/b.xcf")
+        self.assertEqual(self.scheduled(), ["/docs"])
+        self.registry.remove("word", "/docs/a.xcf")
+        self.assertEqual(self.scheduled(), [])
+        self.assertEqual(self.registry.ref_count("/docs"), 0)
+
+    def test_remove_app_keeps_directories_of_other_apps(self):
+        self.registry.add("gimp", "/docs/a.xcf")
+        self.registry.add("gimp", "/images/b.xcf")
+        self.registry.add("word", "/docs/c.docx")
+        self.registry.remove_app("gimp")
+        self.assertEqual(self.scheduled(), ["/docs"])
+        self.assertEqual(self.registry.watched_directories(), ["/docs"])
+
+    def test_failed_watch_leaves_no_reference(self):
+        with self.assertRaises(OSError):
+            self.registry.add("gimp", "/gone/a.xcf")
+        self.assertEqual(self.registry.ref_count("/gone"), 0)
+        self.assertEqual(self.registry.watched_directories(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
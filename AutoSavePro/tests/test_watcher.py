@@ -0,0 +1,100 @@
+import os
+import shutil
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import psutil
+from autosave.core import process_snapshot
+from autosave.core.watcher import Watcher, periodic_save_key
+
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.watcher = Watcher(os.path.join(self.root, "saves"))
+        self.watcher.add_application("editor.exe", [".txt"])
+        self.file_path = os.path.join(self.root, "notes.txt")
+        with open(self.file_path, 'w') as dst:
+            dst.write("some notes")
+
+    def tearDown(self):
+        self.watcher.saver.close()
+        shutil.rmtree(self.root)
+
+    def test_unobserved_files_are_still_saved_in_adaptive_mode(self):
+        self.watcher._watch_file("editor.exe", self.file_path, schedule=False)
+        self.watcher.set_adaptive_frequency("editor.exe", 1, 60)
+        self.watcher.app_watchers["editor.exe"].is_running = True
+        self.assertIn(periodic_save_key("editor.exe"), self.watcher.scheduler)
+        with mock.patch.object(self.watcher, "_submit_save") as submit:
+            self.watcher._run_scheduled(periodic_save_key("editor.exe"))
+        submit.assert_called_once_with("editor.exe", self.file_path)
+
+    def test_file_removed_right_after_its_save(self):
+        self.watcher.set_adaptive_frequency("editor.exe", 1, 60)
+        save_file = self.watcher.saver.save_file
+
+        def save_and_remove(file_path, app_name):
+            save_path = save_file(file_path, app_name)
+            os.remove(file_path)
+            return save_path
+
+        messages = []
+        self.watcher.log_signal.connect(messages.append)
+        with mock.patch.object(self.watcher.saver, "save_file", save_and_remove):
+            self.watcher._save_file("editor.exe", self.file_path)
+        self.assertIn(f"Successfully saved file {self.file_path} for editor.exe", messages)
+        self.assertEqual(self.watcher.saver.catalog.count("editor.exe"), 1)
+
+    def test_one_process_walk_per_check(self):
+        own_name = psutil.Process().name()
+        self.watcher.add_application(own_name, [".txt"])
+        self.watcher.add_application("other.exe", [".doc"])
+        with open(self.file_path, 'r'), \
+                mock.patch.object(process_snapshot.psutil, "process_iter", wraps=psutil.process_iter) as walk:
+            self.watcher.check_applications()
+        self.assertEqual(walk.call_count, 1)
+        self.assertIn(self.file_path, self.watcher.app_watchers[own_name].watched_files)
+        self.assertFalse(self.watcher.app_watchers["editor.exe"].is_running)
+
+    def test_burst_of_events_is_one_change(self):
+        self.watcher.coalescer.quiet_period = 0.1
+        self.watcher._watch_file("editor.exe", self.file_path, schedule=False)
+        changed = []
+        with mock.patch.object(self.watcher, "on_file_changed", changed.append), \
+                mock.patch.object(self.watcher, "check_applications"):
+            thread = threading.Thread(target=self.watcher.start_watching)
+            thread.start()
+            for _ in range(20):
+                self.watcher.queue_change(self.file_path)
+            # Not watched: dropped on the observer thread
+            self.watcher.queue_change(os.path.join(self.root, "notes.txt~"))
+            time.sleep(0.5)
+            self.watcher.stop()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(changed, [self.file_path])
+        self.assertEqual(self.watcher.coalescer.events_received, 20)
+
+    def test_changes_are_dispatched_to_the_owning_app(self):
+        self.watcher.add_application("viewer.exe", [".txt"])
+        self.watcher._watch_file("editor.exe", self.file_path)
+        self.watcher._watch_file("viewer.exe", self.file_path)
+        with mock.patch.object(self.watcher, "_submit_save") as submit:
+            self.watcher.on_file_changed(self.file_path)
+            self.watcher.on_file_changed(os.path.join(self.root, "other.txt"))
+            submit.assert_called_once_with("editor.exe", self.file_path)
+
+            # The other app that has the file open takes it over
+            self.watcher.stop_watching_app("editor.exe")
+            self.watcher.on_file_changed(self.file_path)
+            submit.assert_called_with("viewer.exe", self.file_path)
+        self.watcher.stop_watching_app("viewer.exe")
+        self.assertEqual(self.watcher.path_index, {})
+        self.assertEqual(self.watcher.watch_registry.watched_directories(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()